@@ -5,23 +5,31 @@
 # one named object makes the ownership and cleanup boundary explicit.
 # pylint: disable=too-many-arguments,too-many-instance-attributes
 
+from contextlib import contextmanager
 from functools import partial
 import gc
 import logging
 import os
 import sys
+import tempfile
+import time
+from pathlib import Path
 
 import reportlab.lib.pagesizes
 from reportlab.pdfgen import canvas
 
 from albumIndex import AlbumIndex
 from ceweInfo import AlbumInfo, CeweInfo, ProductStyle
+from cewePageResolver import collectReferencedFileNames, resolvePages
+from conversionProfile import profiled
 from conversionSetup import prepareConversion
 from conversionState import ConversionState
 from extraLoggers import ConversionMessageCounters, configlogger, mustsee
-from pageNumbering import PageNumberingInfo
+from mcfx import unpackMcfx
+from pageNumbering import createPageNumberingInfo
 from pages import processPages
-from renderContext import RenderContext
+from parallelPages import PageWorkerSetup, renderPagesInParallel
+from renderContext import createRenderContext
 from versionInfo import logVersionInformation
 
 
@@ -35,7 +43,7 @@ class AlbumConversionSession:
 
     def __init__(self, albumName, keepDoublePages, pageNumbers, mcfxTmpDir,
                  appDataDir, outputFileName, mcfToReportlab, imageQuality,
-                 pilAntialias, automaticWindows=False):
+                 pilAntialias, automaticWindows=False, jobs=1, logFileName=None, profile=None):
         self.album_name = albumName
         self.keep_double_pages = keepDoublePages
         self.page_numbers = pageNumbers
@@ -46,12 +54,15 @@ class AlbumConversionSession:
         self.image_quality = imageQuality
         self.pil_antialias = pilAntialias
         self.automatic_windows = automaticWindows
+        self.jobs = jobs
+        self.log_file_name = logFileName
         self.automatic_log_file_name = None
         self.automatic_log_handler = None
         self.automatic_loggers = []
 
         self.state = ConversionState()
         self.state.message_counters = ConversionMessageCounters()
+        self.state.profile = profile
         self.setup = None
 
     def __enter__(self):
@@ -67,13 +78,21 @@ class AlbumConversionSession:
         objectsCollected = gc.collect()
         logging.info(f'GC collected objects : {objectsCollected}')
 
+        if self.state.image_cache is not None:
+            self.state.image_cache.prune()
+
         messageCounters = self.state.message_counters
         if messageCounters is not None:
             messageCounters.print_summary()
             if self.setup is not None:
                 messageCounters.verify(self.setup.default_config_section)
             messageCounters.close()
+        self._printPerformanceSummary()
+        if self.state.profile is not None:
+            self.state.profile.finish()
 
+        if self.state.mcfx_container is not None:
+            self.state.mcfx_container.close()
         unpackedFolder = self.setup.unpacked_folder if self.setup is not None else None
         try:
             cleanUpTemporaryFiles(self.state.temporary_files, unpackedFolder)
@@ -81,11 +100,28 @@ class AlbumConversionSession:
             self._closeAutomaticLog()
         return False
 
+    def _printPerformanceSummary(self):
+        """Print the cache and other performance counters gathered by the conversion."""
+        performanceCounters = self.state.performance_counters
+        if not performanceCounters:
+            return
+        print("Performance counters")
+        for name, value in sorted(performanceCounters.items()):
+            print(f" {name}: {value}")
+        caches = sorted({name.rsplit(' ', 1)[0] for name in performanceCounters
+                         if name.endswith((' hits', ' misses'))})
+        for cache in caches:
+            hits = performanceCounters[f'{cache} hits']
+            print(f" {cache} hit rate: {100 * hits / (hits + performanceCounters[f'{cache} misses']):.0f}%")
+
     def _startAutomaticLog(self):
-        """Write Explorer-run diagnostics beside the album, if possible."""
-        if not self.automatic_windows:
+        """Write Explorer-run diagnostics beside the album, or to the requested log file, if possible."""
+        if self.log_file_name is not None:
+            self.automatic_log_file_name = self.log_file_name
+        elif self.automatic_windows:
+            self.automatic_log_file_name = self.album_name + '.log'
+        else:
             return
-        self.automatic_log_file_name = self.album_name + '.log'
         try:
             self.automatic_log_handler = logging.FileHandler(
                 self.automatic_log_file_name, mode='w', encoding='utf-8')
@@ -113,7 +149,8 @@ class AlbumConversionSession:
                 self.automatic_loggers.append(logger)
         for logger in self.automatic_loggers:
             logger.addHandler(self.automatic_log_handler)
-        logging.info(f'Writing automatic conversion log to: {self.automatic_log_file_name}')
+        logKind = 'automatic conversion' if self.automatic_windows else 'conversion'
+        logging.info(f'Writing {logKind} log to: {self.automatic_log_file_name}')
 
     def _closeAutomaticLog(self):
         """Detach and close the optional Explorer-run log file."""
@@ -127,9 +164,12 @@ class AlbumConversionSession:
 
     def render(self, processElements):  # noqa: C901
         """Prepare the album, render its pages, and save its primary PDF."""
-        self.setup = prepareConversion(
-            self.album_name, self.mcfx_tmp_dir, self.app_data_dir, self.state,
-            self.automatic_windows)
+        if self.state.profile is not None:
+            self.state.profile.startCProfile()
+        with self._timedStage('prepare'), profiled(self.state, 'prepareConversion'):
+            self.setup = prepareConversion(
+                self.album_name, self.mcfx_tmp_dir, self.app_data_dir, self.state,
+                self.automatic_windows, unpackOnlyMcf=self._unpacksSelectedPages())
         albumIndex = self._createAlbumIndex()
 
         articleConfigElement = self.setup.fotobook.find('articleConfig')
@@ -141,45 +181,98 @@ class AlbumConversionSession:
 
         pageSize, productStyle = self._getProductDetails()
         pageCount = self._getPageCount(articleConfigElement, productStyle)
-        imageFolder = self.setup.fotobook.get('imagedir')
-        renderContext = RenderContext(
-            self.mcf_to_reportlab, self.setup.image_resolution, self.image_quality,
-            self.setup.background_resolution, self.pil_antialias,
-            self.setup.default_config_section, self.setup.clipart_files,
-            self.setup.clipart_paths, self.setup.passepartout_folders,
-            self.setup.line_scales)
+        if self._unpacksSelectedPages():
+            with self._timedStage('unpack pages'):
+                self._unpackSelectedPageFiles(productStyle, pageCount)
+        if self.jobs > 1:
+            self._renderInParallel(pageSize, productStyle, pageCount, albumIndex, processElements)
+        else:
+            self._renderSerially(pageSize, productStyle, pageCount, albumIndex, processElements)
 
+        with self._timedStage('index'):
+            self._createIndexOutput(albumIndex, pageSize)
+        if productStyle == ProductStyle.MemoryCard:
+            print()
+            print('Use Adobe Acrobat to print the memory cards. Set custom pages per sheet, 4 wide x 6 down')
+            print(' and print two copies!')
+        return True
+
+    @contextmanager
+    def _timedStage(self, stage):
+        """Add the time spent in the block to the stage's total in the conversion state."""
+        startTime = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.state.stage_seconds[stage] += time.perf_counter() - startTime
+
+    def _unpacksSelectedPages(self):
+        """True when only the photos of the requested pages are unpacked from an mcfx album."""
+        return (self.page_numbers is not None and self.album_name.endswith('.mcfx')
+                and self.mcfx_tmp_dir is not None)
+
+    def _unpackSelectedPageFiles(self, productStyle, pageCount):
+        """Unpack the photos of the requested pages beside the already unpacked data.mcf."""
+        fotobook = self.setup.fotobook
+        fileNames = collectReferencedFileNames(
+            fotobook, resolvePages(fotobook, productStyle, pageCount, self.page_numbers),
+            productStyle, fotobook.get('imagedir'))
+        with profiled(self.state, 'unpackMcfx'):
+            unpackMcfx(Path(self.album_name).resolve(), self.mcfx_tmp_dir, fileNames=fileNames)
+
+    def _renderSerially(self, pageSize, productStyle, pageCount, albumIndex, processElements):
+        """Render every page onto one canvas in this process."""
+        renderContext = createRenderContext(
+            self.setup, self.mcf_to_reportlab, self.image_quality, self.pil_antialias)
         pdf = canvas.Canvas(self.output_file_name, pagesize=pageSize)
         pdf.setTitle(self.setup.album_title)
-        pageNumberingInfo = self._createPageNumberingInfo(pdf)
+        pageNumberingInfo = createPageNumberingInfo(
+            self.setup.fotobook, pdf, self.setup.available_fonts, self.state)
         processElementsForAlbum = partial(
             processElements, state=self.state, albumIndex=albumIndex)
 
-        processPages(
-            self.setup.fotobook, self.setup.mcf_base_folder, imageFolder,
-            productStyle, pdf, pageCount, self.page_numbers,
-            self.setup.available_fonts, self.setup.background_locations, self.state,
-            renderContext, pageNumberingInfo, processElementsForAlbum)
+        with self._timedStage('render'):
+            processPages(
+                self.setup.fotobook, self.setup.mcf_base_folder, self.setup.fotobook.get('imagedir'),
+                productStyle, pdf, pageCount, self.page_numbers,
+                self.setup.available_fonts, self.setup.background_locations, self.state,
+                renderContext, pageNumberingInfo, processElementsForAlbum)
 
         try:
-            pdf.save()
+            with self._timedStage('save'), profiled(self.state, 'pdf.save'):
+                pdf.save()
         except Exception as exception:  # pylint: disable=broad-exception-caught
             logging.error(f'Could not save the output file: {str(exception)}')
 
-        self._createIndexOutput(albumIndex, pageSize)
-        if productStyle == ProductStyle.MemoryCard:
-            print()
-            print('Use Adobe Acrobat to print the memory cards. Set custom pages per sheet, 4 wide x 6 down')
-            print(' and print two copies!')
-        return True
+    def _renderInParallel(self, pageSize, productStyle, pageCount, albumIndex, processElements):
+        """Render pages in worker processes, then merge them into the output."""
+        with tempfile.TemporaryDirectory(prefix='cewe2pdf-pages-') as fragmentFolder:
+            # Workers read an mcfx album that was not unpacked from the database themselves
+            unpackedMcfName = (str(self.setup.mcf_xml_name)
+                               if self.album_name.endswith('.mcfx') and self.state.mcfx_container is None else None)
+            workerSetup = PageWorkerSetup(
+                album_name=self.album_name,
+                unpacked_mcf_name=unpackedMcfName,
+                app_data_dir=self.app_data_dir,
+                automatic_windows=self.automatic_windows,
+                page_size=pageSize,
+                product_style=productStyle,
+                page_count=pageCount,
+                page_numbers=self.page_numbers,
+                mcf_to_reportlab=self.mcf_to_reportlab,
+                image_quality=self.image_quality,
+                image_resampling_filter=self.pil_antialias,
+                process_elements=processElements,
+                fragment_folder=fragmentFolder,
+                profile=self.state.profile is not None)
+            # The workers' pages are merged and saved in here too
+            with self._timedStage('render'):
+                renderPagesInParallel(
+                    workerSetup, self.setup.fotobook, self.jobs, self.output_file_name,
+                    self.setup.album_title, albumIndex, self.state)
 
     def _createAlbumIndex(self):
-        if self.setup.configuration is None:
-            return AlbumIndex(None)
-        try:
-            return AlbumIndex(self.setup.configuration['INDEX'])
-        except KeyError:
-            return AlbumIndex(None)
+        return AlbumIndex.FromConfiguration(self.setup.configuration)
 
     def _getProductDetails(self):
         pageSize = reportlab.lib.pagesizes.A4
@@ -206,13 +299,6 @@ class AlbumConversionSession:
         # covers nor two-page bundles, so do not apply the album +2 rule.
         return int(articleConfigElement.get('totalpages'))
 
-    def _createPageNumberingInfo(self, pdf):
-        pageNumberElement = self.setup.fotobook.find('pagenumbering')
-        if pageNumberElement is None or int(pageNumberElement.get('position')) == 0:
-            return None
-        return PageNumberingInfo(
-            pageNumberElement, pdf, self.setup.available_fonts, self.state)
-
     def _createIndexOutput(self, albumIndex, pageSize):
         if not albumIndex.indexing:
             return
@@ -1,9 +1,9 @@
 import logging
 import re
+# cv2, numpy and pymupdf are slow to import, and are needed only to merge an
+# index into the album, so they are imported by the methods which use them.
+# pylint: disable=import-outside-toplevel
 # pylint: disable=no-member
-import cv2 # the no_member warning is a false positive, cv2 is imported correctly and used in the code
-import pymupdf
-import numpy as np
 from reportlab.lib.units import mm
 from reportlab.pdfgen import canvas
 from PIL import Image
@@ -50,6 +50,22 @@ class AlbumIndex(): # pylint: disable=too-many-instance-attributes
         self.deleteIndexPdf = getConfigurationBool(configSection, "deleteIndexPdf", "True")
         self.deleteIndexPng = getConfigurationBool(configSection, "deleteIndexPng", "False")
 
+    @staticmethod
+    def FromConfiguration(configuration):
+        """Return an index built from the optional [INDEX] configuration section."""
+        if configuration is None:
+            return AlbumIndex(None)
+        try:
+            return AlbumIndex(configuration['INDEX'])
+        except KeyError:
+            return AlbumIndex(None)
+
+    def MergeIndexEntries(self, indexEntries):
+        """Add entries collected by a separate renderer, such as a page worker."""
+        for pageNumber, texts in indexEntries.items():
+            for text in texts:
+                self.AddIndexEntry(pageNumber, text)
+
     def CheckForIndexEntry(self, font, fontsize):
         if not self.indexing:
             return False
@@ -130,6 +146,8 @@ class AlbumIndex(): # pylint: disable=too-many-instance-attributes
     def SaveIndexPng(self, indexPdfFileName):
         if not self.indexing:
             return None
+        import cv2 # the no_member warning is a false positive, cv2 is imported correctly and used in the code
+        import pymupdf
         doc = pymupdf.open(indexPdfFileName)
         image = AlbumIndex._convert_to_opencv(doc.load_page(0), dpi=150)
         transparent_image = AlbumIndex._make_white_transparent(image)
@@ -160,6 +178,7 @@ class AlbumIndex(): # pylint: disable=too-many-instance-attributes
 
     @staticmethod
     def _make_white_transparent(image):
+        import cv2
         # Convert to BGRA (with alpha channel)
         image_rgba = cv2.cvtColor(image, cv2.COLOR_BGR2BGRA)
         # Set white pixels to transparent
@@ -169,6 +188,8 @@ class AlbumIndex(): # pylint: disable=too-many-instance-attributes
 
     @staticmethod
     def _convert_to_opencv(pdf_page, dpi=72):
+        import cv2
+        import numpy as np
         pix = pdf_page.get_pixmap(alpha=False, dpi=dpi)
         img = np.frombuffer(pix.samples, np.uint8).reshape((pix.height, pix.width, pix.n))
         if pix.n == 4:
@@ -185,6 +206,7 @@ class AlbumIndex(): # pylint: disable=too-many-instance-attributes
 
     @staticmethod
     def _crop_transparent_borders(image_rgba):
+        import numpy as np
         # Find all pixels where alpha > 0 (i.e. not fully transparent)
         alpha_channel = image_rgba[:, :, 3]
         non_transparent_coords = np.argwhere(alpha_channel > 0)
@@ -200,6 +222,9 @@ class AlbumIndex(): # pylint: disable=too-many-instance-attributes
     def MergeAlbumAndIndexPng(self, albumPdfFileName, indexPngFileName):
         if not self.indexing:
             return
+        import cv2
+        import numpy as np
+        import pymupdf
         # Load the index png
         indexImage = Image.open(indexPngFileName)
         idx_width_px, idx_height_px = indexImage.size  # Get dimensions
@@ -297,6 +322,7 @@ class AlbumIndex(): # pylint: disable=too-many-instance-attributes
 
     @staticmethod
     def MergeAlbumAndIndexPdf(albumPdfFileName, pagenr, indexPdfFileName):
+        import pymupdf
         # Load the album PDF
         albumDoc = pymupdf.open(albumPdfFileName)
         indexDoc = pymupdf.open(indexPdfFileName)
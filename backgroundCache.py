@@ -0,0 +1,111 @@
+"""In-memory cache of the page backgrounds drawn during one conversion.
+
+A themed album often uses the same background on most of its pages.  Without
+a cache each page searched every background folder for the file, decoded it,
+and encoded it again as JPEG.  :class:`BackgroundCache` resolves each
+background design element to a file once, and keeps the encoded JPEG for
+each output size in a small least-recently-used store, so a repeated
+background costs one dictionary lookup.
+"""
+
+from collections import OrderedDict
+from io import BytesIO
+import os
+
+import PIL
+
+from configUtils import getConfigurationInt
+from pathutils import findFileInDirs
+
+BACKGROUND_FILE_EXTENSIONS = ('.bmp', '.webp', '.jpg')
+
+
+def buildBackgroundIndex(backgroundLocations):
+    """Return a dictionary of every background designElementId to its file.
+
+    Where the same background is in several places the choice matches
+    findFileInDirs: the first extension found anywhere wins, then the first folder.
+    """
+    backgroundIndex = {}
+    for extension in reversed(BACKGROUND_FILE_EXTENSIONS):
+        for folder in reversed(backgroundLocations):
+            try:
+                fileNames = os.listdir(folder)
+            except OSError:
+                continue
+            for fileName in fileNames:
+                designElementId, fileExtension = os.path.splitext(fileName)
+                if fileExtension.lower() == extension:
+                    backgroundIndex[designElementId] = os.path.join(folder, fileName)
+    return backgroundIndex
+
+
+class BackgroundCache:
+    """Background file locations and encoded background images for one conversion."""
+
+    def __init__(self, backgroundLocations, maxEntries, resourceCatalogue=None):
+        self.background_locations = tuple(backgroundLocations)
+        self.max_entries = maxEntries
+        self.resource_catalogue = resourceCatalogue
+        self.paths = None
+        self.encoded_images = OrderedDict()
+
+    @staticmethod
+    def fromConfiguration(configSection, backgroundLocations, resourceCatalogue=None):
+        """Return the background cache sized by the backgroundCacheEntries setting."""
+        maxEntries = getConfigurationInt(configSection, 'backgroundCacheEntries', '32', 0)
+        return BackgroundCache(backgroundLocations, maxEntries, resourceCatalogue)
+
+    def findBackground(self, designElementId):
+        """Return the file for a background design element, searching the folders only once.
+
+        Raises ValueError, as findFileInDirs does, if there is no such file.
+        """
+        if self.paths is None:
+            if self.resource_catalogue is None:
+                self.paths = {}
+            else:
+                # The background folders are listed as a whole, so a
+                # missing background is found to be missing immediately.
+                self.paths = self.resource_catalogue.getIndex(
+                    'background', self.background_locations,
+                    lambda: buildBackgroundIndex(self.background_locations), recursive=False)
+        if designElementId not in self.paths and self.resource_catalogue is None:
+            try:
+                self.paths[designElementId] = findFileInDirs(
+                    [designElementId + extension for extension in BACKGROUND_FILE_EXTENSIONS],
+                    self.background_locations)
+            except ValueError:
+                self.paths[designElementId] = None
+        backgroundPath = self.paths.get(designElementId)
+        if backgroundPath is None:
+            raise ValueError(f'Could not find background {designElementId}')
+        return backgroundPath
+
+    def getEncodedBackground(self, designElementId, pixelSize, resamplingFilter, state):
+        """Return JPEG bytes for a background, downsampled to no more than pixelSize."""
+        cacheKey = (designElementId, pixelSize)
+        encodedImage = self.encoded_images.get(cacheKey)
+        if encodedImage is not None:
+            self.encoded_images.move_to_end(cacheKey)
+            state.performance_counters['background cache hits'] += 1
+            return encodedImage
+
+        state.performance_counters['background cache misses'] += 1
+        with PIL.Image.open(self.findBackground(designElementId)) as sourceImage:
+            image = sourceImage.convert('RGB')
+        # Backgrounds are stretched over the area when drawn, so a larger
+        # source only adds pixels that the configured resolution discards.
+        # A smaller one is left alone rather than enlarged.
+        reducedSize = (min(image.width, pixelSize[0]), min(image.height, pixelSize[1]))
+        if reducedSize != image.size:
+            image = image.resize(reducedSize, resamplingFilter)
+        memFileHandle = BytesIO()
+        image.save(memFileHandle, 'jpeg')
+        encodedImage = memFileHandle.getvalue()
+
+        if self.max_entries > 0:
+            self.encoded_images[cacheKey] = encodedImage
+            while len(self.encoded_images) > self.max_entries:
+                self.encoded_images.popitem(last=False)
+        return encodedImage
@@ -1,25 +1,22 @@
 """Background rendering for CEWE book pages."""
 
-from io import BytesIO
 import logging
 
 # Background discovery tries several optional file locations; failure in one
 # location is expected and is reported before processing continues.
 # pylint: disable=broad-exception-caught
 
-import PIL
-from reportlab.lib.utils import ImageReader
-
+from backgroundCache import BackgroundCache
 from ceweInfo import AlbumInfo
 from configUtils import getConfigurationBool
 from conversionState import ConversionState
-from pathutils import findFileInDirs
+from imageUtils import drawEncodedImage
 from pageTypes import PageProcessingType
 from renderContext import RenderContext
 
 
 def processBackground(backgroundTags, state: ConversionState, backgroundLocations,
-                      productstyle, pagetype, pdf, ph, pw, context: RenderContext):  # noqa: C901
+                      productstyle, pagetype, pdf, ph, pw, context: RenderContext):
     """Draw the page background, including special handling for inside covers."""
     areaHeight = ph
     areaWidth = pw
@@ -69,19 +66,29 @@ def processBackground(backgroundTags, state: ConversionState, backgroundLocation
             if 'type' in backgroundTag.attrib and int(backgroundTag.get('type')) != 1:
                 logging.warning(f"value of background attribute not supported: type = {backgroundTag.get('type')}")
 
-            bgPath = ''
-            try:
-                bgPath = findFileInDirs([bg + '.bmp', bg + '.webp', bg + '.jpg'], backgroundLocations)
-                logging.debug(f"Reading background file: {bgPath}")
-                image = PIL.Image.open(bgPath).convert('RGB')
-                memFileHandle = BytesIO()
-                image.save(memFileHandle, 'jpeg')
-                memFileHandle.seek(0)
-                pdf.drawImage(ImageReader(memFileHandle), context.mcf_to_reportlab * areaXOffset, 0,
-                              width=context.mcf_to_reportlab * areaWidth,
-                              height=context.mcf_to_reportlab * areaHeight)
-            except Exception:
-                if bg not in state.background_not_found_paths:
-                    logging.warning(
-                        f'Could not find background {bg}; leaving the page background unchanged.')
-                state.background_not_found_paths.add(bg)
+            _drawBackgroundDesignElement(bg, state, backgroundLocations, pdf,
+                                         areaXOffset, areaWidth, areaHeight, context)
+
+
+def _drawBackgroundDesignElement(bg, state: ConversionState, backgroundLocations, pdf,
+                                 areaXOffset, areaWidth, areaHeight, context: RenderContext):
+    """Draw the background design element bg over the page area, through the background cache."""
+    backgroundCache = state.background_cache
+    if backgroundCache is None:
+        # A state that was not made by prepareConversion still finds the file
+        backgroundCache = BackgroundCache(backgroundLocations, 0)
+        state.background_cache = backgroundCache
+    # The same 0.1mm-to-pixels conversion as for image areas
+    pixelSize = (max(1, int(0.5 + areaWidth * context.background_resolution / 254.0)),
+                 max(1, int(0.5 + areaHeight * context.background_resolution / 254.0)))
+    try:
+        encodedImage = backgroundCache.getEncodedBackground(
+            bg, pixelSize, context.image_resampling_filter, state)
+        drawEncodedImage(pdf, encodedImage, context.mcf_to_reportlab * areaXOffset, 0,
+                         context.mcf_to_reportlab * areaWidth,
+                         context.mcf_to_reportlab * areaHeight, state)
+    except Exception:
+        if bg not in state.background_not_found_paths:
+            logging.warning(
+                f'Could not find background {bg}; leaving the page background unchanged.')
+        state.background_not_found_paths.add(bg)
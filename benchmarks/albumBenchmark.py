@@ -0,0 +1,148 @@
+"""Measure whole conversions of synthetic albums, and compare them with a baseline.
+
+A synthetic album is created by syntheticAlbum.py, then converted --repeat
+times, each in a fresh child process so that no import, font or cache is
+warm. The wall time, the time of each stage of the conversion, the peak
+resident set size and the size of the PDF are recorded; the fastest run is
+kept, as the one least disturbed by the rest of the machine.
+
+    python benchmarks/albumBenchmark.py --pages 26 --photos-per-page 4 --megapixels 2 --output now.json
+    python benchmarks/albumBenchmark.py --baseline before.json --tolerance 0.1
+
+With --baseline, each measurement which exceeds the baseline's by more than
+the tolerance is reported as a regression, and the exit status is 1.
+
+Recorded on Linux, Python 3.11, one CPU, for the default album of 26 pages
+with 4 photos of 2 megapixels on each, and text, clipart, shadows, corners and
+passepartouts, which is 104 photos:
+
+    format  wall     prepare  render   save    peak RSS  output
+    mcf     47.7 s   0.11 s   44.5 s   3.1 s   319 MB    78 MB
+    mcfx    45.4 s   0.12 s   42.3 s   2.9 s   318 MB    78 MB
+
+The peak resident set size is only available where Python has the resource
+module, which excludes Windows.
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(PROJECT_ROOT))
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+# pylint: disable-next=wrong-import-position
+from syntheticAlbum import addAlbumArguments, albumFeatures, createSyntheticAlbum  # noqa: E402
+
+# The measurements compared with a baseline, all of which are better when smaller
+COMPARED_MEASUREMENTS = ('wall_seconds', 'peak_rss_mb', 'output_bytes')
+
+# Slower times which differ by less than this are not reported, as short stages vary by more
+IGNORED_SECONDS = 0.05
+
+
+def runChild(albumName, jobs):
+    """Convert the album in this process and print its measurements as JSON."""
+    # pylint: disable=import-outside-toplevel
+    from albumConversionSession import AlbumConversionSession
+    from cewe2pdf import image_quality, mcf2rl, pil_antialias
+    from pageElements import processElements
+
+    startTime = time.perf_counter()
+    session = AlbumConversionSession(albumName, False, None, None, None, None,
+                                     mcf2rl, image_quality, pil_antialias, jobs=jobs)
+    with session:
+        session.render(processElements)
+    wallSeconds = time.perf_counter() - startTime
+    try:
+        import resource
+        # ru_maxrss is in kilobytes on Linux
+        peakRssMegabytes = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    except ImportError:
+        peakRssMegabytes = None
+    print(json.dumps({
+        'wall_seconds': round(wallSeconds, 3),
+        'stage_seconds': {stage: round(seconds, 3) for stage, seconds in session.state.stage_seconds.items()},
+        'peak_rss_mb': None if peakRssMegabytes is None else round(peakRssMegabytes, 1),
+        'output_bytes': os.path.getsize(session.output_file_name),
+    }))
+
+
+def measureConversion(albumName, jobs):
+    """Convert the album in a child process and return its measurements."""
+    completed = subprocess.run(
+        [sys.executable, __file__, '--child', albumName, '--jobs', str(jobs)],
+        capture_output=True, text=True, check=True, cwd=os.path.dirname(albumName))
+    return json.loads(completed.stdout.strip().splitlines()[-1])
+
+
+def findRegressions(result, baseline, tolerance):
+    """Return a description of each measurement which exceeds the baseline's by more than tolerance."""
+    pairs = [(name, result.get(name), baseline.get(name)) for name in COMPARED_MEASUREMENTS]
+    pairs += [(f'{stage} seconds', seconds, baseline.get('stage_seconds', {}).get(stage))
+              for stage, seconds in result.get('stage_seconds', {}).items()]
+    regressions = []
+    for name, value, baselineValue in pairs:
+        if value is None or not baselineValue:
+            continue
+        if name.endswith('seconds') and value - baselineValue < IGNORED_SECONDS:
+            continue
+        if value > baselineValue * (1 + tolerance):
+            regressions.append(f'{name}: {value} against {baselineValue} in the baseline '
+                               f'(+{100 * (value / baselineValue - 1):.0f}%)')
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    addAlbumArguments(parser)
+    parser.add_argument('--jobs', type=int, default=1, help='Number of processes rendering the pages')
+    parser.add_argument('--repeat', type=int, default=1, help='Number of conversions, of which the fastest is kept')
+    parser.add_argument('--output', default=None, help='JSON file for the measurements, rather than printing them')
+    parser.add_argument('--baseline', default=None, help='JSON file of earlier measurements to compare with')
+    parser.add_argument('--tolerance', type=float, default=0.1,
+                        help='Fraction by which a measurement may exceed the baseline, default 0.1')
+    parser.add_argument('--child', default=None, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        runChild(args.child, args.jobs)
+        return 0
+
+    album = {'pages': args.pages, 'photos_per_page': args.photos_per_page, 'megapixels': args.megapixels,
+             'format': args.format, 'features': albumFeatures(args).__dict__, 'jobs': args.jobs}
+    with tempfile.TemporaryDirectory() as folder:
+        albumName = createSyntheticAlbum(folder, args.pages, args.photos_per_page, args.megapixels,
+                                         args.format == 'mcfx', albumFeatures(args))
+        runs = [measureConversion(albumName, args.jobs) for _ in range(max(1, args.repeat))]
+    result = dict(album=album, **min(runs, key=lambda run: run['wall_seconds']))
+
+    resultText = json.dumps(result, indent=2)
+    if args.output is None:
+        print(resultText)
+    else:
+        with open(args.output, 'w', encoding='utf-8') as outputFile:
+            outputFile.write(resultText)
+
+    if args.baseline is None:
+        return 0
+    with open(args.baseline, encoding='utf-8') as baselineFile:
+        baseline = json.load(baselineFile)
+    if baseline.get('album') != album:
+        print(f'The baseline was measured for a different album: {baseline.get("album")}')
+    regressions = findRegressions(result, baseline, args.tolerance)
+    for regression in regressions:
+        print(f'Regression in {regression}')
+    if not regressions:
+        print(f'No measurement exceeds the baseline by more than {100 * args.tolerance:.0f}%')
+    return 1 if regressions else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
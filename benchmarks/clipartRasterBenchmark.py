@@ -0,0 +1,90 @@
+"""Measure the time to rasterise the clipart of the test resources.
+
+ClpFile.rasterSvgData used to convert each SVG twice, first only to find the
+size it has unscaled. It now reads that size from the parsed SVG and converts
+once, and keeps the parsed SVG of recent cliparts. Each clipart in
+the tests is rasterised at each --sizes by the former two conversions,
+by rasterSvgData the first time, when it must parse the SVG, and again, when
+the parsed SVG is kept. The images are checked to be identical.
+
+    python benchmarks/clipartRasterBenchmark.py --sizes 300 1200 2400
+
+Recorded on Linux, Python 3.11, one CPU, in milliseconds for all 24 cliparts,
+which vary by about 15% from run to run:
+
+    size    two conversions   one conversion   parsed before
+    300              1216.2            869.9           865.7
+    1200            10658.9           8532.1          8738.6
+    2400            30847.2          30176.9         34703.4
+
+Leaving out the unscaled conversion saves most for small clipart. The parsing
+kept for a clipart drawn again costs little beside drawing it at a large size.
+"""
+
+import argparse
+import sys
+import time
+from io import BytesIO
+from pathlib import Path
+
+from PIL import Image
+
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(PROJECT_ROOT))
+
+# pylint: disable-next=wrong-import-position
+from clpFile import ClpFile, parseSvg  # noqa: E402
+
+
+def loadTestCliparts():
+    """Return the test cliparts which cairosvg can draw, leaving out the previews of missing photos."""
+    cliparts = []
+    for fileName in sorted((PROJECT_ROOT / 'tests').rglob('*.clp')):
+        if not fileName.stem.endswith('-preview'):
+            cliparts.append(ClpFile(str(fileName)))
+    return cliparts
+
+
+def rasterWithTwoConversions(clipart, width, height):
+    """rasterSvgData as it was, converting the SVG once to find its size and again to scale it."""
+    import cairosvg # pylint: disable=import-outside-toplevel
+    tmpMemFile = BytesIO()
+    cairosvg.svg2png(bytestring=clipart.svgData, write_to=tmpMemFile, unsafe=True)
+    tmpMemFile.seek(0)
+    tempImage = Image.open(tmpMemFile)
+    scaleMax = max(width / tempImage.width, height / tempImage.height)
+    tmpMemFile = BytesIO()
+    cairosvg.svg2png(bytestring=clipart.svgData, write_to=tmpMemFile, scale=scaleMax, unsafe=True)
+    tmpMemFile.seek(0)
+    return Image.open(tmpMemFile).resize((width, height))
+
+
+def timeMilliseconds(function, cliparts, size):
+    """Rasterise every clipart at size x 3/4 size and return the total milliseconds and the images."""
+    startTime = time.perf_counter()
+    images = [function(clipart, size, size * 3 // 4) for clipart in cliparts]
+    return 1000 * (time.perf_counter() - startTime), images
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--sizes', type=int, nargs='+', default=[300, 1200, 2400],
+                        help='Widths in pixels of the rasterised clipart')
+    args = parser.parse_args()
+
+    cliparts = loadTestCliparts()
+    print(f"{'size':<6} {'two conversions':>16} {'one conversion':>16} {'parsed before':>15}")
+    for size in args.sizes:
+        twoTime, twoImages = timeMilliseconds(rasterWithTwoConversions, cliparts, size)
+        parseSvg.cache_clear()
+        oneTime, oneImages = timeMilliseconds(ClpFile.rasterSvgData, cliparts, size)
+        cachedTime, _ = timeMilliseconds(ClpFile.rasterSvgData, cliparts, size)
+        for twoImage, oneImage in zip(twoImages, oneImages):
+            if twoImage.tobytes() != oneImage.tobytes():
+                raise AssertionError(f'A clipart rasterised at {size} pixels differs')
+        print(f'{size:<6} {twoTime:>16.1f} {oneTime:>16.1f} {cachedTime:>15.1f}')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
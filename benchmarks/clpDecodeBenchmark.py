@@ -0,0 +1,93 @@
+"""Measure the time to decode .clp files, as clipart and passepartout frames use them.
+
+ClpFile.readClp used to read a .clp file as text, build a translation table to
+remove the letters which are not hexadecimal digits, and convert the rest with
+bytes.fromhex. It now removes them from the raw bytes with a fixed deletion
+table, converts them with binascii.unhexlify, and keeps the decoded SVG of
+each unchanged file for the life of the process. The test cliparts, and a
+synthetic frame of --frame-megabytes of SVG, are decoded the former way, the
+new way, and again from the kept SVG, and the results are checked to be equal.
+
+    python benchmarks/clpDecodeBenchmark.py --frame-megabytes 4
+
+Recorded on Linux, Python 3.11, one CPU, in milliseconds:
+
+    files                  former     new    kept
+    27 test cliparts          1.4     1.3    0.22
+    4 MB frame               21.6    16.3    0.06
+
+Decoding the raw bytes saves about a fifth of the first decoding of a large
+frame; keeping the decoded SVG saves all of it when the frame is used again.
+"""
+
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(PROJECT_ROOT))
+
+# pylint: disable-next=wrong-import-position
+from clpFile import ClpFile, decodeClp  # noqa: E402
+
+
+def decodeAsText(fileName):
+    """readClp as it was, reading the file as text."""
+    with open(fileName, "rt") as fileClp: # pylint: disable=unspecified-encoding
+        contents = fileClp.read()
+    invalidChars = 'ghijklmnopqrstuvwxyz'
+    hexData = contents[1:].translate({ord(i): None for i in invalidChars})
+    return bytes.fromhex(hexData)
+
+
+def decodeWithReadClp(fileName):
+    return ClpFile(fileName).svgData
+
+
+def writeFrame(fileName, megabytes):
+    """Write a .clp file of megabytes of SVG paths, with a letter which is not a digit scattered every 100 or so."""
+    generator = random.Random(1)
+    path = ' '.join(f'L{generator.uniform(0, 1000):.3f},{generator.uniform(0, 1000):.3f}' for _ in range(20000))
+    svg = (f'<svg xmlns="http://www.w3.org/2000/svg" width="1000" height="1000"><path d="M0,0 {path}"/></svg>'
+           * max(1, round(megabytes * 1e6 / (len(path) + 100)))).encode('utf-8')
+    hexText = svg.hex()
+    pieces = [hexText[start:start + 100] + generator.choice('ghijklmnopqrstuvwxyz')
+              for start in range(0, len(hexText), 100)]
+    with open(fileName, 'w', encoding='ascii') as clpFile:
+        clpFile.write('a' + ''.join(pieces))
+
+
+def timeMilliseconds(function, fileNames):
+    startTime = time.perf_counter()
+    results = [function(fileName) for fileName in fileNames]
+    return 1000 * (time.perf_counter() - startTime), results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--frame-megabytes', type=float, default=4, help='Size of the SVG of the synthetic frame')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as folder:
+        frameName = os.path.join(folder, 'frame.clp')
+        writeFrame(frameName, args.frame_megabytes)
+        testClipartNames = [str(fileName) for fileName in sorted((PROJECT_ROOT / 'tests').rglob('*.clp'))]
+        print(f"{'files':<22} {'former':>7} {'new':>7} {'kept':>7}")
+        for label, fileNames in ((f'{len(testClipartNames)} test cliparts', testClipartNames),
+                                 (f'{args.frame_megabytes:g} MB frame', [frameName])):
+            formerTime, formerData = timeMilliseconds(decodeAsText, fileNames)
+            decodeClp.cache_clear()
+            newTime, newData = timeMilliseconds(decodeWithReadClp, fileNames)
+            keptTime, _ = timeMilliseconds(decodeWithReadClp, fileNames)
+            if formerData != newData:
+                raise AssertionError(f'The {label} are decoded differently')
+            print(f'{label:<22} {formerTime:>7.1f} {newTime:>7.1f} {keptTime:>7.2f}')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
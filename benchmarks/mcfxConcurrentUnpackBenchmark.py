@@ -0,0 +1,72 @@
+"""Measure the throughput of unpacking several .mcfx albums at the same time.
+
+A synthetic album of --files photos of --file-megabytes each is written to a
+temporary folder, then unpacked by 1, 4 and 8 threads at once, each into its
+own folder, as a service converting several albums in one process would.
+The total megabytes written per second is reported for each number of
+concurrent unpacks, and for a single unpack writing with only one thread.
+
+    python benchmarks/mcfxConcurrentUnpackBenchmark.py --files 50 --file-megabytes 4
+
+Recorded on Linux, Python 3.11, one CPU, for 50 photos of 4 MB held in
+the page cache:
+
+    1 unpack, 1 writer thread     1113 MB/s
+    1 concurrent unpacks          1062 MB/s
+    4 concurrent unpacks           883 MB/s
+    8 concurrent unpacks           868 MB/s
+
+With one CPU and no disk waits the threads have nothing to overlap, so this
+shows only that concurrent unpacks are safe and cost little; the writer
+threads are meant to hide disk latency with several CPUs and a real disk.
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(PROJECT_ROOT))
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+from mcfx import MCFX_WRITER_THREADS, unpackMcfx  # noqa: E402 pylint: disable=wrong-import-position
+from mcfxExtractionBenchmark import createSyntheticMcfx  # noqa: E402 pylint: disable=wrong-import-position
+
+
+def measureUnpacks(mcfxPath, outputFolder, concurrentUnpacks, writerThreads, albumMegabytes):
+    """Unpack the album concurrentUnpacks times at once and return the megabytes written per second."""
+    outputPaths = [os.path.join(outputFolder, f'{concurrentUnpacks}-{writerThreads}-{index}')
+                   for index in range(concurrentUnpacks)]
+    startTime = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrentUnpacks) as executor:
+        list(executor.map(lambda outputPath: unpackMcfx(Path(mcfxPath), outputPath, writerThreads),
+                          outputPaths))
+    elapsed = time.perf_counter() - startTime
+    return concurrentUnpacks * albumMegabytes / elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--files', type=int, default=50, help='Number of photos in the album')
+    parser.add_argument('--file-megabytes', type=int, default=4, help='Size of each photo')
+    args = parser.parse_args()
+    albumMegabytes = args.files * args.file_megabytes
+
+    with tempfile.TemporaryDirectory() as folder:
+        mcfxPath = os.path.join(folder, 'synthetic.mcfx')
+        print(f'Creating {args.files} photos of {args.file_megabytes} MB in {mcfxPath}')
+        createSyntheticMcfx(mcfxPath, args.files, args.file_megabytes)
+
+        throughput = measureUnpacks(mcfxPath, folder, 1, 1, albumMegabytes)
+        print(f'1 unpack, 1 writer thread   {throughput:6.0f} MB/s')
+        for concurrentUnpacks in (1, 4, 8):
+            throughput = measureUnpacks(mcfxPath, folder, concurrentUnpacks, MCFX_WRITER_THREADS, albumMegabytes)
+            print(f'{concurrentUnpacks} concurrent unpacks        {throughput:6.0f} MB/s')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,117 @@
+"""Measure the peak memory of unpacking a large synthetic .mcfx album.
+
+A synthetic album of --files photos of --file-megabytes each is written to a
+temporary folder, then unpacked in a child process both by mcfx.unpackMcfx
+and by the previous approach of fetching every row at once, and for just one
+photo as for a single page chosen with --pages. The peak resident set size
+and time of each child are reported, so they can be compared.
+
+    python benchmarks/mcfxExtractionBenchmark.py --files 100 --file-megabytes 10
+
+Recorded on Linux, Python 3.11, for 100 photos of 10 MB (a 1 GB album):
+
+    fetchall   peak RSS  1028 MB    2.0 s
+    streaming  peak RSS    20 MB    0.9 s
+
+and for 200 photos of 10 MB (a 2 GB album):
+
+    fetchall   peak RSS  2032 MB    4.3 s
+    streaming  peak RSS    40 MB    1.8 s
+    one-photo  peak RSS    24 MB    0.0 s
+
+The peak resident set size is only available where Python has the resource
+module, which excludes Windows.
+"""
+
+import argparse
+import os
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(PROJECT_ROOT))
+
+from mcfx import unpackMcfx  # noqa: E402 pylint: disable=wrong-import-position
+
+
+def createSyntheticMcfx(mcfxPath, fileCount, fileMegabytes):
+    """Write an .mcfx with a small data.mcf and fileCount incompressible photos."""
+    connection = sqlite3.connect(mcfxPath)
+    try:
+        connection.execute('CREATE TABLE Files (Filename TEXT, Data BLOB, LastModified INTEGER)')
+        connection.execute('INSERT INTO Files VALUES (?, ?, ?)',
+                           ('data.mcf', b'<?xml version="1.0"?><fotobook></fotobook>', 0))
+        fileSize = fileMegabytes * 1024 * 1024
+        for index in range(fileCount):
+            # zeroblob and incremental writes keep the builder's own memory small too
+            cursor = connection.execute('INSERT INTO Files VALUES (?, zeroblob(?), ?)',
+                                        (f'photo{index:05}.jpg', fileSize, 0))
+            with connection.blobopen('Files', 'Data', cursor.lastrowid) as blob:
+                for _ in range(fileMegabytes):
+                    blob.write(os.urandom(1024 * 1024))
+            connection.commit()
+    finally:
+        connection.close()
+
+
+def unpackWithFetchall(mcfxPath, outputPath):
+    """The extraction used before streaming: every row is fetched before any is written."""
+    connection = sqlite3.connect(mcfxPath)
+    try:
+        record = connection.execute('SELECT Filename, Data, LastModified FROM Files').fetchall()
+        os.makedirs(outputPath, exist_ok=True)
+        for filename, filecontent, _ in record:
+            with open(os.path.join(outputPath, filename), 'wb') as file:
+                file.write(filecontent)
+    finally:
+        connection.close()
+
+
+def runChild(method, mcfxPath, outputPath):
+    """Unpack in this process and print the elapsed time and peak resident set size."""
+    startTime = time.perf_counter()
+    if method == 'streaming':
+        unpackMcfx(Path(mcfxPath), outputPath)
+    elif method == 'one-photo':
+        # As when converting a single page with --pages
+        unpackMcfx(Path(mcfxPath), outputPath, fileNames=['photo00000.jpg'])
+    else:
+        unpackWithFetchall(mcfxPath, outputPath)
+    elapsed = time.perf_counter() - startTime
+    try:
+        import resource  # pylint: disable=import-outside-toplevel
+        # ru_maxrss is in kilobytes on Linux, but in bytes on macOS
+        peakRss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        peakMegabytes = peakRss / (1024 * 1024 if sys.platform == 'darwin' else 1024)
+        print(f'{method:<10} peak RSS {peakMegabytes:5.0f} MB  {elapsed:5.1f} s')
+    except ImportError:
+        print(f'{method:<10} peak RSS unavailable  {elapsed:5.1f} s')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--files', type=int, default=100, help='Number of photos in the album')
+    parser.add_argument('--file-megabytes', type=int, default=10, help='Size of each photo')
+    parser.add_argument('--child', nargs=3, metavar=('METHOD', 'MCFX', 'OUTPUT'), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        runChild(*args.child)
+        return
+
+    with tempfile.TemporaryDirectory() as folder:
+        mcfxPath = os.path.join(folder, 'synthetic.mcfx')
+        print(f'Creating {args.files} photos of {args.file_megabytes} MB in {mcfxPath}')
+        createSyntheticMcfx(mcfxPath, args.files, args.file_megabytes)
+        for method in ('fetchall', 'streaming', 'one-photo'):
+            outputPath = os.path.join(folder, method)
+            subprocess.run([sys.executable, __file__, '--child', method, mcfxPath, outputPath],
+                           check=True, stderr=subprocess.DEVNULL)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,245 @@
+"""Create synthetic albums of any size for the benchmarks.
+
+The album is built from the testShadows album, whose covers, product and
+page size it keeps, with as many normal pages as asked for. Each spread of
+two pages is filled with photos of the requested size in megapixels, a text
+area and a clipart area, and the photos may have shadows, rounded corners and
+a passepartout. The fonts, clipart and passepartout come from the test
+resources, named by a cewe2pdf.ini written beside the album.
+
+    python benchmarks/syntheticAlbum.py --pages 26 --photos-per-page 4 --megapixels 12 /tmp/bench
+
+creates /tmp/bench/synthetic.mcf, or synthetic.mcfx with --format mcfx.
+"""
+
+import argparse
+import copy
+import math
+import os
+import sqlite3
+import sys
+from dataclasses import dataclass
+from pathlib import Path
+
+from lxml import etree
+from PIL import Image, ImageOps
+
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+TEMPLATE_ALBUM = PROJECT_ROOT / 'tests' / 'testShadows' / 'test_shadows.mcf'
+
+# A spread of two pages in the template album, in mcf units
+SPREAD_WIDTH = 4100
+SPREAD_HEIGHT = 2700
+PAGE_MARGIN = 100
+
+# In tests/Resources/photofun/decorations
+CLIPART_ID = '12345'
+PASSEPARTOUT_ID = '127517'
+
+TEXT_HTML = (
+    '<html><head><meta name="qrichtext" content="1" /><meta charset="utf-8" /></head>'
+    '<body style=" font-family:\'Poppins\'; font-size:18pt; font-weight:400; font-style:normal;">'
+    '<p align="center"><span style=" color:#000000;">{text}</span></p></body></html>')
+
+
+@dataclass(frozen=True)
+class AlbumFeatures:
+    """The optional kinds of content on each page of a synthetic album."""
+
+    text: bool = True
+    clipart: bool = True
+    shadows: bool = True
+    corners: bool = True
+    passepartouts: bool = True
+
+
+def createPhoto(fileName, megapixels, seed):
+    """Write a JPEG photo of about megapixels, in a 3:2 landscape shape, which compresses like a real one."""
+    height = max(2, round(math.sqrt(megapixels * 1e6 / 1.5)))
+    width = round(height * 1.5)
+    # A smooth gradient with fine noise is neither trivially small nor incompressible
+    gradient = Image.linear_gradient('L').resize((width, height)).rotate(seed * 37 % 360)
+    noise = Image.effect_noise((width, height), 24 + seed % 16)
+    photo = Image.merge('RGB', (gradient, noise, ImageOps.invert(gradient)))
+    photo.save(fileName, 'JPEG', quality=90)
+    return width, height
+
+
+def _photoPositions(photosPerPage):
+    """Return (left, top, width, height) of each photo in a grid on one page of a spread."""
+    columns = math.ceil(math.sqrt(photosPerPage))
+    rows = math.ceil(photosPerPage / columns)
+    # Leave room for a text area above the photos
+    gridTop = 4 * PAGE_MARGIN
+    cellWidth = (SPREAD_WIDTH / 2 - 2 * PAGE_MARGIN) / columns
+    cellHeight = (SPREAD_HEIGHT - gridTop - PAGE_MARGIN) / rows
+    return [(PAGE_MARGIN + (index % columns) * cellWidth, gridTop + (index // columns) * cellHeight,
+             cellWidth - PAGE_MARGIN, cellHeight - PAGE_MARGIN)
+            for index in range(photosPerPage)]
+
+
+def _addPosition(area, left, top, width, height, zposition):
+    etree.SubElement(area, 'position', height=f'{height:.2f}', left=f'{left:.2f}', rotation='0',
+                     top=f'{top:.2f}', width=f'{width:.2f}', zposition=str(zposition))
+
+
+def _imageArea(fileName, photoSize, position, zposition, features, withPassepartout):
+    left, top, width, height = position
+    area = etree.Element('area', areatype='imagearea')
+    _addPosition(area, left, top, width, height, zposition)
+    if withPassepartout:
+        etree.SubElement(area, 'designElementIDs', passepartout=PASSEPARTOUT_ID)
+    decoration = etree.SubElement(area, 'decoration')
+    if features.shadows:
+        etree.SubElement(decoration, 'shadow', shadowAngle='30', shadowBlurNew='4', shadowDistance='40',
+                         shadowEnabled='1', shadowIntensity='128', shadowWidthInMM='0')
+    if features.corners:
+        corners = etree.SubElement(decoration, 'corners', enabled='yes')
+        for where in ('bottom-right', 'top-right', 'top-left', 'bottom-left'):
+            etree.SubElement(corners, 'corner', length='100', shape='convex', where=where)
+    image = etree.SubElement(area, 'image', filename=f'safecontainer:/{fileName}', useABK='1')
+    if withPassepartout:
+        image.set('passepartoutDesignElementId', PASSEPARTOUT_ID)
+    scale = max(width / photoSize[0], height / photoSize[1])
+    etree.SubElement(image, 'cutout', left='0', scale=f'{scale:.6f}', top='0')
+    return area
+
+
+def _textArea(templateTextArea, text, left, zposition):
+    area = copy.deepcopy(templateTextArea)
+    area.remove(area.find('position'))
+    _addPosition(area, left, PAGE_MARGIN, SPREAD_WIDTH / 2 - 2 * PAGE_MARGIN, 2 * PAGE_MARGIN, zposition)
+    area.insert(0, area[-1])    # position first, as the editor writes it
+    area.find('text').text = etree.CDATA(TEXT_HTML.format(text=text))
+    return area
+
+
+def _clipartArea(left, zposition):
+    area = etree.Element('area', areatype='clipartarea')
+    _addPosition(area, left, PAGE_MARGIN, 2 * PAGE_MARGIN, 2 * PAGE_MARGIN, zposition)
+    etree.SubElement(area, 'designElementIDs', clipart=CLIPART_ID)
+    etree.SubElement(area, 'decoration')
+    clipart = etree.SubElement(area, 'clipart', designElementId=CLIPART_ID)
+    etree.SubElement(clipart, 'ClipartConfiguration', applySpotColor='1')
+    return area
+
+
+def createSyntheticAlbum(folder, pages=26, photosPerPage=4, megapixels=2.0, mcfx=False,
+                         features=AlbumFeatures()):
+    """Write a synthetic album and its cewe2pdf.ini to folder, and return the album's file name.
+
+    pages is rounded up to an even number of normal pages, as the editor
+    makes them. An .mcf album keeps its photos in a folder beside it; an
+    .mcfx album holds them in its database.
+    """
+    os.makedirs(folder, exist_ok=True)
+    pages += pages % 2
+    imageFolder = 'synthetic_mcf-Dateien'
+    photoFolder = os.path.join(folder, imageFolder)
+    os.makedirs(photoFolder, exist_ok=True)
+
+    parser = etree.XMLParser(strip_cdata=False)
+    fotobook = etree.parse(str(TEMPLATE_ALBUM), parser).getroot()
+    fotobook.set('imagedir', '' if mcfx else imageFolder)
+    fotobook.find('articleConfig').set('normalpages', str(pages))
+    fotobook.find('articleConfig').set('totalpages', str(pages + 5))
+    templateTextArea = fotobook.find("page[@type='fullcover']/area[@areatype='textarea']")
+    normalPages = fotobook.findall("page[@type='normalpage']")
+    templatePage = copy.deepcopy(normalPages[0])
+    for area in templatePage.findall('area'):
+        templatePage.remove(area)
+    insertAt = fotobook.index(normalPages[0])
+    for page in normalPages:
+        fotobook.remove(page)
+
+    photoNames = []
+    positions = _photoPositions(photosPerPage)
+    for pageNumber in range(1, pages + 1):
+        page = copy.deepcopy(templatePage)
+        page.set('pagenr', str(pageNumber))
+        # Each even page element holds the areas of its whole spread
+        if pageNumber % 2 == 0:
+            zposition = 100
+            for half in (0, SPREAD_WIDTH / 2):
+                for left, top, width, height in positions:
+                    fileName = f'photo{len(photoNames):05}.jpg'
+                    photoSize = createPhoto(os.path.join(photoFolder, fileName), megapixels, len(photoNames))
+                    photoNames.append(fileName)
+                    page.append(_imageArea(fileName, photoSize, (half + left, top, width, height), zposition,
+                                           features, features.passepartouts and zposition % 2 == 0))
+                    zposition += 1
+                if features.text:
+                    page.append(_textArea(templateTextArea, f'Page {pageNumber + (half > 0)}',
+                                          half + PAGE_MARGIN, zposition))
+                    zposition += 1
+                if features.clipart:
+                    page.append(_clipartArea(half + SPREAD_WIDTH / 2 - 3 * PAGE_MARGIN, zposition))
+                    zposition += 1
+        fotobook.insert(insertAt + pageNumber - 1, page)
+
+    relationships = fotobook.find('fotoRelationships')
+    for foto in relationships.findall('foto'):
+        relationships.remove(foto)
+    for fileName in photoNames:
+        etree.SubElement(relationships, 'foto', id=f'safecontainer:/{fileName}')
+    mcfContent = etree.tostring(fotobook, xml_declaration=True, encoding='UTF-8')
+
+    with open(os.path.join(folder, 'cewe2pdf.ini'), 'w', encoding='utf-8') as iniFile:
+        iniFile.write('[DEFAULT]\n'
+                      f'cewe_folder = {PROJECT_ROOT / "tests"}\n'
+                      f'hpsFolder = {PROJECT_ROOT / "tests" / "hps"}\n')
+
+    if not mcfx:
+        albumName = os.path.join(folder, 'synthetic.mcf')
+        with open(albumName, 'wb') as albumFile:
+            albumFile.write(mcfContent)
+        return albumName
+
+    albumName = os.path.join(folder, 'synthetic.mcfx')
+    if os.path.exists(albumName):
+        os.remove(albumName)
+    connection = sqlite3.connect(albumName)
+    try:
+        connection.execute('CREATE TABLE Files (Filename TEXT, Data BLOB, LastModified INTEGER)')
+        connection.execute('INSERT INTO Files VALUES (?, ?, ?)', ('data.mcf', mcfContent, 0))
+        for fileName in photoNames:
+            photoFileName = os.path.join(photoFolder, fileName)
+            with open(photoFileName, 'rb') as photoFile:
+                connection.execute('INSERT INTO Files VALUES (?, ?, ?)', (fileName, photoFile.read(), 0))
+            os.remove(photoFileName)
+        connection.commit()
+    finally:
+        connection.close()
+    os.rmdir(photoFolder)
+    return albumName
+
+
+def addAlbumArguments(parser):
+    """Add the options which describe a synthetic album to an argument parser."""
+    parser.add_argument('--pages', type=int, default=26, help='Number of normal pages')
+    parser.add_argument('--photos-per-page', type=int, default=4, help='Number of photos on each page')
+    parser.add_argument('--megapixels', type=float, default=2.0, help='Size of each photo')
+    parser.add_argument('--format', choices=('mcf', 'mcfx'), default='mcf', help='Album file format')
+    for feature in ('text', 'clipart', 'shadows', 'corners', 'passepartouts'):
+        parser.add_argument(f'--no-{feature}', dest=feature, action='store_false',
+                            help=f'Leave out the {feature} of each page')
+
+
+def albumFeatures(args):
+    """Return the AlbumFeatures chosen by the options of addAlbumArguments."""
+    return AlbumFeatures(args.text, args.clipart, args.shadows, args.corners, args.passepartouts)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    addAlbumArguments(parser)
+    parser.add_argument('folder', help='Folder for the album, its photos and its cewe2pdf.ini')
+    args = parser.parse_args()
+    albumName = createSyntheticAlbum(args.folder, args.pages, args.photos_per_page, args.megapixels,
+                                     args.format == 'mcfx', albumFeatures(args))
+    print(albumName)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
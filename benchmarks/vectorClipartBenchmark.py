@@ -0,0 +1,100 @@
+"""Measure clipart drawn as vectors against clipart rasterised, in time and PDF size.
+
+With clipartVectors = True a clipart is copied into the PDF as the paths which
+cairo draws, rather than rasterised at pdfImageResolution. Each clipart of the
+tests which can be drawn as vectors is drawn both ways on a PDF page of its own,
+across the width of an A4 page as a decorative page frame would be, keeping its
+shape, and the time and the size of the saved PDF are totalled.
+
+    python benchmarks/vectorClipartBenchmark.py --resolution 150 300
+
+Recorded on Linux, Python 3.11, one CPU, for the 21 of 24 cliparts which can
+be drawn as vectors, each drawn once:
+
+    resolution   raster time   raster size   vector time   vector size
+    150             6879 ms       1.39 MB        355 ms       0.12 MB
+    300            28416 ms       3.33 MB        357 ms       0.12 MB
+
+The time of a vector clipart does not depend on the resolution. Most of it is
+cairo drawing the SVG twice, to a PDF and to the small raster image which
+shows whether the area's alpha applies, and reading the PDF back.
+"""
+
+import argparse
+import sys
+import time
+from io import BytesIO
+from pathlib import Path
+
+from reportlab.lib.pagesizes import A4
+from reportlab.pdfgen import canvas
+
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(PROJECT_ROOT))
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+# pylint: disable-next=wrong-import-position
+from clipartRasterBenchmark import loadTestCliparts  # noqa: E402
+# pylint: disable-next=wrong-import-position
+from conversionState import ConversionState  # noqa: E402
+# pylint: disable-next=wrong-import-position
+from imageUtils import drawEncodedImage  # noqa: E402
+# pylint: disable-next=wrong-import-position
+from vectorClipart import createVectorClipart, drawVectorClipart  # noqa: E402
+
+
+def clipartHeight(vectorClipart):
+    """The height of the clipart drawn across the width of the page, keeping its shape."""
+    left, bottom, right, top = vectorClipart.bounding_box
+    return A4[0] * (top - bottom) / (right - left)
+
+
+def drawRaster(pdf, clipart, vectorClipart, resolution, state):
+    height = clipartHeight(vectorClipart)
+    clipart.pngMemFile = BytesIO()
+    clipart.convertToPngInBuffer(round(A4[0] * resolution / 72), round(height * resolution / 72), 255)
+    drawEncodedImage(pdf, clipart.pngMemFile.getvalue(), 0, 0, A4[0], height, state, mask='auto')
+
+
+def drawVector(pdf, clipart, _vectorClipart, _resolution, state):
+    vectorClipart = createVectorClipart(clipart)
+    drawVectorClipart(pdf, vectorClipart, 0, 0, A4[0], clipartHeight(vectorClipart), 255, False, False, state)
+
+
+def measure(draw, cliparts, resolution):
+    """Draw each clipart on a page of its own and return the milliseconds and the bytes of the PDF.
+
+    The vector clipart made beforehand only gives the shape of each clipart;
+    drawVector makes it again, as a conversion does the first time it is drawn.
+    """
+    output = BytesIO()
+    pdf = canvas.Canvas(output, pagesize=A4)
+    state = ConversionState()
+    startTime = time.perf_counter()
+    for clipart, vectorClipart in cliparts:
+        draw(pdf, clipart, vectorClipart, resolution, state)
+        pdf.showPage()
+    pdf.save()
+    return 1000 * (time.perf_counter() - startTime), len(output.getvalue())
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--resolution', type=int, nargs='+', default=[150, 300],
+                        help='pdfImageResolution of the rasterised clipart')
+    args = parser.parse_args()
+
+    cliparts = [(clipart, createVectorClipart(clipart)) for clipart in loadTestCliparts()]
+    cliparts = [(clipart, vectorClipart) for clipart, vectorClipart in cliparts if vectorClipart is not None]
+    print(f'{len(cliparts)} cliparts which can be drawn as vectors')
+    print(f"{'resolution':<12} {'raster time':>12} {'raster size':>12} {'vector time':>12} {'vector size':>12}")
+    for resolution in args.resolution:
+        rasterTime, rasterSize = measure(drawRaster, cliparts, resolution)
+        vectorTime, vectorSize = measure(drawVector, cliparts, resolution)
+        print(f'{resolution:<12} {rasterTime:>9.0f} ms {rasterSize / 1e6:>9.2f} MB '
+              f'{vectorTime:>9.0f} ms {vectorSize / 1e6:>9.2f} MB')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -76,6 +76,7 @@ import os.path
 import os
 
 import argparse  # to parse arguments
+import multiprocessing
 
 import reportlab.lib.pagesizes
 # from reportlab.pdfbase.pdfmetrics import stringWidth as _stringWidth
@@ -85,6 +86,8 @@ import PIL
 
 from packaging.version import parse as parse_version
 from albumConversionSession import AlbumConversionSession
+from conversionProfile import ConversionProfile
+from conversionServer import DEFAULT_SERVER_PORT, ServerSettings, serveConversions
 from pageElements import processElements
 from windowsIntegration import (confirmInstallation, installWindowsIntegration,
                                 isWindowsFrozenExecutable, showMessage,
@@ -115,14 +118,6 @@ if getattr(sys, 'frozen', False) and hasattr(sys, '_MEIPASS'):
             os.environ["PATH"] += os.pathsep
         os.environ["PATH"] += dllpath
 
-# make it possible for PIL.Image to open .heic files if the album editor stores them directly
-# ref https://github.com/bash0/cewe2pdf/issues/130
-try:
-    from pillow_heif import register_heif_opener # the absence of heif handling is handled so pylint: disable=import-error
-    register_heif_opener()
-except ModuleNotFoundError as heifex:
-    logging.warning(f"{heifex.msg}: direct use of .heic images is not available without pillow_heif available")
-
 # ### settings ####
 image_res = 150  # dpi  The resolution of normal images will be reduced to this value, if it is higher.
 bg_res = 150  # dpi The resolution of background images will be reduced to this value, if it is higher.
@@ -136,15 +131,55 @@ mcf2rl = reportlab.lib.pagesizes.mm/10 # == 72/254, converts from mcf (unit=0.1m
 
 
 def convertMcf(albumname, keepDoublePages: bool, pageNumbers=None, mcfxTmpDir=None,
-               appDataDir=None, outputFileName=None, automaticWindows=False):
-    """Convert one MCF or MCFX album while preserving the established API."""
+               appDataDir=None, outputFileName=None, automaticWindows=False, jobs=1, profile=None):
+    """Convert one MCF or MCFX album while preserving the established API.
+
+    profile, a conversionProfile.ConversionProfile, reports where the time went.
+    """
     with AlbumConversionSession(
             albumname, keepDoublePages, pageNumbers, mcfxTmpDir, appDataDir,
             outputFileName, mcf2rl, image_quality, pil_antialias,
-            automaticWindows) as session:
+            automaticWindows, jobs, profile=profile) as session:
         return session.render(processElements)
 
 
+def _parsePageNumbers(pagesText):
+    """Return the page numbers given by --pages, e.g. 1,2,4-9, exiting if they are invalid."""
+    pages = []
+    for expr in pagesText.split(','):
+        expr = expr.strip()
+        if expr.isnumeric():
+            pages.append(int(expr)) # simple number "23"
+        elif expr.find('-') > -1:
+            # page range: 23-42
+            fromTo = expr.split('-', 2)
+            if not fromTo[0].isnumeric() or not fromTo[1].isnumeric():
+                logging.error(f'Invalid page range: {expr}')
+                sys.exit(1)
+            pageFrom = int(fromTo[0])
+            pageTo = int(fromTo[1])
+            if pageTo < pageFrom:
+                logging.error(f'Invalid page range: {expr}')
+                sys.exit(1)
+            pages = pages + list(range(pageFrom, pageTo + 1))
+        else:
+            logging.error(f'Invalid page number: {expr}')
+            sys.exit(1)
+    return pages
+
+
+def _jobsAndProfileFromArgs(parser, args):
+    """Return the number of page worker processes and the ConversionProfile, or None, asked for by --jobs and --profile."""
+    if args.jobs < 1:
+        parser.error('--jobs must be at least 1.')
+    profile = None
+    if args.profile or args.profileStats or args.profileTrace:
+        profile = ConversionProfile(
+            os.path.abspath(args.profileStats) if args.profileStats else None,
+            os.path.abspath(args.profileTrace) if args.profileTrace else None)
+    return args.jobs, profile
+
+
 def collectArgsAndConvert():
     class CustomArgFormatter(argparse.ArgumentDefaultsHelpFormatter, argparse.RawDescriptionHelpFormatter):
         pass
@@ -164,16 +199,30 @@ def collectArgsAndConvert():
             'If you want the front cover, then ask for page 0. Asking for the back cover explicitly will not work!')
     parser.add_argument('--tmp-dir', dest='mcfxTmp', action='store',
                         default=None,
-                        help='Directory for .mcfx file extraction')
+                        help='Directory for .mcfx file extraction. Without it, the images are read directly from the .mcfx file')
     parser.add_argument('--appdata-dir', dest='appData',
                         default=None,
                         help='Directory for persistent app data, eg ttf fonts converted from otf fonts')
+    parser.add_argument('--jobs', dest='jobs', type=int, default=1,
+                        help='Number of worker processes used to render pages. '
+                             'Values above 1 render the pages in parallel and then merge them into one pdf.')
+    parser.add_argument('--profile', action='store_true',
+                        help='Report the time spent in each stage of the conversion, and on each page')
+    parser.add_argument('--profile-stats', dest='profileStats', default=None,
+                        help='With --profile, also run the conversion under cProfile and write its pstats to this file')
+    parser.add_argument('--profile-trace', dest='profileTrace', default=None,
+                        help='With --profile, also write the stages as a Chrome trace-event JSON file, '
+                             'for chrome://tracing or https://ui.perfetto.dev')
     parser.add_argument('--version', action='version',
                         version=getVersionInformationText(),
                         help='Show version and build identification, then exit')
     parser.add_argument('--outFile', dest='outFile',
                         default=None,
                         help="The name of the output file, rather than the default <inputFile>.pdf")
+    parser.add_argument('--serve', action='store_true',
+                        help='Keep running, converting the albums posted as JSON to http://127.0.0.1:PORT/convert')
+    parser.add_argument('--port', dest='port', type=int, default=DEFAULT_SERVER_PORT,
+                        help='The localhost port used by --serve')
     parser.add_argument('--install', action='store_true',
                         help='Windows executable: install an Explorer right-click command for MCF and MCFX files.')
     parser.add_argument('--uninstall', action='store_true',
@@ -215,6 +264,11 @@ def collectArgsAndConvert():
     if args.automatic and os.name != 'nt':
         parser.error('--automatic is reserved for the Windows Explorer command.')
 
+    if args.serve:
+        if args.inputFile is not None:
+            parser.error('--serve converts the albums posted to it, rather than an input file.')
+        return serveConversions(ServerSettings(mcf2rl, image_quality, pil_antialias, processElements), args.port)
+
     if args.inputFile is None:
         if isWindowsFrozenExecutable():
             if confirmInstallation():
@@ -240,28 +294,11 @@ def collectArgsAndConvert():
         parser.parse_args(['-h'])
         sys.exit(1)
 
+    jobs, profile = _jobsAndProfileFromArgs(parser, args)
+
     pages = None
     if args.pages is not None:
-        pages = []
-        for expr in args.pages.split(','):
-            expr = expr.strip()
-            if expr.isnumeric():
-                pages.append(int(expr)) # simple number "23"
-            elif expr.find('-') > -1:
-                # page range: 23-42
-                fromTo = expr.split('-', 2)
-                if not fromTo[0].isnumeric() or not fromTo[1].isnumeric():
-                    logging.error(f'Invalid page range: {expr}')
-                    sys.exit(1)
-                pageFrom = int(fromTo[0])
-                pageTo = int(fromTo[1])
-                if pageTo < pageFrom:
-                    logging.error(f'Invalid page range: {expr}')
-                    sys.exit(1)
-                pages = pages + list(range(pageFrom, pageTo + 1))
-            else:
-                logging.error(f'Invalid page number: {expr}')
-                sys.exit(1)
+        pages = _parsePageNumbers(args.pages)
 
     mcfxTmp = None
     if args.mcfxTmp is not None:
@@ -278,7 +315,7 @@ def collectArgsAndConvert():
     # convert the file
     result = convertMcf(
         args.inputFile, args.keepDoublePages, pages, mcfxTmp, appData,
-        outputFileName=outFile, automaticWindows=args.automatic)
+        outputFileName=outFile, automaticWindows=args.automatic, jobs=jobs, profile=profile)
     if args.automatic and result:
         outputName = outFile or os.path.abspath(args.inputFile + '.pdf')
         logName = os.path.abspath(args.inputFile + '.log')
@@ -289,5 +326,8 @@ def collectArgsAndConvert():
 
 if __name__ == '__main__':
     # only executed when this file is run directly.
+    # The frozen Windows executable must recognise a page worker process
+    # started by --jobs before it parses any arguments.
+    multiprocessing.freeze_support()
     # we need trick to have both: default and fixed formats.
     resultFlag = collectArgsAndConvert()
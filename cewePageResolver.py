@@ -9,6 +9,7 @@ background: :mod:`pages` consumes the resolved pages and performs rendering.
 from dataclasses import dataclass
 import logging
 from math import floor
+from pathlib import PurePath
 from typing import Any, Iterator
 
 from ceweInfo import AlbumInfo
@@ -157,3 +158,65 @@ def resolvePages(fotobook, productStyle, pageCount, pageNumbers=None) -> Iterato
         yield ResolvedPage(getPageElementForPageNumber(fotobook, number), number,
                            PageProcessingType.RegularPage, isOddPage(number),
                            lastPage, number)
+
+
+def collectReferencedFileNames(fotobook, resolvedPages, productStyle, imageDirectory) -> set[str]:
+    """Return the album files named by the image areas of the resolved pages.
+
+    The names are relative to the album's base folder, as an MCFX file
+    stores them.  An odd album page draws the areas of the preceding even page
+    element, so that element is searched as well.
+    """
+    fileNames = set()
+    for resolvedPage in resolvedPages:
+        elements = [resolvedPage.element]
+        if (AlbumInfo.isAlbumProduct(productStyle)
+                and resolvedPage.page_type == PageProcessingType.RegularPage and resolvedPage.odd_page):
+            elements.append(fotobook.find(f"./page[@pagenr='{2 * floor(resolvedPage.page_number / 2)}']"))
+        for element in elements:
+            if element is None:
+                continue
+            for imageTag in element.iter('image', 'imagebackground'):
+                fileName = imageTag.get('filename')
+                if fileName is not None:
+                    # As in imageareas, a safecontainer file is in the album's own folder
+                    fileName = fileName.replace('safecontainer:/', '')
+                    fileNames.add(PurePath(imageDirectory or '', fileName).as_posix())
+    return fileNames
+
+
+def finishesPdfPage(resolvedPage: ResolvedPage, productStyle, pageCount) -> bool:
+    """Return True when rendering *resolvedPage* completes its PDF page.
+
+    Several resolved pages can share one PDF canvas page: the front
+    inside-cover background and its elements, the final ordinary page and the
+    back inside cover, and the two halves of a double-page spread.
+    """
+    if resolvedPage.page_type == PageProcessingType.FrontInsideCoverBackground:
+        return False
+    if not resolvedPage.finish_page:
+        return False
+    if not AlbumInfo.isAlbumProduct(productStyle) or AlbumInfo.isAlbumSingleSide(productStyle):
+        return True
+    return resolvedPage.odd_page or (
+        resolvedPage.page_type == PageProcessingType.Cover and
+        resolvedPage.source_number != pageCount - 1)
+
+
+def groupResolvedPagesByPdfPage(resolvedPages, productStyle, pageCount) -> list[list[ResolvedPage]]:
+    """Group resolved pages which are drawn on the same PDF page.
+
+    Each group can be rendered independently of the others, for example in a
+    separate process.  A trailing group which is never finished is retained:
+    the serial renderer also emits that partly drawn page when it saves.
+    """
+    groups = []
+    currentGroup = []
+    for resolvedPage in resolvedPages:
+        currentGroup.append(resolvedPage)
+        if finishesPdfPage(resolvedPage, productStyle, pageCount):
+            groups.append(currentGroup)
+            currentGroup = []
+    if currentGroup:
+        groups.append(currentGroup)
+    return groups
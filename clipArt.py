@@ -12,32 +12,42 @@ from extraLoggers import configlogger
 from pathutils import findFileInDirs
 
 
-def loadClipart(fileName, clipartPathList) -> ClpFile:
-    """Tries to load a clipart file. Either from .CLP or .SVG file
-    returns a clpFile object"""
-    newClpFile = ClpFile("")
-
+def findClipartFile(fileName, clipartPathList) -> Path | None:
+    """Return the .clp or .SVG file of a clipart, or None if there is none"""
     if os.path.isabs(fileName):
         filePath = Path(fileName)
         if not filePath.exists():
             filePath = filePath.parent.joinpath(filePath.stem+".clp")
             if not filePath.exists():
                 logging.error(f"Missing .clp: {fileName}")
-                return ClpFile("")   # return an empty ClpFile
-    else:
-        pathObj = Path(fileName)
-        # the name can actually be "correct", but its stem may not be in the clipartPathList. This will
-        # happen at least for passepartout clip masks when we're using a local test hps structure rather
-        # than an installed cewe_folder. For that reason we add the file's own folder to the clipartPathList
-        # before searching for a clp or svg file matching the stem
-        baseFileName = pathObj.stem
-        fileFolder = pathObj.parent
-        try:
-            filePath = findFileInDirs([baseFileName+'.clp', baseFileName+'.svg'], (fileFolder,) + clipartPathList)
-            filePath = Path(filePath)
-        except Exception as ex: # pylint: disable=broad-exception-caught
-            logging.error(f" {baseFileName}, {ex}")
-            return ClpFile("")   # return an empty ClpFile
+                return None
+        return filePath
+
+    pathObj = Path(fileName)
+    # the name can actually be "correct", but its stem may not be in the clipartPathList. This will
+    # happen at least for passepartout clip masks when we're using a local test hps structure rather
+    # than an installed cewe_folder. For that reason we add the file's own folder to the clipartPathList
+    # before searching for a clp or svg file matching the stem
+    baseFileName = pathObj.stem
+    fileFolder = pathObj.parent
+    try:
+        return Path(findFileInDirs([baseFileName+'.clp', baseFileName+'.svg'], (fileFolder,) + clipartPathList))
+    except Exception as ex: # pylint: disable=broad-exception-caught
+        logging.error(f" {baseFileName}, {ex}")
+        return None
+
+
+def loadClipart(fileName, clipartPathList) -> ClpFile:
+    """Tries to load a clipart file. Either from .CLP or .SVG file
+    returns a clpFile object"""
+    return loadClipartFile(findClipartFile(fileName, clipartPathList))
+
+
+def loadClipartFile(filePath) -> ClpFile:
+    """Load a clipart file found by findClipartFile, returning an empty ClpFile if there is none"""
+    newClpFile = ClpFile("")
+    if filePath is None:
+        return newClpFile   # return an empty ClpFile
 
     if filePath.suffix == '.clp':
         newClpFile.readClp(filePath)
@@ -67,7 +77,7 @@ def getClipConfig(Element):
     return colorreplacements, flipX, flipY
 
 
-def readClipArtConfigXML(baseFolder, keyaccountFolder, clipartDict):
+def readClipArtConfigXML(baseFolder, keyaccountFolder, clipartDict, resourceCatalogue=None):
     """Parse the configuration XML file and generate a dictionary of designElementId to fileName
     currently only cliparts_default.xml is supported !"""
     # A conversion without CEWE resources simply has no delivered clipart
@@ -76,6 +86,34 @@ def readClipArtConfigXML(baseFolder, keyaccountFolder, clipartDict):
         return tuple()
 
     clipartPathList = CeweInfo.getBaseClipartLocations(baseFolder) # append instead of overwrite global variable
+    if resourceCatalogue is None:
+        clipartIndex = buildClipartIndex(baseFolder, keyaccountFolder, clipartPathList)
+    else:
+        catalogueFolders = clipartPathList + (CeweInfo.getCeweDecorationsFolder(baseFolder),)
+        if keyaccountFolder is not None:
+            catalogueFolders += (os.path.join(keyaccountFolder, "addons"),
+                                 os.path.join(keyaccountFolder, 'photofun', 'decorations'))
+        clipartIndex = resourceCatalogue.getIndex(
+            'clipart', catalogueFolders,
+            lambda: buildClipartIndex(baseFolder, keyaccountFolder, clipartPathList))
+        configlogger.info(f'The resource catalogue listed {len(clipartIndex)} cliparts')
+    clipartDict.update((int(designElementId), fileName) for designElementId, fileName in clipartIndex.items())
+
+    if keyaccountFolder is None:
+        # In "production" this is definitely an error, although for unit tests (in particular when
+        # run on the checkin build where CEWE is not installed and there is definitely no downloaded
+        # stuff from the installation) it isn't really an error because there is a local folder
+        # tests/Resources/photofun/decorations with the clipart files needed for the tests.
+        configlogger.error("No downloaded clipart folder found")
+    elif len(clipartDict) == 0:
+        configlogger.error('No cliparts found')
+
+    return clipartPathList
+
+
+def buildClipartIndex(baseFolder, keyaccountFolder, clipartPathList):
+    """Read the CEWE and key account clipart XML files into a new dictionary of designElementId to fileName."""
+    clipartDict = {}
     xmlConfigFileName = 'cliparts_default.xml'
     try:
         xmlFileName = findFileInDirs(xmlConfigFileName, clipartPathList)
@@ -100,12 +138,7 @@ def readClipArtConfigXML(baseFolder, keyaccountFolder, clipartDict):
             configlogger.error('No clipart xmls found, no delivered cliparts will be available.')
 
     if keyaccountFolder is None:
-        # In "production" this is definitely an error, although for unit tests (in particular when
-        # run on the checkin build where CEWE is not installed and there is definitely no downloaded
-        # stuff from the installation) it isn't really an error because there is a local folder
-        # tests/Resources/photofun/decorations with the clipart files needed for the tests.
-        configlogger.error("No downloaded clipart folder found")
-        return clipartPathList
+        return clipartDict
 
     # from (at least) 7.3.4 the addon cliparts might be in more than one structure, so ... first the older layout
     addonclipartxmls = os.path.join(keyaccountFolder, "addons", "*", "cliparts", "v1", "decorations", "*.xml")
@@ -123,10 +156,7 @@ def readClipArtConfigXML(baseFolder, keyaccountFolder, clipartDict):
     if numberClipartsLocated > 0:
         configlogger.info(f'{numberClipartsLocated} local clipart xmls found')
 
-    if len(clipartDict) == 0:
-        configlogger.error('No cliparts found')
-
-    return clipartPathList
+    return clipartDict
 
 
 def loadClipartConfigXML(xmlFileName, clipartDict):
@@ -0,0 +1,118 @@
+"""Cache of the rasterised clipart drawn during a conversion.
+
+A themed album puts the same ornament or frame on many pages.  Without a
+cache each of them read and decoded the .clp file, replaced its colours and
+rasterised the SVG again.  :class:`ClipartCache` keeps the finished PNG of
+each clipart, colour replacement, pixel size, alpha and mirroring in a small
+least-recently-used store, so a repeated clipart costs one dictionary lookup.
+When the image cache is enabled the PNG is also stored there, so that the
+clipart of an album converted again is not rasterised at all.
+
+With clipartVectors the cache keeps instead the page description of each
+clipart and colour replacement, which is scaled, mirrored and made transparent
+when it is drawn, or None for a clipart which must be rasterised after all.
+"""
+
+from collections import OrderedDict
+import logging
+
+from clipArt import findClipartFile, loadClipartFile
+from configUtils import getConfigurationInt
+from vectorClipart import createVectorClipart
+
+# Increase this when a change to clipart rasterisation alters the pixels
+# stored for unchanged parameters, so that old image cache entries are no longer found.
+CLIPART_CACHE_VERSION = 1
+
+
+class ClipartCache:
+    """Encoded clipart images for one conversion, optionally backed by the image cache."""
+
+    def __init__(self, maxEntries, imageCache=None):
+        self.max_entries = maxEntries
+        self.image_cache = imageCache
+        self.encoded_images = OrderedDict()
+        self.vector_cliparts = OrderedDict()
+
+    @staticmethod
+    def fromConfiguration(configSection, imageCache=None):
+        """Return the clipart cache sized by the clipartCacheEntries setting."""
+        maxEntries = getConfigurationInt(configSection, 'clipartCacheEntries', '32', 0)
+        return ClipartCache(maxEntries, imageCache)
+
+    def getEncodedClipart(self, fileName, clipartPaths, colorReplacements, pixelSize, alpha, flipX, flipY, state):
+        """Return the PNG bytes of a clipart rasterised to pixelSize, or None if it could not be loaded."""
+        cacheKey = (fileName, tuple(colorReplacements), pixelSize, alpha, flipX, flipY)
+        encodedImage = self.encoded_images.get(cacheKey)
+        if encodedImage is not None:
+            self.encoded_images.move_to_end(cacheKey)
+            state.performance_counters['clipart cache hits'] += 1
+            return encodedImage
+
+        state.performance_counters['clipart cache misses'] += 1
+        filePath = findClipartFile(fileName, clipartPaths)
+        if filePath is None:
+            return None
+        imageCacheKey = None
+        if self.image_cache is not None:
+            # The file's content, rather than its name, identifies the clipart between conversions
+            imageCacheKey = self.image_cache.makeKey(
+                'clipart', CLIPART_CACHE_VERSION, self.image_cache.fileSignature(str(filePath)), cacheKey[1:])
+            encodedImage = self.image_cache.load(imageCacheKey)
+            state.performance_counters['clipart image cache hits' if encodedImage is not None
+                                       else 'clipart image cache misses'] += 1
+        if encodedImage is None:
+            encodedImage = self._rasterClipart(filePath, colorReplacements, pixelSize, alpha, flipX, flipY)
+            if encodedImage is None:
+                return None
+            if imageCacheKey is not None:
+                self.image_cache.store(imageCacheKey, 'PNG', encodedImage)
+
+        if self.max_entries > 0:
+            self.encoded_images[cacheKey] = encodedImage
+            while len(self.encoded_images) > self.max_entries:
+                self.encoded_images.popitem(last=False)
+        return encodedImage
+
+    def getVectorClipart(self, fileName, clipartPaths, colorReplacements, state):
+        """Return the VectorClipart of a clipart, or None if it must be rasterised instead."""
+        cacheKey = (fileName, tuple(colorReplacements))
+        if cacheKey in self.vector_cliparts:
+            self.vector_cliparts.move_to_end(cacheKey)
+            state.performance_counters['vector clipart cache hits'] += 1
+            return self.vector_cliparts[cacheKey]
+
+        state.performance_counters['vector clipart cache misses'] += 1
+        vectorClipart = None
+        filePath = findClipartFile(fileName, clipartPaths)
+        clipart = None if filePath is None else self._loadClipart(filePath, colorReplacements)
+        if clipart is not None:
+            vectorClipart = createVectorClipart(clipart)
+            if vectorClipart is None:
+                logging.info(f'Clipart {filePath} cannot be drawn as vectors, so it is rasterised')
+        if vectorClipart is None:
+            state.performance_counters['cliparts rasterised instead of drawn as vectors'] += 1
+
+        if self.max_entries > 0:
+            self.vector_cliparts[cacheKey] = vectorClipart
+            while len(self.vector_cliparts) > self.max_entries:
+                self.vector_cliparts.popitem(last=False)
+        return vectorClipart
+
+    @staticmethod
+    def _loadClipart(filePath, colorReplacements):
+        clipart = loadClipartFile(filePath)
+        if len(clipart.svgData) <= 0:
+            logging.error(f"Clipart file could not be loaded: {filePath}")
+            return None
+        if len(colorReplacements) > 0:
+            clipart.replaceColors(colorReplacements)
+        return clipart
+
+    @staticmethod
+    def _rasterClipart(filePath, colorReplacements, pixelSize, alpha, flipX, flipY):
+        clipart = ClipartCache._loadClipart(filePath, colorReplacements)
+        if clipart is None:
+            return None
+        clipart.convertToPngInBuffer(pixelSize[0], pixelSize[1], alpha, flipX, flipY)
+        return clipart.pngMemFile.getvalue()
@@ -2,15 +2,18 @@
 
 import logging
 
-from reportlab.lib.utils import ImageReader
-
-from clipArt import getClipConfig, loadClipart
+from clipArt import getClipConfig
+from clipartCache import ClipartCache
+from conversionProfile import profiled
+from conversionState import ConversionState
+from imageUtils import drawEncodedImage
 from renderContext import RenderContext
+from vectorClipart import drawVectorClipart
 
 
 def processAreaClipartTag(clipartElement, areaHeight, areaRot, areaWidth, pdf, transx, transy,
                           clipArtDecoration, context: RenderContext,
-                          borderProcessor):
+                          state: ConversionState, borderProcessor):
     """Render one clipart area and its optional border."""
     clipartID = int(clipartElement.get('designElementId'))
     if clipartID == 0:
@@ -28,34 +31,48 @@ def processAreaClipartTag(clipartElement, areaHeight, areaRot, areaWidth, pdf, t
             alpha = int(float(alphaText) * 255)
 
     colorReplacements, flipX, flipY = getClipConfig(clipartElement)
-    insertClipartFile(fileName, colorReplacements, transx, areaWidth, areaHeight, alpha, pdf,
-                      transy, areaRot, flipX, flipY, clipArtDecoration, context, borderProcessor)
+    with profiled(state, 'insertClipartFile'):
+        insertClipartFile(fileName, colorReplacements, transx, areaWidth, areaHeight, alpha, pdf,
+                          transy, areaRot, flipX, flipY, clipArtDecoration, context, state,
+                          borderProcessor)
 
 
 def insertClipartFile(fileName, colorReplacements, transx, areaWidth, areaHeight, alpha, pdf,
                       transy, areaRot, flipX, flipY, decoration, context: RenderContext,
-                      borderProcessor=None):
-    """Rasterise a clipart file and draw it at the supplied area geometry."""
-    newWidth = int(0.5 + areaWidth * context.image_resolution / 254.0)
-    newHeight = int(0.5 + areaHeight * context.image_resolution / 254.0)
-
-    clipart = loadClipart(fileName, context.clipart_paths)
-    if len(clipart.svgData) <= 0:
-        logging.error(f"Clipart file could not be loaded: {fileName}")
-        return
+                      state: ConversionState, borderProcessor=None):
+    """Draw a clipart file at the supplied area geometry, as PDF paths or as a rasterised image."""
+    clipartCache = state.clipart_cache
+    if clipartCache is None:
+        # A state which was not prepared by prepareConversion, as in some tests
+        clipartCache = ClipartCache(0)
+        state.clipart_cache = clipartCache
 
-    if len(colorReplacements) > 0:
-        clipart.replaceColors(colorReplacements)
+    vectorClipart = None
+    if context.clipart_vectors:
+        vectorClipart = clipartCache.getVectorClipart(fileName, context.clipart_paths, colorReplacements, state)
+    if vectorClipart is None:
+        newWidth = int(0.5 + areaWidth * context.image_resolution / 254.0)
+        newHeight = int(0.5 + areaHeight * context.image_resolution / 254.0)
+        encodedImage = clipartCache.getEncodedClipart(fileName, context.clipart_paths, colorReplacements,
+                                                      (newWidth, newHeight), alpha, flipX, flipY, state)
+        if encodedImage is None:
+            return
 
-    clipart.convertToPngInBuffer(newWidth, newHeight, alpha, flipX, flipY)
     logging.debug(f"Clipart file: {fileName}")
     pdf.translate(transx, transy)
     pdf.rotate(-areaRot)
-    pdf.drawImage(ImageReader(clipart.pngMemFile),
-                  context.mcf_to_reportlab * -0.5 * areaWidth,
-                  context.mcf_to_reportlab * -0.5 * areaHeight,
-                  width=context.mcf_to_reportlab * areaWidth,
-                  height=context.mcf_to_reportlab * areaHeight, mask='auto')
+    if vectorClipart is not None:
+        drawVectorClipart(pdf, vectorClipart,
+                          context.mcf_to_reportlab * -0.5 * areaWidth,
+                          context.mcf_to_reportlab * -0.5 * areaHeight,
+                          context.mcf_to_reportlab * areaWidth,
+                          context.mcf_to_reportlab * areaHeight, alpha, flipX, flipY, state)
+    else:
+        drawEncodedImage(pdf, encodedImage,
+                         context.mcf_to_reportlab * -0.5 * areaWidth,
+                         context.mcf_to_reportlab * -0.5 * areaHeight,
+                         context.mcf_to_reportlab * areaWidth,
+                         context.mcf_to_reportlab * areaHeight, state, mask='auto')
     if decoration is not None and borderProcessor is not None:
         borderProcessor(decoration, areaHeight, areaWidth, pdf)
     pdf.rotate(areaRot)
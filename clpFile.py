@@ -2,16 +2,61 @@
 
 # Copyright (c) 2020 by BarchSteel
 
+import binascii
+import functools
 import logging
+import os
 from pathlib import Path
 from io import BytesIO
 import re
-import cairosvg
 import PIL
 from PIL import Image
-# from PIL import ImageOps
+from PIL import ImageOps
 # from PIL.ExifTags import TAGS
 
+# The parsed SVG of this many recently rasterised cliparts is kept, so that a
+# clipart drawn again, in the same colours, is not parsed again
+SVG_TREE_CACHE_SIZE = 32
+
+# The SVG decoded from this many recently read .clp files is kept, so that a
+# clipart or passepartout frame used again is not read and decoded again
+CLP_DECODE_CACHE_SIZE = 64
+
+# The letters after f, which are scattered among the hexadecimal digits of a
+# .clp file, and whitespace, which the text mode reading used to ignore
+_CLP_IGNORED_BYTES = b'ghijklmnopqrstuvwxyz \t\r\n'
+
+
+@functools.lru_cache(maxsize=CLP_DECODE_CACHE_SIZE)
+def decodeClp(fileName: str, modifiedTime: int, fileSize: int) -> bytes: # pylint: disable=unused-argument
+    """Return the SVG data of a .clp file. The file's modification time and size
+       are only part of the key of the cache, so that a changed file is read again."""
+    with open(fileName, "rb") as fileClp:
+        contents = fileClp.read()
+    # check the header
+    if contents[:1] != b'a':
+        raise ValueError(f"A .clp file should start with character 'a', but instead it was: {contents[:1]!r}")
+    # start after the header, remove all invalid characters, and convert the
+    # hexadecimal representation back to the real data
+    return binascii.unhexlify(contents[1:].translate(None, _CLP_IGNORED_BYTES))
+
+
+@functools.lru_cache(maxsize=SVG_TREE_CACHE_SIZE)
+def parseSvg(svgData: bytes):
+    """Return the cairosvg tree of the SVG data. It is not changed by rasterising it."""
+    # cairosvg, and the cairo library it loads, are slow to import and only needed for clipart
+    import cairosvg.parser # pylint: disable=import-outside-toplevel
+    return cairosvg.parser.Tree(bytestring=svgData, unsafe=True)
+
+
+class _SvgSizeReference: # pylint: disable=too-few-public-methods
+    """What cairosvg needs to resolve the units of an SVG's own width and height, as svg2png has."""
+    dpi = 96
+    font_size = 16      # 12pt at 96 dpi
+    context_width = None
+    context_height = None
+
+
 class ClpFile():
     _invalidContent = r"? illegal clp content"
 
@@ -26,28 +71,11 @@ class ClpFile():
     def readClp(self, fileName) -> None:
         """Read a .CLP file and convert it to a .SVG file.
 
-         reads the data into the internal buffer as SVG
-
-         Remarks: The current implementation using immutable strings may not be best.
-           But it should work for typical cliparts with a size of less then a few megabytes."""
+         reads the data into the internal buffer as SVG, decoding each file only once
+         as long as it is unchanged"""
 
-        inFilePath = Path(fileName)
-        # self.nameSavedForDebugging = str(inFilePath)
-        # open and read the whole file to memory
-        contents = ClpFile._invalidContent
-        with open(inFilePath, "rt") as fileClp: # pylint: disable=unspecified-encoding
-            contents = fileClp.read()
-
-        # check the header
-        if contents[0] != 'a':
-            raise ValueError(f"A .clp file should start with character 'a', but instead it was: {contents[0]} ({hex(ord(contents[0]))})")
-        # start after the header and remove all invalid characters
-        invalidChars = 'ghijklmnopqrstuvwxyz'
-        hexData = contents[1:].translate({ord(i): None for i in invalidChars})
-
-        # the string is hexadecimal representation of the real data. Let's convert it back.
-        svgData = bytes.fromhex(hexData)
-        self.svgData = svgData
+        fileStat = os.stat(fileName)
+        self.svgData = decodeClp(str(Path(fileName)), fileStat.st_mtime_ns, fileStat.st_size)
 
     def saveToSVG(self, outfileName):
         """save internal SVG data to a file"""
@@ -61,17 +89,8 @@ class ClpFile():
         scaledImage = self.rasterSvgData(width, height)
 
         if scaledImage.mode == "RGB":
-            # create a mask the same size as the original. For all pixels which are
-            # non zero ("not used") set the mask value to the required transparency
-            # L = 8-bit gray-scale
             # Important: .convert('L') should not be used on RGBA images -> very bad quality. Not supported.
-            alphamask = scaledImage.copy().convert('L').resize(scaledImage.size)
-            pixels = alphamask.load()
-            for i in range(alphamask.size[0]): # for every pixel:
-                for j in range(alphamask.size[1]):
-                    if (pixels[i, j] != 0):
-                        pixels[i, j] = alpha
-            scaledImage.putalpha(alphamask)
+            scaledImage.putalpha(ClpFile.createAlphaMask(scaledImage, alpha))
 
         if flipX:
             scaledImage = scaledImage.transpose(Image.Transpose.FLIP_LEFT_RIGHT)
@@ -82,38 +101,58 @@ class ClpFile():
         self.pngMemFile.seek(0)
         return self
 
+    @staticmethod
+    def createAlphaMask(rgbImage:PIL.Image, alpha:int):
+        """Return an 8-bit gray-scale (L) mask the size of an RGB image, which is alpha
+           wherever the image is not black ("not used"), and 0 where it is black.
+
+           The mapping is a lookup table applied to the whole image at once, rather than
+           a loop over the pixels in Python."""
+        return rgbImage.convert('L').point([0] + [alpha] * 255)
+
     def rasterSvgData(self, width:int, height:int):
 
-        # We are using cairosvg, but this does not allow to scale the output image to the dimensions that we like.
-        # we need to do a two-pass convertion, to get the desired result
-        # 1. Do the first conversion and see what the output size is
+        # cairosvg does not scale the output image to independent width and height, so:
+        # 1. read the size the SVG would have unscaled from its width, height and viewBox
         # 2. calculate the scaling in x-, and y-direction that is needed
         # 3. use the maxium of these x-, and y-scaling and do a aspect-ratio-preserving scaling of the image
-        #    convert the image again from svg to png with this max. scale factor
+        #    convert the image from svg to png with this max. scale factor
         # 4. do a raster-image scaling to skew the image to the final dimension.
         #    This should only scale in x- or y-direction, as the other direction should alread be the desired one.
-
-        # create a byte buffer that can be used like a file and use it as the output of svg2png.
-        tmpMemFile = BytesIO()
-        # Step 1.
-        cairosvg.svg2png(bytestring=self.svgData, write_to=tmpMemFile, unsafe=True)
-        tmpMemFile.seek(0)
-        tempImage = PIL.Image.open(tmpMemFile)
-        origWidth = tempImage.width
-        origHeight = tempImage.height
+        # The unscaled size used to be found by converting the image twice, first without scaling.
+
+        # cairosvg, and the cairo library it loads, are slow to import and only needed for clipart
+        from cairosvg.helpers import node_format # pylint: disable=import-outside-toplevel
+        from cairosvg.surface import PNGSurface # pylint: disable=import-outside-toplevel
+
+        tree = parseSvg(self.svgData)
+        # Step 1. Rounded as PNGSurface rounds the size of its image
+        svgWidth, svgHeight, _ = node_format(_SvgSizeReference, tree)
+        origWidth = int(round(svgWidth))
+        origHeight = int(round(svgHeight))
+        if 0 in (origWidth, origHeight):
+            raise ValueError('The SVG size is undefined')
         # Step 2.
         scale_x = width/origWidth
         scale_y = height/origHeight
         # Step 3.
         scaleMax = max(scale_x, scale_y)
         tmpMemFile = BytesIO()
-        cairosvg.svg2png(bytestring=self.svgData, write_to=tmpMemFile, scale=scaleMax, unsafe=True)
+        PNGSurface(tree, tmpMemFile, _SvgSizeReference.dpi, scale=scaleMax).finish()
         # Step 4.
         tmpMemFile.seek(0)
         tempImage = PIL.Image.open(tmpMemFile)
         scaledImage = tempImage.resize((width, height))
         return scaledImage
 
+    def convertToPdf(self) -> bytes:
+        """Draw the SVG to a one-page PDF of its own size, as cairo draws it, for vector clipart"""
+        # cairosvg, and the cairo library it loads, are slow to import and only needed for clipart
+        from cairosvg.surface import PDFSurface # pylint: disable=import-outside-toplevel
+        pdfMemFile = BytesIO()
+        PDFSurface(parseSvg(self.svgData), pdfMemFile, _SvgSizeReference.dpi).finish()
+        return pdfMemFile.getvalue()
+
     # def convertMaskToPngInBuffer(self, width:int = None, height:int = None):
     #     """convert a loaded mask (.clp, .SVG) to a in-memory PNG file
     #         Use this for the passepartout frames.
@@ -146,13 +185,13 @@ class ClpFile():
             white = PIL.Image.new("RGBA", maskImgPng.size, "WHITE")
             white.paste(maskImgPng, (0, 0), maskImgPng)
             alphaChannel = white.convert('L')
-            alphaChannel = PIL.ImageOps.invert(alphaChannel)
+            alphaChannel = ImageOps.invert(alphaChannel)
         elif maskImgPng.mode == "RGB":
             # convert image to gray-scale and use that as alpha channel.
             # we need to invert, otherwise black whould be transparent.
             # normally the whole image is a black rectangle
             alphaChannel = maskImgPng.convert('L')
-            alphaChannel = PIL.ImageOps.invert(alphaChannel)
+            alphaChannel = ImageOps.invert(alphaChannel)
 
         # apply it the input photo. They must have the same dimensions. But that is ensured by rasterSvgData
         if (photo.mode != "RGB") or (photo.mode != "RGBA"):
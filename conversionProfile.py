@@ -0,0 +1,180 @@
+"""Where the time of one conversion goes, for ``--profile``.
+
+A :class:`ConversionProfile` held in :attr:`ConversionState.profile` records a
+span for each call of the functions which most often make an album slow:
+preparing the album, unpacking an mcfx file, registering fonts, reading the
+clipart catalogue, and for each page its background and its image, text and
+clipart areas, and finally saving the PDF. Every span remembers the page it
+was drawn on, so the report shows both where the time goes by kind of work and
+which pages are slow.
+
+The spans can also be written as a Chrome trace-event file, which
+``chrome://tracing``, Perfetto or speedscope show as a flame graph, and the
+whole conversion can be run under :mod:`cProfile` for a function-level view.
+When --jobs is above 1 the worker processes record their own spans, which are
+returned with their pages; cProfile only sees the parent process.
+"""
+
+import json
+import logging
+import math
+import os
+import threading
+import time
+from collections import defaultdict
+from contextlib import contextmanager, nullcontext
+from dataclasses import dataclass
+
+# The spans shown for each page, in this order, as the work done for each kind of area
+PAGE_SPAN_NAMES = ('processBackground', 'processAreaImageTag', 'processAreaTextTag', 'insertClipartFile')
+
+
+@dataclass(frozen=True)
+class ProfileSpan:
+    """One timed call, in seconds of time.perf_counter(), which is comparable between processes."""
+
+    name: str
+    page: str | None
+    start: float
+    duration: float
+    process_id: int
+    thread_id: int
+
+
+def _percentile(sortedValues, fraction):
+    """Return the nearest-rank percentile of already sorted values."""
+    return sortedValues[max(0, math.ceil(fraction * len(sortedValues)) - 1)]
+
+
+class ConversionProfile:
+    """The spans of one conversion, and the optional cProfile run around it."""
+
+    def __init__(self, statsFileName=None, traceFileName=None):
+        self.stats_file_name = statsFileName
+        self.trace_file_name = traceFileName
+        self.spans: list[ProfileSpan] = []
+        self.page: str | None = None
+        self.profiler = None
+
+    @contextmanager
+    def span(self, name):
+        """Record the time spent in the block as a span of the current page."""
+        startTime = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.spans.append(ProfileSpan(name, self.page, startTime, time.perf_counter() - startTime,
+                                          os.getpid(), threading.get_ident()))
+
+    @contextmanager
+    def pageSpan(self, page):
+        """Record the block as a span of the page, and the spans within it as belonging to the page."""
+        self.page = page
+        try:
+            with self.span('page'):
+                yield
+        finally:
+            self.page = None
+
+    def startCProfile(self):
+        """Run the rest of the conversion under cProfile, if a stats file was asked for."""
+        if self.stats_file_name is None:
+            return
+        import cProfile # pylint: disable=import-outside-toplevel
+        self.profiler = cProfile.Profile()
+        self.profiler.enable()
+
+    def stopCProfile(self):
+        if self.profiler is not None:
+            self.profiler.disable()
+
+    def takeSpans(self):
+        """Return the spans recorded so far and forget them, as a page worker does for each fragment."""
+        spans = self.spans
+        self.spans = []
+        return spans
+
+    def addSpans(self, spans):
+        """Add the spans recorded by another process, such as a page worker."""
+        self.spans.extend(spans)
+
+    def summary(self):
+        """Return the count, total, p50 and p95 seconds of each span name, slowest total first."""
+        durations = defaultdict(list)
+        for span in self.spans:
+            durations[span.name].append(span.duration)
+        rows = []
+        for name, values in durations.items():
+            values.sort()
+            rows.append({'name': name, 'count': len(values), 'total': sum(values),
+                         'p50': _percentile(values, 0.5), 'p95': _percentile(values, 0.95)})
+        return sorted(rows, key=lambda row: -row['total'])
+
+    def pageSummary(self):
+        """Return, for each page in order, its total seconds and the count and seconds of each PAGE_SPAN_NAMES."""
+        pages = {}
+        for span in sorted(self.spans, key=lambda span: span.start):
+            if span.page is None:
+                continue
+            page = pages.setdefault(span.page, {'page': span.page, 'total': 0.0,
+                                                **{name: [0, 0.0] for name in PAGE_SPAN_NAMES}})
+            if span.name == 'page':
+                page['total'] += span.duration
+            elif span.name in PAGE_SPAN_NAMES:
+                page[span.name][0] += 1
+                page[span.name][1] += span.duration
+        return list(pages.values())
+
+    def formatReport(self):
+        """Return the report printed after a profiled conversion."""
+        lines = ['Profile (seconds; p50 and p95 in milliseconds)',
+                 f" {'span':<30} {'count':>6} {'total':>8} {'p50':>8} {'p95':>8}"]
+        for row in self.summary():
+            lines.append(f" {row['name']:<30} {row['count']:>6} {row['total']:>8.3f} "
+                         f"{1000 * row['p50']:>8.1f} {1000 * row['p95']:>8.1f}")
+        pageRows = self.pageSummary()
+        if pageRows:
+            columnNames = ('background', 'image areas', 'text areas', 'clipart')
+            lines.append(f" {'page':<30} {'total':>8}" + ''.join(f' {name:>14}' for name in columnNames))
+            for row in pageRows:
+                cells = ''.join(f' {row[name][0]:>4} {row[name][1]:>9.3f}' for name in PAGE_SPAN_NAMES)
+                lines.append(f" {row['page']:<30} {row['total']:>8.3f}{cells}")
+        return '\n'.join(lines)
+
+    def writeChromeTrace(self, fileName):
+        """Write the spans as Chrome trace events, in microseconds from the first span."""
+        origin = min((span.start for span in self.spans), default=0.0)
+        events = [{'name': span.name, 'cat': 'page' if span.page is not None else 'conversion', 'ph': 'X',
+                   'ts': round(1e6 * (span.start - origin), 1), 'dur': round(1e6 * span.duration, 1),
+                   'pid': span.process_id, 'tid': span.thread_id,
+                   'args': {} if span.page is None else {'page': span.page}}
+                  for span in self.spans]
+        with open(fileName, 'w', encoding='utf-8') as traceFile:
+            json.dump({'traceEvents': events, 'displayTimeUnit': 'ms'}, traceFile)
+
+    def finish(self):
+        """Stop cProfile, print the report and write the requested files."""
+        self.stopCProfile()
+        print(self.formatReport())
+        if self.profiler is not None:
+            self.profiler.dump_stats(self.stats_file_name)
+            logging.info(f'Wrote the cProfile statistics to {self.stats_file_name}; '
+                         'read them with python -m pstats')
+        if self.trace_file_name is not None:
+            self.writeChromeTrace(self.trace_file_name)
+            logging.info(f'Wrote the trace of the conversion to {self.trace_file_name}; '
+                         'open it in chrome://tracing or https://ui.perfetto.dev')
+
+
+def profiled(state, name):
+    """Return a context which records a span when the conversion is profiled, and otherwise does nothing."""
+    if state.profile is None:
+        return nullcontext()
+    return state.profile.span(name)
+
+
+def profiledPage(state, page):
+    """Return a context in which the spans recorded, if the conversion is profiled, belong to the page."""
+    if state.profile is None:
+        return nullcontext()
+    return state.profile.pageSpan(page)
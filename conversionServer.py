@@ -0,0 +1,220 @@
+"""Convert albums for local clients from one long-running, already warm process.
+
+``cewe2pdf.py --serve`` starts this server.  The libraries are imported once,
+including those of optional features which a single conversion imports only
+when its album needs them, and ReportLab keeps the fonts it has loaded, so a
+job pays only for reading and rendering its album.  Each job still has its own
+:class:`AlbumConversionSession`, so no conversion state passes from one album
+to the next.  Jobs are converted one at a time: a later client waits until the
+current job has finished.
+
+A job is posted to ``/convert`` as JSON, for example::
+
+    {"album": "/albums/summer.mcfx", "pages": [0, 1, 2], "outFile": "/tmp/summer.pdf"}
+
+The response is a stream of JSON lines: a ``started`` event, a ``log`` event
+for each informational or worse message of the conversion, and finally a
+``finished`` event with the PDF name.  ``GET /status`` reports whether the
+server is ready and how many jobs it has completed.
+"""
+
+import importlib
+import json
+import logging
+import os
+import time
+from dataclasses import dataclass
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from typing import Any, Callable
+
+from albumConversionSession import AlbumConversionSession
+from extraLoggers import configlogger, mustsee
+from imageUtils import registerHeifOpener
+
+DEFAULT_SERVER_PORT = 8765
+
+# Libraries which a conversion imports only when an album needs them, but
+# which a server imports before its first job
+OPTIONAL_FEATURE_MODULES = ('cairosvg', 'pikepdf', 'bs4', 'numpy', 'cv2', 'pymupdf')
+
+# The optional job values, and the types they must have
+_JOB_OPTIONS = {
+    'outFile': str,
+    'pages': list,
+    'keepDoublePages': bool,
+    'tmpDir': str,
+    'appDataDir': str,
+    'jobs': int,
+}
+
+
+@dataclass(frozen=True)
+class ServerSettings:
+    """The rendering settings shared by every job, as used by :func:`cewe2pdf.convertMcf`."""
+
+    mcf_to_reportlab: float
+    image_quality: int
+    pil_antialias: Any
+    process_elements: Callable
+
+
+class JobError(ValueError):
+    """A conversion job which cannot be started, reported to the client as a bad request."""
+
+
+def parseJob(body):
+    """Return the job posted as JSON, after checking its values."""
+    try:
+        job = json.loads(body or b'{}')
+    except ValueError as exception:
+        raise JobError(f'The job is not valid JSON: {exception}') from exception
+    if not isinstance(job, dict):
+        raise JobError('The job must be a JSON object')
+    albumName = job.get('album')
+    if not isinstance(albumName, str) or not os.path.isfile(albumName):
+        raise JobError(f'The album {albumName!r} is not an existing file')
+    if not albumName.endswith(('.mcf', '.mcfx')):
+        raise JobError(f'The album {albumName} is neither an .mcf nor an .mcfx file')
+    for name, value in job.items():
+        expectedType = _JOB_OPTIONS.get(name)
+        # JSON true and false are ints to isinstance, but never a number here
+        if name != 'album' and (expectedType is None or not isinstance(value, expectedType)
+                                or (expectedType is int and isinstance(value, bool))):
+            raise JobError(f'Unexpected job value {name}={value!r}')
+    if 'pages' in job and not all(isinstance(page, int) and not isinstance(page, bool) for page in job['pages']):
+        raise JobError('The pages must be a list of page numbers')
+    if job.get('jobs', 1) < 1:
+        raise JobError('jobs must be at least 1')
+    return job
+
+
+class _ProgressLogHandler(logging.Handler):
+    """Send each log record of a job to its client as a log event."""
+
+    def __init__(self, sendEvent):
+        super().__init__(logging.INFO)
+        self.send_event = sendEvent
+
+    def emit(self, record):
+        self.send_event({'event': 'log', 'level': record.levelname, 'message': record.getMessage()})
+
+
+class ConversionServer(HTTPServer):
+    """An HTTP server on localhost which converts one album at a time."""
+
+    def __init__(self, settings: ServerSettings, port=DEFAULT_SERVER_PORT):
+        super().__init__(('127.0.0.1', port), _ConversionRequestHandler)
+        self.settings = settings
+        self.completed_jobs = 0
+
+    def convert(self, job, sendEvent):
+        """Convert the album of one job, sending its progress, and return the finished event."""
+        loggers = [logging.getLogger()] + [logger for logger in (configlogger, mustsee) if not logger.propagate]
+        progressHandler = _ProgressLogHandler(sendEvent)
+        for logger in loggers:
+            logger.addHandler(progressHandler)
+
+        settings = self.settings
+        pages = job.get('pages')
+        outFile = job.get('outFile')
+        tmpDir = job.get('tmpDir')
+        appDataDir = job.get('appDataDir')
+        session = AlbumConversionSession(
+            job['album'], job.get('keepDoublePages', False), pages,
+            os.path.abspath(tmpDir) if tmpDir else None,
+            os.path.abspath(appDataDir) if appDataDir else None,
+            os.path.abspath(outFile) if outFile else None,
+            settings.mcf_to_reportlab, settings.image_quality, settings.pil_antialias,
+            jobs=job.get('jobs', 1))
+        finished = {'event': 'finished', 'succeeded': False, 'output': None, 'error': None}
+        startTime = time.perf_counter()
+        try:
+            with session:
+                finished['succeeded'] = bool(session.render(settings.process_elements))
+        except (Exception, SystemExit) as exception: # pylint: disable=broad-exception-caught
+            # A failed job must not stop the server
+            logging.error(f"Conversion of {job['album']} failed: {exception!r}")
+            finished['error'] = repr(exception)
+        finally:
+            for logger in loggers:
+                logger.removeHandler(progressHandler)
+        finished['duration_seconds'] = round(time.perf_counter() - startTime, 3)
+        finished['output'] = session.output_file_name
+        self.completed_jobs += 1
+        return finished
+
+
+class _ConversionRequestHandler(BaseHTTPRequestHandler):
+    server: ConversionServer
+
+    def do_GET(self): # pylint: disable=invalid-name
+        if self.path != '/status':
+            self._sendJson(404, {'error': f'Unknown path {self.path}'})
+            return
+        self._sendJson(200, {'status': 'ready', 'completed_jobs': self.server.completed_jobs})
+
+    def do_POST(self): # pylint: disable=invalid-name
+        if self.path != '/convert':
+            self._sendJson(404, {'error': f'Unknown path {self.path}'})
+            return
+        try:
+            job = parseJob(self.rfile.read(int(self.headers.get('Content-Length', 0))))
+        except JobError as exception:
+            self._sendJson(400, {'error': str(exception)})
+            return
+
+        # Without a content length, the response ends when the connection
+        # closes, so each event can be sent as soon as it happens.
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/x-ndjson')
+        self.end_headers()
+        self.close_connection = True
+        clientGone = False
+
+        def sendEvent(event):
+            nonlocal clientGone
+            if clientGone:
+                return
+            try:
+                self.wfile.write(json.dumps(event).encode('utf-8') + b'\n')
+                self.wfile.flush()
+            except OSError:
+                # The job still finishes, for the next client to find its pdf
+                clientGone = True
+
+        sendEvent({'event': 'started', 'album': job['album']})
+        sendEvent(self.server.convert(job, sendEvent))
+
+    def _sendJson(self, status, content):
+        body = json.dumps(content).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args): # pylint: disable=redefined-builtin
+        logging.debug(f'{self.address_string()} {format % args}')
+
+
+def importOptionalFeatureModules():
+    """Import the libraries of the optional features, so that no job waits for them."""
+    for moduleName in OPTIONAL_FEATURE_MODULES:
+        try:
+            importlib.import_module(moduleName)
+        except (ImportError, OSError) as exception:
+            # The job which needs it reports the problem
+            logging.info(f'Cannot import {moduleName} in advance: {exception}')
+    registerHeifOpener()
+
+
+def serveConversions(settings: ServerSettings, port=DEFAULT_SERVER_PORT):
+    """Convert the albums posted to localhost:port until interrupted."""
+    importOptionalFeatureModules()
+    with ConversionServer(settings, port) as server:
+        logging.info(f'Serving conversions on http://127.0.0.1:{server.server_address[1]}/convert')
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            logging.info(f'Stopped serving conversions after {server.completed_jobs} jobs')
+    return True
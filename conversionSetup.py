@@ -8,6 +8,7 @@
 # pylint: disable=bare-except,broad-exception-caught,too-many-instance-attributes,too-many-locals,too-many-statements
 
 import configparser
+import io
 import logging
 import os
 import os.path
@@ -18,14 +19,19 @@ from typing import Any
 
 from lxml import etree
 
+from backgroundCache import BackgroundCache
 from ceweInfo import CeweInfo
 from clipArt import readClipArtConfigXML
+from clipartCache import ClipartCache
 from configUtils import getConfigurationInt
+from conversionProfile import profiled
 from conversionState import ConversionState
 from extraLoggers import mustsee
-from fontHandling import findAndRegisterFonts
+from fontHandling import collectUsedFontFamilies, findAndRegisterFonts
+from imageCache import ImageCache
 from lineScales import LineScales
-from mcfx import unpackMcfx
+from mcfx import McfxContainer, unpackMcfx
+from resourceCatalogue import ResourceCatalogue
 from windowsIntegration import findInstalledCeweFolder
 
 
@@ -48,6 +54,7 @@ class ConversionSetup:
     clipart_paths: tuple[str, ...]          # Clipart XML/resource search paths resolved from the CEWE installation.
     passepartout_folders: tuple[str, ...]   # Ordered directories searched when building the passepartout index.
 
+    # The data.mcf of an MCFX file is named within the file itself when ConversionState.mcfx_container reads it.
     mcf_xml_name: str           # Actual XML file to parse: the source MCF, or data.mcf unpacked from MCFX.
     mcf_base_folder: str        # Folder containing mcf_xml_name, used to resolve album image references.
     unpacked_folder: str | None # TemporaryDirectory returned when an MCFX archive was unpacked; otherwise None.
@@ -63,29 +70,35 @@ class ConversionSetup:
     background_resolution: int  # Target DPI for page-background images.
 
 
-def prepareConversion(albumname, mcfxTmpDir, appDataDir, state: ConversionState,
-                      automaticWindows: bool = False) -> ConversionSetup: # noqa: C901
-    """Read an album and resolve the configuration and resources it requires."""
-    albumTitle, dummy = os.path.splitext(os.path.basename(albumname))
+def _locateAlbumMcf(albumname, mcfxFormat, mcfxTmpDir, state: ConversionState,
+                    unpackedMcfName, unpackOnlyMcf):
+    """Return the folder an MCFX album was unpacked to, or None, and the name of its mcf file.
 
-    # Check for the archive format introduced around CEWE 7.3.
-    mcfxFormat = albumname.endswith('.mcfx')
+    An MCFX album is unpacked to mcfxTmpDir, or without one is read through
+    the McfxContainer which is set on the state.
+    """
+    if unpackedMcfName is not None:
+        return None, unpackedMcfName
+    if mcfxFormat and mcfxTmpDir is None:
+        # Without a folder to unpack to, the images are read from the
+        # database as they are drawn, and nothing is written.
+        state.mcfx_container = McfxContainer(Path(albumname))
+        return None, state.mcfx_container.mcfFileName()
     if mcfxFormat:
         albumPathObj = Path(albumname).resolve()
-        unpackedFolder, mcfxmlname = unpackMcfx(albumPathObj, mcfxTmpDir)
-    else:
-        unpackedFolder = None
-        mcfxmlname = albumname
+        with profiled(state, 'unpackMcfx'):
+            return unpackMcfx(albumPathObj, mcfxTmpDir, fileNames=() if unpackOnlyMcf else None)
+    return None, albumname
 
-    # The original album folder locates configuration; the MCF folder locates images.
-    albumBaseFolder = str(Path(albumname).resolve().parent)
-    mcfPathObj = Path(mcfxmlname).resolve()
-    mcfBaseFolder = str(mcfPathObj.parent)
 
+def _readAlbumMcf(albumname, mcfxFormat, mcfxmlname, state: ConversionState):
+    """Parse the album's mcf file, exiting with an error if it cannot be read."""
     # Read as binary so the XML parser retains the file's UTF-8 encoding.
     try:
+        if state.mcfx_container is not None:
+            return etree.parse(io.BytesIO(state.mcfx_container.readMcf()))
         with open(mcfxmlname, 'rb') as mcffile:
-            mcf = etree.parse(mcffile)
+            return etree.parse(mcffile)
     except Exception as exception:
         invalidmsg = f'Cannot open mcf file {mcfxmlname}'
         if mcfxFormat:
@@ -93,7 +106,31 @@ def prepareConversion(albumname, mcfxTmpDir, appDataDir, state: ConversionState,
         logging.error(f'{invalidmsg}: {repr(exception)}')
         sys.exit(1)
 
-    fotobook = mcf.getroot()
+
+def prepareConversion(albumname, mcfxTmpDir, appDataDir, state: ConversionState,
+                      automaticWindows: bool = False,
+                      unpackedMcfName=None, unpackOnlyMcf=False) -> ConversionSetup:
+    """Read an album and resolve the configuration and resources it requires.
+
+    ``unpackedMcfName`` names a data.mcf which another setup of the same album
+    has already unpacked from its MCFX file.  Page workers use it so that only
+    the parent process extracts the album.  ``unpackOnlyMcf`` unpacks just the
+    data.mcf of an MCFX file, leaving the caller to unpack the photos of the
+    pages it renders.
+    """
+    albumTitle, dummy = os.path.splitext(os.path.basename(albumname))
+
+    # Check for the archive format introduced around CEWE 7.3.
+    mcfxFormat = albumname.endswith('.mcfx')
+    unpackedFolder, mcfxmlname = _locateAlbumMcf(albumname, mcfxFormat, mcfxTmpDir, state,
+                                                 unpackedMcfName, unpackOnlyMcf)
+
+    # The original album folder locates configuration; the MCF folder locates images.
+    albumBaseFolder = str(Path(albumname).resolve().parent)
+    mcfPathObj = Path(mcfxmlname).resolve()
+    mcfBaseFolder = str(mcfPathObj.parent)
+
+    fotobook = _readAlbumMcf(albumname, mcfxFormat, mcfxmlname, state).getroot()
     CeweInfo.ensureAcceptableAlbumMcf(fotobook, albumname, mcfxmlname, mcfxFormat)
 
     clipartFiles = {}
@@ -208,11 +245,24 @@ def prepareConversion(albumname, mcfxTmpDir, appDataDir, state: ConversionState,
     if ceweFolder and keyAccountFolder is not None:
         passepartoutFolders += CeweInfo.getCewePassepartoutFolders(ceweFolder, keyAccountFolder)
 
-    availableFonts = findAndRegisterFonts(defaultConfigSection, appDataDir, albumBaseFolder, ceweFolder, state)
+    # Only the fonts the album uses are registered now. Another font, for
+    # example one chosen by configuration, is registered when it is first used.
+    usedFontFamilies = collectUsedFontFamilies(fotobook)
+    if configuration.has_section('INDEX'):
+        usedFontFamilies.add(configuration['INDEX'].get('indexFont', 'Helvetica').strip())
+    with profiled(state, 'findAndRegisterFonts'):
+        availableFonts = findAndRegisterFonts(defaultConfigSection, appDataDir, albumBaseFolder, ceweFolder, state,
+                                              usedFontFamilies)
+    state.image_cache = ImageCache.fromConfiguration(defaultConfigSection, appDataDir)
+    state.resource_catalogue = ResourceCatalogue.fromConfiguration(defaultConfigSection, appDataDir)
+    state.background_cache = BackgroundCache.fromConfiguration(
+        defaultConfigSection, backgroundLocations, state.resource_catalogue)
+    state.clipart_cache = ClipartCache.fromConfiguration(defaultConfigSection, state.image_cache)
     # Extra clipart file mappings work independently of the CEWE installation.
     # With no CEWE root this returns an empty delivered catalogue; a later
     # clipart lookup then uses its normal "not found" warning.
-    clipartPaths = readClipArtConfigXML(ceweFolder, keyAccountFolder, clipartFiles)
+    with profiled(state, 'readClipArtConfigXML'):
+        clipartPaths = readClipArtConfigXML(ceweFolder, keyAccountFolder, clipartFiles, state.resource_catalogue)
 
     # Use names here rather than relying on ConversionSetup's declaration
     # order.  The dataclass is intentionally grouped for readability above,
@@ -6,6 +6,7 @@ under way, so it cannot accidentally leak into a later conversion in the same
 Python process.
 """
 
+from collections import Counter
 from dataclasses import dataclass, field
 from typing import Any
 
@@ -25,3 +26,12 @@ class ConversionState:
     missing_font_substitutions: dict[str, str] = field(default_factory=dict)
     noted_font_substitutions: set[str] = field(default_factory=set)
     message_counters: Any | None = None
+    image_cache: Any | None = None                  # imageCache.ImageCache, when enabled.
+    background_cache: Any | None = None             # backgroundCache.BackgroundCache.
+    clipart_cache: Any | None = None                # clipartCache.ClipartCache.
+    resource_catalogue: Any | None = None           # resourceCatalogue.ResourceCatalogue, when enabled.
+    mcfx_container: Any | None = None               # mcfx.McfxContainer, when an mcfx album is read without unpacking.
+    performance_counters: Counter = field(default_factory=Counter)   # Reported after the message counts.
+    image_xobject_names: dict[tuple[str, str], str] = field(default_factory=dict)  # Encoded image fingerprint to PDF image name.
+    stage_seconds: Counter = field(default_factory=Counter)     # Time spent in each stage of the conversion, e.g. 'render'.
+    profile: Any | None = None                      # conversionProfile.ConversionProfile, with --profile.
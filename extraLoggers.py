@@ -42,6 +42,17 @@ class ConversionMessageCounters:
         logging.getLogger().removeHandler(self.root_handler)
         configlogger.removeHandler(self.config_handler)
 
+    def counts(self):
+        """Return the counts so far in a form which can be sent between processes."""
+        return (dict(self.config_handler.levelToCountDict),
+                dict(self.root_handler.levelToCountDict))
+
+    def addCounts(self, counts):
+        """Include counts returned by :meth:`counts` in another process."""
+        configCounts, rootCounts = counts
+        self.config_handler.addCounts(configCounts)
+        self.root_handler.addCounts(rootCounts)
+
     def verify(self, configSection):
         # if he has specified "normal" values for the number of messages of each kind, then warn if we do not see that number
         if configSection is None:
@@ -1,15 +1,17 @@
 import logging
 import os
+import re
 
 from fontTools import ttLib
 from reportlab.pdfbase import pdfmetrics
 from reportlab.pdfbase.ttfonts import TTFont
 
 from ceweInfo import CeweInfo
-from configUtils import getConfigurationBool
+from configUtils import getConfigurationBool, getConfigurationInt
 from conversionState import ConversionState
 from extraLoggers import mustsee, configlogger
-from otf import getTtfsFromOtfs
+from fontMetadataCache import FontMetadataCache
+from otf import OTF_CONVERSION_TIMEOUT, convertOtfFiles
 from pathutils import localfont_dir, systemfont_dirs, findFileInDirs, findFilesInDir
 
 
@@ -39,8 +41,115 @@ def addAdditionalFontsFromFile(configFontFileName, ttfFiles, fontDirs):
                 ttfFiles.append(path)
 
 
+# Text, text art and page numbering styles all name their fonts like this
+FONT_FAMILY_STYLE_PATTERN = re.compile(r"font-family\s*:\s*([^;\"]+)")
+
+
+def collectUsedFontFamilies(fotobook):
+    """Return the names of the font families which the album's XML refers to."""
+    usedFamilies = set()
+    for element in fotobook.iter():
+        for value in (element.text, *element.attrib.values()):
+            if not value or 'font-family' not in value:
+                continue
+            for match in FONT_FAMILY_STYLE_PATTERN.finditer(value):
+                family = match.group(1).split(',')[0].replace('&quot;', '').strip().strip('\'"')
+                if family:
+                    usedFamilies.add(family)
+    pageNumberElement = fotobook.find('pagenumbering')
+    if pageNumberElement is not None:
+        usedFamilies.add(pageNumberElement.get('fontfamily', 'Liberation Sans'))
+    return usedFamilies
+
+
+class AvailableFonts(dict):
+    """The font faces found for a conversion, mapping each font name to its file.
+
+    Registering a TrueType font with ReportLab parses the whole file, so a
+    face is registered only when it is first needed, by :meth:`ensureRegistered`.
+    A face which fails to register is removed, as if it had never been found.
+    """
+
+    def __init__(self, fontFiles, fontFamilies, fontMetadataCache=None):
+        super().__init__(fontFiles)
+        self.font_families = fontFamilies   # family name to its normal, bold, italic and boldItalic faces
+        self.font_metadata_cache = fontMetadataCache
+        self.attempted_faces = set()
+        self.family_mappings = {}           # family name to the faces registered for it with ReportLab
+
+    def registerFamily(self, familyName, **faces):
+        """Register a font family with ReportLab, remembering it for faces registered later."""
+        pdfmetrics.registerFontFamily(familyName, **faces)
+        self.family_mappings[familyName] = faces
+
+    def ensureRegistered(self, fontName):
+        """Register a font family's faces, or a single face, unless that has been done already."""
+        faceNames = [fontName]
+        fontFamily = self.font_families.get(fontName)
+        if fontFamily is not None:
+            faceNames.extend(faceName for faceName in fontFamily.values() if faceName is not None)
+        for faceName in faceNames:
+            if faceName in self and faceName not in self.attempted_faces:
+                self._registerFace(faceName)
+
+    def _registerFace(self, fontName):
+        self.attempted_faces.add(fontName)
+        fontFile = self[fontName]
+        fontMetadataCache = self.font_metadata_cache
+        if fontMetadataCache is not None and fontMetadataCache.isKnownUnregistrable(fontFile):
+            # This failure was reported when it first happened
+            logging.debug(f"Skipping font '{fontName}' (from {fontFile}), which failed to register before")
+            del self[fontName]
+            return
+        try:
+            if _isRegisteredFrom(fontName, fontFile):
+                # An earlier conversion in this process, for example in a batch, parsed it already
+                configlogger.info(f"Registered '{fontName}' from '{fontFile}' (already loaded)")
+            else:
+                pdfmetrics.registerFont(TTFont(fontName, fontFile))
+                configlogger.info(f"Registered '{fontName}' from '{fontFile}'")
+        except: # noqa: E722 # pylint: disable=bare-except
+            configlogger.error(f"Failed to register font '{fontName}' (from {fontFile})")
+            del self[fontName]    # remove this item from the font list, so it won't be used later and cause problems.
+            if fontMetadataCache is not None:
+                fontMetadataCache.setRegistrationFailed(fontFile)
+            return
+        # ReportLab maps a newly registered face as a family of its own, which
+        # would lose the bold and italic faces of a family already registered.
+        for familyName, faces in self.family_mappings.items():
+            if familyName == fontName or fontName in faces.values():
+                pdfmetrics.registerFontFamily(familyName, **faces)
+
+
+def _isRegisteredFrom(fontName, fontFile):
+    """True if ReportLab has a TrueType face of this name loaded from this file."""
+    if fontName not in pdfmetrics.getRegisteredFontNames():
+        return False
+    face = getattr(pdfmetrics.getFont(fontName), 'face', None)
+    return getattr(face, 'filename', None) == fontFile
+
+
+def ensureFontRegistered(availableFonts, fontName):
+    """Register a font found for this conversion on its first use."""
+    if isinstance(availableFonts, AvailableFonts):
+        availableFonts.ensureRegistered(fontName)
+
+
+def registerFamilyMapping(availableFonts, familyName, **faces):
+    """Register a font family with ReportLab, through availableFonts where it is an AvailableFonts."""
+    if isinstance(availableFonts, AvailableFonts):
+        availableFonts.registerFamily(familyName, **faces)
+    else:
+        pdfmetrics.registerFontFamily(familyName, **faces)
+
+
 def findAndRegisterFonts(configSection, appDataDir, albumBaseFolder, cewe_folder,
-                         state: ConversionState): # pylint: disable=too-many-statements
+                         state: ConversionState, usedFontFamilies=None): # pylint: disable=too-many-statements
+    """Find the available fonts and register them with ReportLab.
+
+    With usedFontFamilies, only those families are registered now, and any
+    other font is registered if and when getAvailableFont selects it.
+    """
     ttfFiles = []
     fontDirs = []
     recursiveFontDirs = []
@@ -81,19 +190,21 @@ def findAndRegisterFonts(configSection, appDataDir, albumBaseFolder, cewe_folder
         configlogger.error('Content example:')
         configlogger.error('/tmp/vera.ttf')
 
-    addTtfFilesFromFontdirs(ttfFiles, fontDirs, appDataDir, recursiveFontDirs)
+    otfConversionTimeout = getConfigurationInt(configSection, 'otfConversionTimeout', str(OTF_CONVERSION_TIMEOUT), 1)
+    addTtfFilesFromFontdirs(ttfFiles, fontDirs, appDataDir, recursiveFontDirs, otfConversionTimeout)
 
-    buildFontsToRegisterFromTtfFiles(ttfFiles, fontsToRegister, familiesToRegister)
+    fontMetadataCache = FontMetadataCache.fromConfiguration(configSection, appDataDir)
+    buildFontsToRegisterFromTtfFiles(ttfFiles, fontsToRegister, familiesToRegister, fontMetadataCache)
 
-    logging.info(f"Found {len(fontsToRegister)} fonts; registering them")
-    # We need to loop over the keys, not the list iterator, so we can delete keys from the list in the loop
-    for curFontName in list(fontsToRegister):
-        try:
-            pdfmetrics.registerFont(TTFont(curFontName, fontsToRegister[curFontName]))
-            configlogger.info(f"Registered '{curFontName}' from '{fontsToRegister[curFontName]}'")
-        except: # noqa: E722 # pylint: disable=bare-except
-            configlogger.error(f"Failed to register font '{curFontName}' (from {fontsToRegister[curFontName]})")
-            del fontsToRegister[curFontName]    # remove this item from the font list, so it won't be used later and cause problems.
+    availableFonts = AvailableFonts(fontsToRegister, familiesToRegister, fontMetadataCache)
+    if usedFontFamilies is None:
+        logging.info(f"Found {len(availableFonts)} fonts; registering them")
+        fontNamesToRegister = list(availableFonts)
+    else:
+        logging.info(f"Found {len(availableFonts)} fonts; registering those used by the album")
+        fontNamesToRegister = sorted(usedFontFamilies)
+    for fontName in fontNamesToRegister:
+        availableFonts.ensureRegistered(fontName)
 
     # The reportlab manual says:
     #  Before using the TT Fonts in Platypus we should add a mapping from the family name to the individual font
@@ -106,40 +217,66 @@ def findAndRegisterFonts(configSection, appDataDir, albumBaseFolder, cewe_folder
     #  the normal heuristic family setup above  - the "fixed" FranklinGothic being a good example:
     #   fontFamilies =
     #      FranklinGothic,FranklinGothic,FranklinGothic Medium,Franklin Gothic Book Italic,FranklinGothic Medium Italic
-    explicitlyRegisteredFamilyNames = getExplicitlyRegisteredFamilyNames(configSection, fontsToRegister)
+    explicitlyRegisteredFamilyNames = getExplicitlyRegisteredFamilyNames(configSection, availableFonts)
 
     # Now we can register the families we have "observed" and built up as we read the font files,
     #  but ignoring any family name which was registered explicitly from configuration
-    registerFontFamilies(familiesToRegister, explicitlyRegisteredFamilyNames)
+    registerFontFamilies(familiesToRegister, explicitlyRegisteredFamilyNames, availableFonts)
 
-    loadMissingFontSubstitutions(configSection, fontsToRegister, state)
+    loadMissingFontSubstitutions(configSection, availableFonts, state)
 
+    if fontMetadataCache is not None:
+        fontMetadataCache.save()
     logging.info("Ended font registration")
 
-    return fontsToRegister # pass back a list of all the available fonts
+    return availableFonts # pass back a list of all the available fonts
+
+
+def readFontNames(ttfFile, fontMetadataCache=None):
+    """Return the family, subfamily and full name of a font file, or None if it cannot be used.
+
+    A font whose names are in the cache is not parsed again, and a problem
+    with a font is reported only when the font is first examined.
+    """
+    if fontMetadataCache is not None:
+        known, names = fontMetadataCache.getNames(ttfFile)
+        if known:
+            return names
+
+    names = None
+    try:
+        font = ttLib.TTFont(ttfFile, lazy=True)
+        # See https://learn.microsoft.com/en-us/typography/opentype/spec/name#name-ids
+        # The dp4 fontviewer shows the contents of ttf files https://us.fontviewer.de/
+        fontFamily = font['name'].getDebugName(1) # eg Arial
+        fontSubFamily = font['name'].getDebugName(2) # eg Regular, Bold, Bold Italic
+        fontFullName = font['name'].getDebugName(4) # eg usually a combo of 1 and 2
+        font.close()
+        if fontFamily is None:
+            configlogger.warning(f'Could not get family (name) of font: {ttfFile}')
+        elif fontSubFamily is None:
+            configlogger.warning(f'Could not get subfamily of font: {ttfFile}')
+        elif fontFullName is None:
+            configlogger.warning(f'Could not get full font name: {ttfFile}')
+        else:
+            names = (fontFamily, fontSubFamily, fontFullName)
+    except Exception as exception: # pylint: disable=broad-exception-caught
+        configlogger.error(f'Could not read font file {ttfFile}: {exception}')
 
+    if fontMetadataCache is not None:
+        fontMetadataCache.setNames(ttfFile, names)
+    return names
 
-def buildFontsToRegisterFromTtfFiles(ttfFiles, fontList, fontFamilyList):
+
+def buildFontsToRegisterFromTtfFiles(ttfFiles, fontList, fontFamilyList, fontMetadataCache=None):
     if len(ttfFiles) > 0:
         redefinedCount = 0
         ttfFiles = list(dict.fromkeys(ttfFiles)) # remove duplicates
         for ttfFile in ttfFiles:
-            font = ttLib.TTFont(ttfFile)
-
-            # See https://learn.microsoft.com/en-us/typography/opentype/spec/name#name-ids
-            # The dp4 fontviewer shows the contents of ttf files https://us.fontviewer.de/
-            fontFamily = font['name'].getDebugName(1) # eg Arial
-            fontSubFamily = font['name'].getDebugName(2) # eg Regular, Bold, Bold Italic
-            fontFullName = font['name'].getDebugName(4) # eg usually a combo of 1 and 2
-            if fontFamily is None:
-                configlogger.warning(f'Could not get family (name) of font: {ttfFile}')
-                continue
-            if fontSubFamily is None:
-                configlogger.warning(f'Could not get subfamily of font: {ttfFile}')
-                continue
-            if fontFullName is None:
-                configlogger.warning(f'Could not get full font name: {ttfFile}')
+            names = readFontNames(ttfFile, fontMetadataCache)
+            if names is None:
                 continue
+            fontFamily, fontSubFamily, fontFullName = names
 
             # Cewe offers the users "fonts" which really name a "font family" (so that you can then use
             # the B or I buttons to get bold or italic.)  The mcf file contains those (family) names.
@@ -239,6 +376,7 @@ def getExplicitlyRegisteredFamilyNames(defaultConfigSection, fontList):
             fontsOk = True
             msg = ""
             for fontToCheck in (m_n, m_b, m_i, m_bi):
+                ensureFontRegistered(fontList, fontToCheck)
                 if fontToCheck not in fontList:
                     if fontsOk:
                         msg = f"Configured font family {m_familyname} ignored because of unregistered fonts: "
@@ -247,7 +385,7 @@ def getExplicitlyRegisteredFamilyNames(defaultConfigSection, fontList):
             if not fontsOk:
                 configlogger.error(msg)
             else:
-                pdfmetrics.registerFontFamily(m_familyname, normal=m_n, bold=m_b, italic=m_i, boldItalic=m_bi)
+                registerFamilyMapping(fontList, m_familyname, normal=m_n, bold=m_b, italic=m_i, boldItalic=m_bi)
                 explicitFamilyNames.append(m_familyname)
                 configlogger.warning(f"Using configured font family '{m_familyname}': '{m_n}','{m_b}','{m_i}','{m_bi}'")
                 verifyFontNameConventions(m_familyname, normal=m_n, bold=m_b, italic=m_i, boldItalic=m_bi)
@@ -256,9 +394,11 @@ def getExplicitlyRegisteredFamilyNames(defaultConfigSection, fontList):
     return explicitFamilyNames
 
 
-def addTtfFilesFromFontdirs(ttfFiles, fontDirs, appDataDir, recursiveFontDirs=()):
+def addTtfFilesFromFontdirs(ttfFiles, fontDirs, appDataDir, recursiveFontDirs=(),
+                            otfConversionTimeout=OTF_CONVERSION_TIMEOUT):
     if len(fontDirs) > 0:
         mustsee.info(f'Scanning for ttf/otf files in {str(fontDirs)}')
+        fontDirFiles = []
         for fontDir in fontDirs:
             # this is what we really want to do to find extra ttf files:
             #   ttfextras = glob.glob(os.path.join(fontDir, '*.ttf'))
@@ -270,17 +410,23 @@ def addTtfFilesFromFontdirs(ttfFiles, fontDirs, appDataDir, recursiveFontDirs=()
             # Recursion is reserved for configured shared system folders on
             # Linux and macOS. Ordinary additional-font folders retain the
             # historical one-folder scan, which is safer on Windows.
-            ttfFiles.extend(sorted(ttfextras))
 
             # CEWE deliver some fonts as otf, which we cannot use witout first converting to ttf
             #   see https://github.com/bash0/cewe2pdf/issues/133
             otfFiles = findFilesInDir(fontDir, '*.otf', walk_structure=fontDir in recursiveFontDirs)
-            if len(otfFiles) > 0:
-                ttfsFromOtfs = getTtfsFromOtfs(otfFiles,appDataDir)
-                ttfFiles.extend(sorted(ttfsFromOtfs))
+            fontDirFiles.append((ttfextras, otfFiles))
+
+        # The otf fonts of all the folders are converted together, so that they can be converted in parallel
+        allOtfFiles = [otfFile for _, otfFiles in fontDirFiles for otfFile in otfFiles]
+        ttfsFromOtfs = {}
+        if len(allOtfFiles) > 0:
+            ttfsFromOtfs = convertOtfFiles(allOtfFiles, appDataDir, otfConversionTimeout)
+        for ttfextras, otfFiles in fontDirFiles:
+            ttfFiles.extend(sorted(ttfextras))
+            ttfFiles.extend(sorted(ttfsFromOtfs[otfFile] for otfFile in otfFiles if otfFile in ttfsFromOtfs))
 
 
-def registerFontFamilies(fontFamilies, explicitlyRegisteredFamilyNames):
+def registerFontFamilies(fontFamilies, explicitlyRegisteredFamilyNames, availableFonts=None):
     if len(fontFamilies) > 0:
         for familyName, fontFamily in fontFamilies.items():
             if fontFamily['normal'] is None:
@@ -300,7 +446,7 @@ def registerFontFamilies(fontFamilies, explicitlyRegisteredFamilyNames):
                 if value is None:
                     del fontFamily[key]
             if familyName not in explicitlyRegisteredFamilyNames:
-                pdfmetrics.registerFontFamily(familyName, **fontFamily)
+                registerFamilyMapping(availableFonts, familyName, **fontFamily)
                 configlogger.info(f"Registered fontfamily '{familyName}': {fontFamily}")
                 verifyFontNameConventions(familyName, **fontFamily)
             else:
@@ -341,6 +487,14 @@ def loadMissingFontSubstitutions(configSection, availableFonts, state: Conversio
     # to ReportLab's built-in Helvetica instead of returning an unusable name.
     # availableFonts contains faces registered from font files.  ReportLab's
     # PDF base fonts need no registration, but are also valid replacements.
+    # Replacement fonts are registered here, since they are used without getAvailableFont.
+    replacementFonts = set(DEFAULT_MISSING_FONT_SUBSTITUTIONS.values())
+    if configSection is not None:
+        replacementFonts.update(fnp.split(':')[1].strip()
+                                for fnp in configSection.get('missingFontSubstitutions', '').splitlines()
+                                if fnp.count(':') == 1)
+    for replacementFont in replacementFonts:
+        ensureFontRegistered(availableFonts, os.path.expandvars(replacementFont))
     usableReplacementFonts = set(availableFonts).union(pdfmetrics.standardFonts)
     state.missing_font_substitutions = {
         originalfont: replacement
@@ -396,6 +550,9 @@ def noteFontSubstitution(family, replacement, state: ConversionState):
 
 def getAvailableFont(family, pdf, additional_fonts, state: ConversionState):
     reportlabFonts = pdf.getAvailableFonts()
+    # A font found for this conversion is registered on its first use, and
+    # is removed from additional_fonts if that fails.
+    ensureFontRegistered(additional_fonts, family)
     if family in reportlabFonts:
         bodyfont = family
     elif family in additional_fonts:
@@ -0,0 +1,129 @@
+"""Persistent record of the names in each font file, and of unusable fonts.
+
+Font registration needs the family, subfamily and full name from every font
+file it may use, and with ``loadSystemFonts`` that can mean parsing hundreds
+of files with fontTools before each conversion.  :class:`FontMetadataCache`
+keeps those names in one JSON file in the app data folder, keyed by the font
+file's path and checked against its size and modification time, so that a
+later run reads the one file instead.
+
+Fonts which could not be read or registered are recorded too, so that they
+are quietly skipped rather than tried, and reported, on every run.
+"""
+
+import json
+import logging
+import os
+import tempfile
+
+import fontTools
+
+from configUtils import getConfigurationBool
+from pathutils import appdata_dir
+
+# Increase this when the recorded information changes meaning.
+FONT_METADATA_CACHE_VERSION = 1
+
+FONT_METADATA_CACHE_FILE_NAME = 'fontmetadata.json'
+
+
+class FontMetadataCache:
+    """Font names and known problems, keyed by font file path, size and time."""
+
+    def __init__(self, fileName):
+        self.file_name = str(fileName)
+        self.fonts = None
+        self.changed = False
+
+    @staticmethod
+    def fromConfiguration(configSection, appDataDir):
+        """Return the cache configured for this conversion, or None if disabled."""
+        if not getConfigurationBool(configSection, 'fontMetadataCache', 'True'):
+            return None
+        baseFolder = appDataDir if appDataDir is not None else appdata_dir()
+        return FontMetadataCache(os.path.join(baseFolder, FONT_METADATA_CACHE_FILE_NAME))
+
+    def _load(self):
+        self.fonts = {}
+        try:
+            with open(self.file_name, 'r', encoding='utf-8') as cacheFile:
+                contents = json.load(cacheFile)
+        except FileNotFoundError:
+            return
+        except (OSError, ValueError) as exception:
+            logging.warning(f'Ignoring unreadable font metadata cache {self.file_name}: {exception}')
+            return
+        # Names read by another fontTools version may differ, so start again
+        if contents.get('version') == [FONT_METADATA_CACHE_VERSION, fontTools.version]:
+            self.fonts = contents.get('fonts', {})
+
+    @staticmethod
+    def _fileState(fontFile):
+        try:
+            fontStat = os.stat(fontFile)
+        except OSError:
+            return None
+        return [fontStat.st_size, fontStat.st_mtime_ns]
+
+    def _entry(self, fontFile):
+        if self.fonts is None:
+            self._load()
+        entry = self.fonts.get(fontFile)
+        if entry is None or entry['file'] != self._fileState(fontFile):
+            return None
+        return entry
+
+    def getNames(self, fontFile):
+        """Return (True, names) for a known font, where names is None if it cannot be used, else (False, None)."""
+        entry = self._entry(fontFile)
+        if entry is None:
+            return False, None
+        names = entry['names']
+        return True, tuple(names) if names is not None else None
+
+    def setNames(self, fontFile, names):
+        """Record the family, subfamily and full name of a font, or None if it cannot be used."""
+        if self.fonts is None:
+            self._load()
+        self.fonts[fontFile] = {
+            'file': self._fileState(fontFile),
+            'names': list(names) if names is not None else None,
+            'registers': True}
+        self.changed = True
+
+    def isKnownUnregistrable(self, fontFile):
+        """Return True if registering this font failed before."""
+        entry = self._entry(fontFile)
+        return entry is not None and not entry['registers']
+
+    def setRegistrationFailed(self, fontFile):
+        """Record that registering the font failed, so it is not tried again."""
+        entry = self._entry(fontFile)
+        if entry is None:
+            self.setNames(fontFile, None)
+            entry = self.fonts[fontFile]
+        entry['registers'] = False
+        self.changed = True
+
+    def save(self):
+        """Write the cache file if anything was added to it."""
+        if not self.changed:
+            return
+        folder = os.path.dirname(self.file_name) or '.'
+        try:
+            os.makedirs(folder, exist_ok=True)
+            # Page workers may save at the same time, so never leave a partial file
+            fileDescriptor, partialName = tempfile.mkstemp(dir=folder, suffix='.partial')
+            try:
+                with os.fdopen(fileDescriptor, 'w', encoding='utf-8') as partialFile:
+                    json.dump({'version': [FONT_METADATA_CACHE_VERSION, fontTools.version],
+                               'fonts': self.fonts}, partialFile)
+                os.replace(partialName, self.file_name)
+            except OSError:
+                if os.path.exists(partialName):
+                    os.remove(partialName)
+                raise
+        except OSError as exception:
+            logging.warning(f'Could not save the font metadata cache {self.file_name}: {exception}')
+            return
+        self.changed = False
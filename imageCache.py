@@ -0,0 +1,159 @@
+"""Persistent cache of the encoded pixels drawn for image areas.
+
+Cropping, resizing and re-encoding a photograph is the most expensive step in
+rendering most albums, and its result depends only on the source file and a
+handful of area settings.  Reconverting an album after a small edit therefore
+repeats a great deal of work.  This cache stores the final JPEG or PNG bytes
+under the app data folder, addressed by a hash of the source file's content
+and every parameter that affects the pixels, so that an unchanged image area
+can be drawn without Pillow decoding the original photograph at all.
+
+The cache is limited in size.  A hit refreshes the file's modification time,
+and :meth:`ImageCache.prune` removes the least recently used files once the
+conversion is complete.
+"""
+
+import hashlib
+import logging
+import os
+import tempfile
+
+import PIL
+
+from configUtils import getConfigurationBool, getConfigurationInt
+from pathutils import appdata_dir
+
+# Increase this when a change to the image pipeline alters the pixels stored
+# for unchanged parameters, so that old entries are no longer found.
+IMAGE_CACHE_VERSION = 2
+
+IMAGE_CACHE_FOLDER_NAME = 'imagecache'
+
+_EXTENSIONS = {'JPEG': '.jpg', 'PNG': '.png'}
+
+
+class ImageCache:
+    """Content-addressed, size-limited store of encoded image-area pixels."""
+
+    def __init__(self, folder, sizeLimitBytes):
+        self.folder = str(folder)
+        self.size_limit_bytes = sizeLimitBytes
+        self.source_hashes = {}
+
+    @staticmethod
+    def fromConfiguration(configSection, appDataDir):
+        """Return the cache configured for this conversion, or None if disabled.
+
+        The IGNOREIMAGECACHE environment variable disables the cache in the
+        user's app data folder, though not one in an explicit appDataDir.
+        """
+        if not getConfigurationBool(configSection, 'imageCache', 'True'):
+            return None
+        sizeLimitMB = getConfigurationInt(configSection, 'imageCacheSizeMB', '1024', 0)
+        if sizeLimitMB == 0:
+            return None
+        if appDataDir is None and os.getenv('IGNOREIMAGECACHE') is not None:
+            # The regression tests set this, so that they do not fill the user's own cache
+            return None
+        baseFolder = appDataDir if appDataDir is not None else appdata_dir()
+        return ImageCache(os.path.join(baseFolder, IMAGE_CACHE_FOLDER_NAME), sizeLimitMB * 1024 * 1024)
+
+    def sourceHash(self, fileName):
+        """Return the content hash of a source file, reading it once per conversion."""
+        fileStat = os.stat(fileName)
+        memoKey = (fileName, fileStat.st_size, fileStat.st_mtime_ns)
+        contentHash = self.source_hashes.get(memoKey)
+        if contentHash is None:
+            digest = hashlib.sha256()
+            with open(fileName, 'rb') as sourceFile:
+                for chunk in iter(lambda: sourceFile.read(1024 * 1024), b''):
+                    digest.update(chunk)
+            contentHash = digest.hexdigest()
+            self.source_hashes[memoKey] = contentHash
+        return contentHash
+
+    def fileSignature(self, fileName):
+        """Identify a supporting file, such as a mask, which also affects the pixels."""
+        if fileName is None:
+            return None
+        try:
+            return (fileName, self.sourceHash(fileName))
+        except OSError:
+            return (fileName, None)
+
+    @staticmethod
+    def makeKey(*parameters):
+        """Combine the source hash and area parameters into one cache key."""
+        description = repr((IMAGE_CACHE_VERSION, PIL.__version__) + parameters)
+        return hashlib.sha256(description.encode('utf-8')).hexdigest()
+
+    def _entryName(self, key, imageFormat):
+        return os.path.join(self.folder, key[:2], key + _EXTENSIONS[imageFormat])
+
+    def load(self, key):
+        """Return the encoded bytes of a cached entry, or None if there is none."""
+        for imageFormat in _EXTENSIONS:
+            entryName = self._entryName(key, imageFormat)
+            try:
+                with open(entryName, 'rb') as entryFile:
+                    encodedBytes = entryFile.read()
+                # Touching the entry records its use for least-recently-used pruning.
+                os.utime(entryName)
+            except OSError:
+                continue
+            return encodedBytes
+        return None
+
+    def store(self, key, imageFormat, encodedBytes):
+        """Save encoded image bytes, returning the entry's file name, or None on failure."""
+        entryName = self._entryName(key, imageFormat)
+        entryFolder = os.path.dirname(entryName)
+        try:
+            os.makedirs(entryFolder, exist_ok=True)
+            # Write to a unique name first: page workers may store the same
+            # entry simultaneously, and a reader must never see a partial file.
+            fileDescriptor, partialName = tempfile.mkstemp(dir=entryFolder, suffix='.partial')
+            try:
+                with os.fdopen(fileDescriptor, 'wb') as partialFile:
+                    partialFile.write(encodedBytes)
+                os.replace(partialName, entryName)
+            except OSError:
+                if os.path.exists(partialName):
+                    os.remove(partialName)
+                raise
+        except OSError as exception:
+            logging.warning(f'Could not store image cache entry {entryName}: {exception}')
+            return None
+        return entryName
+
+    def prune(self):
+        """Remove the least recently used entries until the cache fits its size limit."""
+        entries = []
+        totalBytes = 0
+        try:
+            with os.scandir(self.folder) as subFolders:
+                for subFolder in subFolders:
+                    if not subFolder.is_dir():
+                        continue
+                    with os.scandir(subFolder.path) as files:
+                        for entry in files:
+                            entryStat = entry.stat()
+                            entries.append((entryStat.st_mtime, entryStat.st_size, entry.path))
+                            totalBytes += entryStat.st_size
+        except OSError as exception:
+            logging.warning(f'Could not scan the image cache {self.folder}: {exception}')
+            return 0
+
+        removedCount = 0
+        for _mtime, size, entryName in sorted(entries):
+            if totalBytes <= self.size_limit_bytes:
+                break
+            try:
+                os.remove(entryName)
+            except OSError:
+                continue
+            totalBytes -= size
+            removedCount += 1
+        if removedCount > 0:
+            logging.info(f'Removed {removedCount} least recently used image cache entries from {self.folder}')
+        return removedCount
@@ -12,8 +12,8 @@ def extractMcfx(inputFile, imageDir):
     does not decode or convert photographs.  In particular, a .heic file is
     copied unchanged and does not require pillow_heif.
     """
-    # unpackMcfx() changes to the extraction directory while it works, so
-    # resolve both caller-supplied paths before handing them over.
+    # Resolve both caller-supplied paths, so that the data.mcf path returned
+    # by unpackMcfx() is absolute too.
     inputFilePath = Path(inputFile).resolve()
     imageDirPath = Path(imageDir).resolve()
     _, mcfxmlname = unpackMcfx(inputFilePath, imageDirPath)
@@ -1,14 +1,69 @@
+import functools
+import hashlib
+import io
+import logging
+import os
+import tempfile
+
 import PIL
+from reportlab.lib.utils import ImageReader
+
+
+# The PDF transformation equivalent to each EXIF orientation, as corrected by
+# autorot below: a rotation in degrees, then horizontal and vertical scales.
+EXIF_ORIENTATION_PDF_TRANSFORMS = {
+    1: (0, 1, 1),
+    2: (0, -1, 1),
+    3: (180, 1, 1),
+    4: (0, 1, -1),
+    5: (90, 1, -1),
+    6: (-90, 1, 1),
+    7: (90, -1, 1),
+    8: (90, 1, 1),
+}
+
+
+# Photos the album editor may store directly in the HEIF format
+HEIF_SUFFIXES = ('.heic', '.heif', '.hif')
+
+
+@functools.cache
+def registerHeifOpener():
+    """Make it possible for PIL.Image to open .heic files, once, when the first one is drawn.
+
+    pillow_heif is slow to import, so it is not loaded for the albums which do
+    not need it. ref https://github.com/bash0/cewe2pdf/issues/130
+    """
+    try:
+        # the absence of heif handling is handled so pylint: disable-next=import-error,import-outside-toplevel
+        from pillow_heif import register_heif_opener
+    except ModuleNotFoundError as heifex:
+        logging.warning(f"{heifex.msg}: direct use of .heic images is not available without pillow_heif available")
+        return False
+    register_heif_opener()
+    return True
+
+
+def isHeifFile(fileName):
+    """True if the file name is that of a HEIF photo, which PIL can open only after registerHeifOpener."""
+    return os.path.splitext(fileName)[1].lower() in HEIF_SUFFIXES
+
+
+def getExifOrientation(im):
+    """Return the EXIF orientation of a JPEG image, 1 if it has none."""
+    ExifRotationTag = 274
+    exifdict = im.getexif()
+    if exifdict is not None and ExifRotationTag in list(exifdict.keys()):
+        return exifdict[ExifRotationTag]
+    return 1
 
 
 def autorot(im):
     # some cameras return JPEG in MPO container format. Just use the first image.
     if im.format not in ('JPEG', 'MPO'):
         return im
-    ExifRotationTag = 274
-    exifdict = im.getexif()
-    if exifdict is not None and ExifRotationTag in list(exifdict.keys()):
-        orientation = exifdict[ExifRotationTag]
+    orientation = getExifOrientation(im)
+    if orientation != 1:
         # The PIL.Image values must be dynamic in some way so disable pylint no-member
         if orientation == 2:
             im = im.transpose(PIL.Image.FLIP_LEFT_RIGHT) # pylint: disable=no-member
@@ -27,3 +82,49 @@ def autorot(im):
         elif orientation == 8:
             im = im.transpose(PIL.Image.ROTATE_90) # pylint: disable=no-member
     return im
+
+
+def encodedImageReader(encodedImage, state, useTemporaryFile=False):
+    """Return a ReportLab ImageReader for an already encoded PNG or JPEG image.
+
+    The bytes are normally read from memory.  With ``useTemporaryFile`` they
+    are written to a temporary file instead, which the conversion deletes when
+    it ends.  That was the only behaviour before in-memory images were used,
+    and remains as a fallback.
+    """
+    if not useTemporaryFile:
+        state.performance_counters['temporary image bytes not written'] += len(encodedImage)
+        return ImageReader(io.BytesIO(encodedImage))
+
+    # The file must be closed before it can be reopened on Windows.
+    with tempfile.NamedTemporaryFile(delete=False) as temporaryImage:
+        temporaryImage.write(encodedImage)
+    state.temporary_files.append(temporaryImage.name)
+    return ImageReader(temporaryImage.name)
+
+
+def drawEncodedImage(pdf, encodedImage, x, y, width, height, state,
+                     useTemporaryFile=False, mask=None):
+    """Draw an encoded PNG or JPEG image, sharing one PDF image XObject between identical draws.
+
+    ReportLab itself recognises a repeated image only after decoding it to
+    compute a pixel digest.  The encoded bytes are fingerprinted here instead,
+    so that a photo or background drawn again is simply referenced again.
+    """
+    fingerprint = (hashlib.sha256(encodedImage).hexdigest(), str(mask))
+    xobjectName = state.image_xobject_names.get(fingerprint)
+    if xobjectName is not None and pdf.hasForm(xobjectName):
+        state.performance_counters['shared image draws'] += 1
+        state.performance_counters['shared image bytes not decoded again'] += len(encodedImage)
+        # The same operations as Canvas.drawImage, without recreating the image
+        pdf.saveState()
+        pdf.translate(x, y)
+        pdf.scale(width, height)
+        pdf.doForm(xobjectName)
+        pdf.restoreState()
+        return
+
+    drawDetails = {'name': None}
+    pdf.drawImage(encodedImageReader(encodedImage, state, useTemporaryFile), x, y,
+                  width=width, height=height, mask=mask, extraReturn=drawDetails)
+    state.image_xobject_names[fingerprint] = drawDetails['name']
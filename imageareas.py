@@ -1,22 +1,27 @@
 """Rendering of CEWE image and image-background areas."""
 
+import io
 import logging
 import os
-import tempfile
-from math import sqrt
+from math import ceil, sqrt
 
 import PIL
-from reportlab.lib.utils import ImageReader
 
 from ceweInfo import AlbumInfo
 from clipArt import getClipConfig, loadClipart
 from clipartareas import insertClipartFile
+from conversionProfile import profiled
 from conversionState import ConversionState
-from corners import applyCornerMask, getCornersInfo
-from imageUtils import autorot
+from corners import CornerShape, applyCornerMask, getCornersInfo
+from imageUtils import (EXIF_ORIENTATION_PDF_TRANSFORMS, autorot, drawEncodedImage, getExifOrientation,
+                        isHeifFile, registerHeifOpener)
 from passepartout import Passepartout
 from renderContext import RenderContext
 
+# A JPEG decoded at reduced scale keeps at least this many pixels for each
+# output pixel, so that the final Lanczos resize still determines the quality.
+JPEG_DRAFT_OVERSAMPLING = 2
+
 
 def processAreaImageTag(imageTag, area, areaHeight, areaRot, areaWidth, imageDirectory,
                         productStyle, mcfBaseFolder, pageType, pdf, pageWidth,
@@ -30,7 +35,6 @@ def processAreaImageTag(imageTag, area, areaHeight, areaRot, areaWidth, imageDir
     imagePath = os.path.join(mcfBaseFolder, imageDirectory, imageTag.get('filename'))
     # The layout software copies the images to another collection folder.
     imagePath = imagePath.replace('safecontainer:/', '')
-    image = PIL.Image.open(imagePath)
 
     imageTransx = transx
     if (imageTag.get('backgroundPosition') == 'RIGHT_OR_BOTTOM' and
@@ -42,11 +46,6 @@ def processAreaImageTag(imageTag, area, areaHeight, areaRot, areaWidth, imageDir
         # image completely off the PDF page.
         imageTransx += mcf2rl * pageWidth / 2
 
-    # The source image is first cropped in MCF coordinates, then resized for
-    # the output PDF. Decorations are applied to that final crop so masks,
-    # corners, shadows and borders all describe the visible image rather than
-    # the original photograph.
-    image = autorot(image)
     imageLeft = float(imageTag.find('cutout').get('left').replace(',', '.'))
     imageTop = float(imageTag.find('cutout').get('top').replace(',', '.'))
     imageScale = float(imageTag.find('cutout').get('scale'))
@@ -63,7 +62,7 @@ def processAreaImageTag(imageTag, area, areaHeight, areaRot, areaWidth, imageDir
         passepartoutId = int(passepartoutId)
         if state.passepartout_files is None:
             logging.info("Regenerating passepartout index from .XML files.")
-            state.passepartout_files = Passepartout.buildElementIdIndex(context.passepartout_folders)
+            state.passepartout_files = _getPassepartoutIndex(context.passepartout_folders, state)
         try:
             passepartoutXmlFileName = state.passepartout_files[passepartoutId]
         except KeyError:
@@ -89,7 +88,6 @@ def processAreaImageTag(imageTag, area, areaHeight, areaRot, areaWidth, imageDir
                     imageCropWidth_mcfunit / imageScale)
     cropLower = int(0.5 - imageTop / imageScale + 0 * frameDeltaY_mcfunit / imageScale +
                     imageCropHeight_mcfunit / imageScale)
-    image = image.crop((cropLeft, cropUpper, cropRight, cropLower))
 
     # Retain the established page-type check, including its historical string
     # comparison, so this extraction does not change rendered output.
@@ -99,25 +97,22 @@ def processAreaImageTag(imageTag, area, areaHeight, areaRot, areaWidth, imageDir
         resolution = context.image_resolution
     newWidth = int(0.5 + imageCropWidth_mcfunit * resolution / 254.0)
     newHeight = int(0.5 + imageCropHeight_mcfunit * resolution / 254.0)
-    factor = sqrt(newWidth * newHeight / float(image.size[0] * image.size[1]))
-    if factor <= 0.8:
-        image = image.resize((newWidth, newHeight), context.image_resampling_filter)
-    image.load()
-
-    if maskClipartFileName is not None:
-        maskClipart = loadClipart(maskClipartFileName, context.clipart_paths)
-        image = maskClipart.applyAsAlphaMaskToFoto(image)
-
+    cropBox = (cropLeft, cropUpper, cropRight, cropLower)
     cornersInfo = getCornersInfo(area)
-    image = applyCornerMask(image, cornersInfo, imageCropWidth_mcfunit)
 
-    temporaryImage = tempfile.NamedTemporaryFile()
-    # The file must be closed before PIL can reopen it on Windows.
-    temporaryImage.close()
-    if image.mode in ('RGBA', 'P'):
-        image.save(temporaryImage.name, "PNG")
+    passthroughOrientation = _getJpegPassthroughOrientation(
+        imagePath, cropBox, (newWidth, newHeight), maskClipartFileName, cornersInfo, context, state)
+    if passthroughOrientation is not None:
+        state.performance_counters['jpeg passthrough images'] += 1
+        with _openAlbumFile(imagePath, state) as sourceFile:
+            encodedImage = sourceFile.read()
+        # A shadow needs only the size and alpha channel of an opaque photo,
+        # so there is no need to decode it.
+        image = PIL.Image.new('L', cropBox[2:], 255)
     else:
-        image.save(temporaryImage.name, "JPEG", quality=context.image_quality)
+        image, encodedImage = _getEncodedAreaImage(
+            imagePath, cropBox, (newWidth, newHeight), maskClipartFileName,
+            cornersInfo, imageCropWidth_mcfunit, context, state)
 
     logging.debug(f"image: {imageTag.get('filename')}")
     pdf.translate(imageTransx, transy)
@@ -133,18 +128,25 @@ def processAreaImageTag(imageTag, area, areaHeight, areaRot, areaWidth, imageDir
         drawShadow(decorationTag, areaHeight, areaWidth, pdf, context, state,
                    image, imageCropWidth_mcfunit, imageCropHeight_mcfunit)
 
-    pdf.drawImage(ImageReader(temporaryImage.name),
-                  mcf2rl * -0.5 * imageCropWidth_mcfunit,
-                  mcf2rl * -0.5 * imageCropHeight_mcfunit,
-                  width=mcf2rl * imageCropWidth_mcfunit,
-                  height=mcf2rl * imageCropHeight_mcfunit, mask='auto')
+    if passthroughOrientation is None:
+        drawEncodedImage(pdf, encodedImage,
+                         mcf2rl * -0.5 * imageCropWidth_mcfunit,
+                         mcf2rl * -0.5 * imageCropHeight_mcfunit,
+                         mcf2rl * imageCropWidth_mcfunit,
+                         mcf2rl * imageCropHeight_mcfunit,
+                         state, context.image_temporary_files, mask='auto')
+    else:
+        _drawOrientedImage(pdf, encodedImage, passthroughOrientation,
+                           mcf2rl * imageCropWidth_mcfunit, mcf2rl * imageCropHeight_mcfunit,
+                           state, context.image_temporary_files)
     pdf.translate(frameShiftX_mcf * mcf2rl, frameShiftY_mcf * mcf2rl)
 
     if frameClipartFileName is not None:
         colorReplacements, _flipX, _flipY = getClipConfig(imageTag)
-        insertClipartFile(frameClipartFileName, colorReplacements, 0, areaWidth,
-                          areaHeight, frameAlpha, pdf, 0, 0, False, False,
-                          None, context)
+        with profiled(state, 'insertClipartFile'):
+            insertClipartFile(frameClipartFileName, colorReplacements, 0, areaWidth,
+                              areaHeight, frameAlpha, pdf, 0, 0, False, False,
+                              None, context, state)
 
     for decorationTag in area.findall('decoration'):
         drawBorders(decorationTag, areaHeight, areaWidth, pdf, context, cornersInfo)
@@ -152,4 +154,185 @@ def processAreaImageTag(imageTag, area, areaHeight, areaRot, areaWidth, imageDir
     pdf.rotate(areaRot)
     pdf.translate(-imageTransx, -transy)
 
-    state.temporary_files.append(temporaryImage.name)
+
+def _getPassepartoutIndex(passepartoutFolders, state: ConversionState):
+    """Return the passepartout designElementId index, from the resource catalogue if possible."""
+    if state.resource_catalogue is None:
+        return Passepartout.buildElementIdIndex(passepartoutFolders)
+    passepartoutIndex = state.resource_catalogue.getIndex(
+        'passepartout', passepartoutFolders,
+        lambda: Passepartout.buildElementIdIndex(passepartoutFolders))
+    return {int(designElementId): fileName for designElementId, fileName in passepartoutIndex.items()}
+
+
+def _openAlbumFile(imagePath, state: ConversionState):
+    """Open an album image for reading, from the mcfx database if the album was not unpacked."""
+    if isHeifFile(imagePath):
+        registerHeifOpener()
+    mcfxContainer = state.mcfx_container
+    if mcfxContainer is not None:
+        containerName = mcfxContainer.containerName(imagePath)
+        if containerName is not None:
+            return mcfxContainer.open(containerName)
+    return open(imagePath, 'rb')
+
+
+def _getAlbumFileHash(imagePath, imageCache, state: ConversionState):
+    """Return the content hash of an album image, which identifies it in the image cache."""
+    mcfxContainer = state.mcfx_container
+    if mcfxContainer is not None:
+        containerName = mcfxContainer.containerName(imagePath)
+        if containerName is not None:
+            return mcfxContainer.contentHash(containerName)
+    return imageCache.sourceHash(imagePath)
+
+
+def _getJpegPassthroughOrientation(imagePath, cropBox, newSize, maskClipartFileName,
+                                   cornersInfo, context: RenderContext, state: ConversionState):
+    """Return the EXIF orientation if the source JPEG can be embedded unchanged.
+
+    That is possible when the area shows the whole photo, the photo would not
+    be downsampled, and there is no mask or corner to apply.  Otherwise, or
+    if passthrough is disabled, return None.
+    """
+    if not context.jpeg_passthrough or maskClipartFileName is not None:
+        return None
+    if any(corner.shape != CornerShape.Default for corner in cornersInfo):
+        return None
+
+    with _openAlbumFile(imagePath, state) as sourceFile, PIL.Image.open(sourceFile) as sourceImage:
+        # Only the header has been read at this point.
+        if sourceImage.format != 'JPEG' or sourceImage.mode not in ('L', 'RGB'):
+            return None
+        orientation = getExifOrientation(sourceImage)
+        width, height = sourceImage.size
+    if orientation not in EXIF_ORIENTATION_PDF_TRANSFORMS:
+        return None
+    if EXIF_ORIENTATION_PDF_TRANSFORMS[orientation][0] in (90, -90):
+        width, height = height, width
+    if cropBox != (0, 0, width, height):
+        return None
+
+    # Match the resize decision in _prepareAreaImage.
+    newWidth, newHeight = newSize
+    if sqrt(newWidth * newHeight / float(width * height)) <= 0.8:
+        return None
+    return orientation
+
+
+def _drawOrientedImage(pdf, encodedImage, orientation, width, height,
+                       state: ConversionState, useTemporaryFile=False):
+    """Draw a stored JPEG centred on the origin, applying its EXIF orientation in the PDF."""
+    rotation, scaleX, scaleY = EXIF_ORIENTATION_PDF_TRANSFORMS[orientation]
+    if rotation in (90, -90):
+        width, height = height, width
+    pdf.saveState()
+    pdf.rotate(rotation)
+    pdf.scale(scaleX, scaleY)
+    drawEncodedImage(pdf, encodedImage, -0.5 * width, -0.5 * height, width, height,
+                     state, useTemporaryFile)
+    pdf.restoreState()
+
+
+def _getEncodedAreaImage(imagePath, cropBox, newSize, maskClipartFileName, cornersInfo,
+                         imageCropWidth_mcfunit, context: RenderContext, state: ConversionState):
+    """Return the prepared area pixels and their encoded bytes, using the image cache."""
+    imageCache = state.image_cache
+    if imageCache is not None:
+        cacheKey = imageCache.makeKey(
+            _getAlbumFileHash(imagePath, imageCache, state), cropBox, newSize,
+            repr(context.image_resampling_filter), context.image_quality,
+            context.jpeg_draft_mode, imageCache.fileSignature(maskClipartFileName),
+            cornersInfo, imageCropWidth_mcfunit)
+        encodedImage = imageCache.load(cacheKey)
+        if encodedImage is not None:
+            state.performance_counters['image cache hits'] += 1
+            # The cached pixels are decoded only if a shadow decoration needs them.
+            return PIL.Image.open(io.BytesIO(encodedImage)), encodedImage
+
+    image = _prepareAreaImage(imagePath, cropBox, newSize, maskClipartFileName,
+                              cornersInfo, imageCropWidth_mcfunit, context, state)
+    imageFormat, encodedImage = _encodeAreaImage(image, context)
+    state.performance_counters['re-encoded images'] += 1
+    if imageCache is not None:
+        state.performance_counters['image cache misses'] += 1
+        imageCache.store(cacheKey, imageFormat, encodedImage)
+    return image, encodedImage
+
+
+def _prepareAreaImage(imagePath, cropBox, newSize, maskClipartFileName, cornersInfo,
+                      imageCropWidth_mcfunit, context: RenderContext, state: ConversionState):
+    """Return the cropped, resized and masked pixels drawn for an image area.
+
+    The source image is first cropped in MCF coordinates, then resized for
+    the output PDF. Decorations are applied to that final crop so masks,
+    corners, shadows and borders all describe the visible image rather than
+    the original photograph.
+    """
+    with _openAlbumFile(imagePath, state) as sourceFile:
+        image = PIL.Image.open(sourceFile)
+        draftBox = _decodeJpegAtReducedScale(image, cropBox, newSize) if context.jpeg_draft_mode else None
+        image = autorot(image)
+        # Cropping or resizing decodes the image, so the file is no longer needed afterwards
+        if draftBox is None:
+            image = image.crop(cropBox)
+        elif 0 <= draftBox[0] and 0 <= draftBox[1] and draftBox[2] <= image.width and draftBox[3] <= image.height:
+            # Resizing straight from the unrounded box keeps the area registered
+            # with a full size decode, to a fraction of a reduced pixel
+            image = image.resize(newSize, context.image_resampling_filter, box=draftBox)
+        else:
+            # Pillow only fills a crop lying outside the image with black
+            image = image.crop(tuple(int(round(edge)) for edge in draftBox))
+
+    newWidth, newHeight = newSize
+    factor = sqrt(newWidth * newHeight / float(image.size[0] * image.size[1]))
+    if factor <= 0.8:
+        image = image.resize((newWidth, newHeight), context.image_resampling_filter)
+    image.load()
+
+    if maskClipartFileName is not None:
+        maskClipart = loadClipart(maskClipartFileName, context.clipart_paths)
+        image = maskClipart.applyAsAlphaMaskToFoto(image)
+
+    return applyCornerMask(image, cornersInfo, imageCropWidth_mcfunit)
+
+
+def _decodeJpegAtReducedScale(image, cropBox, newSize):
+    """Let a large JPEG decode at 1/2, 1/4 or 1/8 scale if the area does not need more.
+
+    The reduced image still has at least JPEG_DRAFT_OVERSAMPLING times the
+    pixels of the final output along each side, so the usual resize does the
+    final filtering.  Returns the crop box scaled to the reduced image, unrounded,
+    or None if the image is decoded at full size.
+    """
+    if image.format != 'JPEG':
+        return None
+    cropWidth = cropBox[2] - cropBox[0]
+    cropHeight = cropBox[3] - cropBox[1]
+    if cropWidth <= 0 or cropHeight <= 0:
+        return None
+    newWidth, newHeight = newSize
+    requiredScale = JPEG_DRAFT_OVERSAMPLING * max(newWidth / cropWidth, newHeight / cropHeight)
+    if requiredScale >= 0.5:
+        return None
+
+    # The crop box describes the image after autorot, but draft() works on
+    # the stored image, whose sides are exchanged by a 90 degree orientation.
+    rotated = EXIF_ORIENTATION_PDF_TRANSFORMS.get(getExifOrientation(image), (0,))[0] in (90, -90)
+    storedWidth, storedHeight = image.size
+    image.draft(image.mode, (ceil(storedWidth * requiredScale), ceil(storedHeight * requiredScale)))
+    scaleX = image.size[0] / storedWidth
+    scaleY = image.size[1] / storedHeight
+    if rotated:
+        scaleX, scaleY = scaleY, scaleX
+    return (cropBox[0] * scaleX, cropBox[1] * scaleY, cropBox[2] * scaleX, cropBox[3] * scaleY)
+
+
+def _encodeAreaImage(image, context: RenderContext):
+    """Encode area pixels as PNG when they have transparency, otherwise as JPEG."""
+    encodedImage = io.BytesIO()
+    if image.mode in ('RGBA', 'P'):
+        image.save(encodedImage, "PNG")
+        return 'PNG', encodedImage.getvalue()
+    image.save(encodedImage, "JPEG", quality=context.image_quality)
+    return 'JPEG', encodedImage.getvalue()
@@ -4,28 +4,192 @@
 # content for the file. We create a temporary directory and unpack all
 # the files to there. One of these files is the .mcf file in exactly the
 # format which we have used for previous versions.
+#
+# Alternatively, McfxContainer leaves the files in the database, and the
+# image handling reads each photo from there as it is drawn.
 
 # This code is basically taken from
 # https://pynative.com/python-sqlite-blob-insert-and-retrieve-digital-data/#h-retrieve-image-and-file-stored-as-a-blob-from-sqlite-table
 
+import hashlib
 import logging
 import os
 import tempfile
 import sqlite3
 import sys
+import threading
 
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 
+# Photos are copied from the database to their files in pieces of this size,
+# so that the memory used does not depend on the size of the photos or the album
+BLOB_CHUNK_SIZE = 1024 * 1024
+
+# Photos are written by this many threads at once
+MCFX_WRITER_THREADS = 4
+
+# Selected files are fetched with at most this many names in one query, well
+# below the smallest limit on the number of variables in an SQLite statement
+MCFX_NAMES_PER_QUERY = 500
+
+
 def writeTofile(data, filename):
     # logging.info("Writing {}".format(filename))
     with open(filename, 'wb') as file:
         file.write(data)
 
 
-def unpackMcfx(mcfxPath: Path, tempdirPath): # pylint: disable=too-many-statements
+def writeBlobToFile(connection, rowid, filename):
+    """Copy the Data of one row of the Files table to a file, one chunk at a time."""
+    with connection.blobopen('Files', 'Data', rowid, readonly=True) as blob:
+        with open(filename, 'wb') as file:
+            for chunk in iter(lambda: blob.read(BLOB_CHUNK_SIZE), b''):
+                file.write(chunk)
+
+
+class _ThreadConnections:
+    """One read-only connection to the mcfx database for each writing thread.
+
+    An sqlite3 connection must not be shared between threads, so each
+    thread of the pool opens its own when it writes its first file.
+    """
+
+    def __init__(self, databaseUri):
+        self.database_uri = databaseUri
+        self.local = threading.local()
+        self.connections = []
+
+    def get(self):
+        connection = getattr(self.local, 'connection', None)
+        if connection is None:
+            # Closed by closeAll in the thread which created this object
+            connection = sqlite3.connect(self.database_uri, uri=True, check_same_thread=False)
+            self.local.connection = connection
+            self.connections.append(connection)
+        return connection
+
+    def writeRowToFile(self, rowid, filename):
+        """Copy the Data of one row to a file, using this thread's connection."""
+        writeBlobToFile(self.get(), rowid, filename)
+
+    def closeAll(self):
+        for connection in self.connections:
+            connection.close()
+        self.connections.clear()
+
+
+def trimMcfContent(filecontent):
+    """Return the data.mcf from an mcfx file without anything after its fotobook element."""
+    # data.mcf from an mcfx file has been found to contain extra content of various
+    # kinds after b'<fotobook>...</fotobook>'. Make sure that we don't return any of that
+    # with the xml we give back to the main code by shortening the length of the file
+    # we write to contain only the data up to and and including the closing fotobook tag
+    endtag = b'</fotobook>'
+    fotobookend = filecontent.find(endtag)
+    if fotobookend == -1:
+        logging.error(f'The mcf in the mcfx file does not contain the required end tag {endtag.decode("utf-8")}')
+        sys.exit(1)
+    return filecontent[:fotobookend + len(endtag)]
+
+
+class McfxContainer:
+    """Read the files of an mcfx album directly from its database, without unpacking them.
+
+    The album's files appear to be in a folder named like the mcfx file
+    itself, so that image paths are built exactly as for an unpacked album,
+    and :meth:`containerName` recognises them.
+    """
+
+    def __init__(self, mcfxPath: Path):
+        self.mcfx_path = Path(mcfxPath).resolve()
+        self.folder = str(self.mcfx_path)
+        self.content_hashes = {}
+        try:
+            self.connection = sqlite3.connect(f"{self.mcfx_path.as_uri()}?mode=ro", uri=True)
+            self.files = dict((filename, rowid) for rowid, filename in
+                              self.connection.execute("SELECT rowid, Filename FROM Files"))
+        except sqlite3.Error as error:
+            logging.error(f"Exiting: sqllite3 failed to read the mcfx file {self.mcfx_path}: {error}")
+            sys.exit(1)
+        mcfNames = [filename for filename in self.files if filename.endswith(".mcf")]
+        if len(mcfNames) != 1:
+            logging.error(f"Exiting: found {len(mcfNames)} mcf files in the mcfx database, rather than one!")
+            sys.exit(1)
+        self.mcf_name = mcfNames[0]
+        logging.info(f"Reading {len(self.files)} files directly from {self.mcfx_path}")
+
+    def mcfFileName(self):
+        """Return the name data.mcf appears to have, in the folder of the album files."""
+        return Path(self.folder) / self.mcf_name
+
+    def readMcf(self):
+        """Return the contents of data.mcf."""
+        with self.open(self.mcf_name) as blob:
+            return trimMcfContent(blob.read())
+
+    def containerName(self, fileName):
+        """Return the name in the database of a file below self.folder, or None if it is not there."""
+        try:
+            relativeName = os.path.relpath(fileName, self.folder)
+        except ValueError:
+            return None     # on another Windows drive
+        if relativeName.startswith(os.pardir):
+            return None
+        containerName = relativeName.replace(os.sep, '/')
+        return containerName if containerName in self.files else None
+
+    def open(self, containerName):
+        """Return a read-only file-like object over one file in the database."""
+        return self.connection.blobopen('Files', 'Data', self.files[containerName], readonly=True)
+
+    def contentHash(self, containerName):
+        """Return the sha256 hash of one file, reading it only once."""
+        contentHash = self.content_hashes.get(containerName)
+        if contentHash is None:
+            digest = hashlib.sha256()
+            with self.open(containerName) as blob:
+                for chunk in iter(lambda: blob.read(BLOB_CHUNK_SIZE), b''):
+                    digest.update(chunk)
+            contentHash = digest.hexdigest()
+            self.content_hashes[containerName] = contentHash
+        return contentHash
+
+    def close(self):
+        self.connection.close()
+
+
+def _selectFilesQueries(fileNames):
+    """Return the (sql, parameters) queries which find the files to unpack.
+
+    With no fileNames every file is unpacked. Otherwise only data.mcf and the
+    named files are, and the names are passed in batches of MCFX_NAMES_PER_QUERY.
+    """
+    selectFiles = "SELECT rowid, Filename, LastModified FROM Files"
+    if fileNames is None:
+        return [(selectFiles, ())]
+    queries = [(f"{selectFiles} WHERE Filename GLOB '*.mcf'", ())]
+    fileNames = sorted(set(fileNames))
+    for start in range(0, len(fileNames), MCFX_NAMES_PER_QUERY):
+        batch = fileNames[start:start + MCFX_NAMES_PER_QUERY]
+        placeholders = ", ".join("?" * len(batch))
+        queries.append((f"{selectFiles} WHERE Filename IN ({placeholders}) AND Filename NOT GLOB '*.mcf'",
+                        tuple(batch)))
+    return queries
+
+
+def unpackMcfx(mcfxPath: Path, tempdirPath, writerThreads=MCFX_WRITER_THREADS, fileNames=None): # pylint: disable=too-many-statements
+    """Unpack an mcfx album to tempdirPath, or to a new temporary directory if that is None.
+
+    Only absolute paths are used, never the current directory, so that
+    different albums can be unpacked at the same time from several threads.
+    If fileNames is given, only data.mcf and the files with those names in
+    the database are unpacked, so an empty collection unpacks data.mcf alone.
+    Returns the TemporaryDirectory, if one was created, and the data.mcf name.
+    """
     mcfname = ""
-    curdir = os.getcwd()
     connection = None
+    threadConnections = None
 
     tempdir = None
     if tempdirPath is not None:
@@ -35,63 +199,76 @@ def unpackMcfx(mcfxPath: Path, tempdirPath): # pylint: disable=too-many-statemen
         # we actually return the tempdir resource so keep pylint quiet here
         tempdir = tempfile.TemporaryDirectory() # pylint: disable=consider-using-with
         tempdirPath = tempdir.name
+    # somewhere like C:\Users\pete\AppData\Local\Temp\tmpshi3s9di
+    unpackFolder = os.path.abspath(tempdirPath)
 
     try:
-        os.chdir(tempdirPath) # somewhere like C:\Users\pete\AppData\Local\Temp\tmpshi3s9di
-        logging.info(f"Unpacking mcfx to {os.getcwd()}")
+        logging.info(f"Unpacking mcfx to {unpackFolder}")
 
         fullname = mcfxPath.resolve()
         mcfxMtime = os.path.getmtime(fullname)
-        connection = sqlite3.connect(fullname)
+        databaseUri = f"{fullname.as_uri()}?mode=ro"
+        connection = sqlite3.connect(databaseUri, uri=True)
         cursor = connection.cursor()
         logging.info(r"Connected to mcfx database")
+        threadConnections = _ThreadConnections(databaseUri)
 
-        sql_fetch_blob_query = """SELECT Filename, Data, LastModified FROM Files"""
-        cursor.execute(sql_fetch_blob_query)
-        record = cursor.fetchall()
+        # Only the names are read here. Each file's data is then streamed from
+        # the database, so an album of any size is never held in memory, by a
+        # small pool of threads: writing to the files releases the GIL.
+        rows = (row for query, parameters in _selectFilesQueries(fileNames)
+                for row in cursor.execute(query, parameters).fetchall())
         warnedAboutNonNumericLastModified = False
-        for row in record:
-            filename = row[0]
-            filecontent = row[1]
-            try:
-                lastchange = float(row[2]) / 1000
-            except (TypeError, ValueError):
-                # .mcfx files are expected to use a numeric millisecond timestamp, but
-                # CEWE files seem to store something else here instead. The timestamp is
-                # only an extraction cache optimisation, so use the containing .mcfx
-                # file's time when it cannot be interpreted safely.
-                if not warnedAboutNonNumericLastModified:
-                    logging.warning(
-                        "Ignoring non-numeric Files.LastModified values in the .mcfx file; "
-                        "files will be re-extracted when needed")
-                    warnedAboutNonNumericLastModified = True
-                lastchange = mcfxMtime
-            if lastchange == 0:
-                lastchange = mcfxMtime
-            if filename.endswith(".mcf"):
-                if mcfname:
-                    logging.error(r"Exiting: found more than one mcf file in the mcfx database!")
-                    sys.exit(1)
-                mcfname = Path(tempdirPath) / filename
-
-                # data.mcf from an mcfx file has been found to contain extra content of various
-                # kinds after b'<fotobook>...</fotobook>'. Make sure that we don't return any of that
-                # with the xml we give back to the main code by shortening the length of the file
-                # we write to contain only the data up to and and including the closing fotobook tag
-                endtag = b'</fotobook>'
-                fotobookend = filecontent.find(endtag)
-                if fotobookend == -1:
-                    logging.error(f'The mcf in the mcfx file does not contain the required end tag {endtag.decode("utf-8")}')
-                    sys.exit(1)
-                filecontent = filecontent[:fotobookend + len(endtag)]
-
-            if os.path.exists(filename) and lastchange < os.path.getmtime(filename):
-                # not changed since last extraction
-                continue
-
-            writeTofile(filecontent, filename)
+        unpackedCount = 0
+        with ThreadPoolExecutor(max_workers=max(1, writerThreads), thread_name_prefix='mcfx') as executor:
+            pendingWrites = []
+            for row in rows:
+                unpackedCount += 1
+                rowid = row[0]
+                filename = row[1]
+                targetname = os.path.join(unpackFolder, filename)
+                try:
+                    lastchange = float(row[2]) / 1000
+                except (TypeError, ValueError):
+                    # .mcfx files are expected to use a numeric millisecond timestamp, but
+                    # CEWE files seem to store something else here instead. The timestamp is
+                    # only an extraction cache optimisation, so use the containing .mcfx
+                    # file's time when it cannot be interpreted safely.
+                    if not warnedAboutNonNumericLastModified:
+                        logging.warning(
+                            "Ignoring non-numeric Files.LastModified values in the .mcfx file; "
+                            "files will be re-extracted when needed")
+                        warnedAboutNonNumericLastModified = True
+                    lastchange = mcfxMtime
+                if lastchange == 0:
+                    lastchange = mcfxMtime
+                if filename.endswith(".mcf"):
+                    if mcfname:
+                        logging.error(r"Exiting: found more than one mcf file in the mcfx database!")
+                        sys.exit(1)
+                    mcfname = Path(tempdirPath) / filename
+                    with connection.blobopen('Files', 'Data', rowid, readonly=True) as blob:
+                        filecontent = blob.read()
+
+                    filecontent = trimMcfContent(filecontent)
+
+                if os.path.exists(targetname) and lastchange < os.path.getmtime(targetname):
+                    # not changed since last extraction
+                    continue
+
+                if filename.endswith(".mcf"):
+                    writeTofile(filecontent, targetname)
+                else:
+                    pendingWrites.append(executor.submit(threadConnections.writeRowToFile, rowid, targetname))
+
+            # Report the first failure, if any, once every write has finished
+            for pendingWrite in pendingWrites:
+                pendingWrite.result()
 
         cursor.close()
+        if fileNames is not None:
+            foundCount = unpackedCount - (1 if mcfname else 0)
+            logging.info(f"Found {foundCount} of the {len(set(fileNames))} requested files in the mcfx")
 
     except sqlite3.Error as error:
         logging.error(f"Exiting: sqllite3 failed to read image or mcf data: {error}")
@@ -101,15 +278,16 @@ def unpackMcfx(mcfxPath: Path, tempdirPath): # pylint: disable=too-many-statemen
         sys.exit(1)
 
     finally:
+        if threadConnections is not None:
+            threadConnections.closeAll()
         if connection:
             connection.close()
             logging.info(r"Disconnected from mcfx database")
-        os.chdir(curdir)
 
         if not mcfname:
             logging.error(r"Exiting: no mcf file found in mcfx")
 
-        logging.info(f"returned to cwd {os.getcwd()}, mcfname {mcfname}")
+        logging.info(f"Unpacked mcfname {mcfname}")
 
     # return tempdir so that we can use cleanup() when we're done with it
     return (tempdir, mcfname)
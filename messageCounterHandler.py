@@ -16,6 +16,11 @@ class MsgCounterHandler(logging.Handler):
             self.levelToCountDict[ln] = 0
         self.levelToCountDict[ln] += 1
 
+    def addCounts(self, levelToCountDict):
+        # add counts from another handler, e.g. one in a page worker process
+        for ln, count in levelToCountDict.items():
+            self.levelToCountDict[ln] = self.levelToCountDict.get(ln, 0) + count
+
     def messageCountText(self):
         # create a text with the counts shown in order from worst to best
         text = ""
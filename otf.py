@@ -3,7 +3,10 @@
 # This code is heavily based on https://github.com/awesometoolbox/otf2ttf/blob/master/src/otf2ttf/cli.py
 # and https://github.com/SwagLyrics/SwagLyrics-For-Spotify/blob/master/swaglyrics/__init__.py#L8-L32
 
+import hashlib
+import multiprocessing
 import os
+import time
 
 from fontTools.pens.cu2quPen import Cu2QuPen
 from fontTools.misc.cliTools import makeOutputFileName
@@ -22,6 +25,10 @@ POST_FORMAT = 2.0
 # we just flip it to clockwise
 REVERSE_DIRECTION = True
 
+# Some fonts, such as CEWE's LiebeGerda-BoldItalic, make the conversion hang,
+# so each conversion is stopped after this many seconds.
+OTF_CONVERSION_TIMEOUT = 60
+
 
 def glyphs_to_quadratic(
     glyphs, max_err=MAX_ERR, reverse_direction=REVERSE_DIRECTION
@@ -80,8 +87,93 @@ def otf_to_ttf(ttFont, post_format=POST_FORMAT, **kwargs):
     ttFont.sfntVersion = "\000\001\000\000"
 
 
-def getTtfsFromOtfs(otfFiles, ttfdirPath=None):
-    resultingTtfFiles = []
+def otfContentHash(otfFile):
+    """Return a short hash of the otf file contents, which names its converted ttf file."""
+    digest = hashlib.sha256()
+    with open(otfFile, 'rb') as otfFileHandle:
+        for block in iter(lambda: otfFileHandle.read(1024 * 1024), b''):
+            digest.update(block)
+    return digest.hexdigest()[:16]
+
+
+def convertOtfToTtf(otfFile, ttfFile):
+    """Convert one otf font, writing the ttf under a temporary name until it is complete."""
+    font = TTFont(otfFile, fontNumber=0) # options.face_index
+    otf_to_ttf(
+        font,
+        post_format=POST_FORMAT, # options.post_format
+        max_err=MAX_ERR, # options.max_error
+        reverse_direction=REVERSE_DIRECTION, # options.reverse_direction
+    )
+    partialTtfFile = f"{ttfFile}.{os.getpid()}.partial"
+    font.save(partialTtfFile)
+    os.replace(partialTtfFile, ttfFile)
+
+
+def _runConversions(conversions, timeoutSeconds, workers):
+    """Run the (otfFile, ttfFile) conversions in separate processes, returning the failed ones.
+
+    A process is used for each font, rather than a pool, so that a
+    conversion which takes too long can be stopped without affecting the others.
+    The result maps each failed conversion to the timeout which stopped it,
+    or to None when the conversion itself failed.
+    """
+    pending = list(conversions)
+    running = {}    # process to its conversion and start time
+    failed = {}
+    while pending or running:
+        while pending and len(running) < workers:
+            otfFile, ttfFile = pending.pop(0)
+            process = multiprocessing.Process(target=convertOtfToTtf, args=(otfFile, ttfFile), daemon=True)
+            process.start()
+            running[process] = (otfFile, ttfFile, time.monotonic())
+        time.sleep(0.05)
+        for process, (otfFile, ttfFile, startTime) in list(running.items()):
+            if process.is_alive():
+                if time.monotonic() - startTime <= timeoutSeconds:
+                    continue
+                process.kill()
+                process.join()
+                partialTtfFile = f"{ttfFile}.{process.pid}.partial"
+                if os.path.exists(partialTtfFile):
+                    os.remove(partialTtfFile)
+                configlogger.error(f"Font conversion otf->ttf stopped after {timeoutSeconds}s: {otfFile}")
+                failed[(otfFile, ttfFile)] = timeoutSeconds
+            elif process.exitcode != 0 or not os.path.exists(ttfFile):
+                configlogger.error(f"Font conversion otf->ttf failed: {otfFile}")
+                failed[(otfFile, ttfFile)] = None
+            del running[process]
+    return failed
+
+
+def getTtfsFromOtfs(otfFiles, ttfdirPath=None, timeoutSeconds=OTF_CONVERSION_TIMEOUT, workers=None):
+    """Return the ttf files converted from otfFiles, converting those not already done.
+
+    Each converted ttf is named by a hash of its otf file's contents, so an
+    updated otf font is converted again. A font whose conversion failed or was
+    stopped is remembered by a .failed file with the same name, and skipped.
+    A stopped font is tried again when timeoutSeconds is larger than the
+    timeout which stopped it.
+    """
+    ttfsFromOtfs = convertOtfFiles(otfFiles, ttfdirPath, timeoutSeconds, workers)
+    return [ttfsFromOtfs[otfFile] for otfFile in otfFiles if otfFile in ttfsFromOtfs]
+
+
+def _mayRetryConversion(failedFile, timeoutSeconds):
+    """Return whether a conversion recorded in a .failed file was only stopped by a smaller timeout.
+
+    A conversion which failed by itself records just the otf file, and is never retried.
+    """
+    with open(failedFile, 'r', encoding='utf-8') as failedFileHandle:
+        lines = failedFileHandle.read().splitlines()
+    if len(lines) > 1 and lines[1].startswith('timeout '):
+        return float(lines[1][len('timeout '):]) < timeoutSeconds
+    return False
+
+
+def convertOtfFiles(otfFiles, ttfdirPath=None, timeoutSeconds=OTF_CONVERSION_TIMEOUT, workers=None):
+    """Return a dictionary from each usable otf file to its ttf file, as getTtfsFromOtfs."""
+    ttfsFromOtfs = {}
 
     if ttfdirPath is None:
         ttfdirPath = appdata_dir()
@@ -89,29 +181,36 @@ def getTtfsFromOtfs(otfFiles, ttfdirPath=None):
     if not os.path.exists(ttfdirPath):
         os.mkdir(ttfdirPath)
 
+    conversions = []
     for otfFile in otfFiles:
-        if "LiebeGerda-BoldItalic" in otfFile:
-            configlogger.info("LiebeGerda-BoldItalic not available: the otf->ttf conversion hangs!")
-            continue # the conversion code hangs on this font!
         ttfFile = makeOutputFileName(
             otfFile,
             outputDir=ttfdirPath,
-            extension=".ttf",
+            extension=f".{otfContentHash(otfFile)}.ttf",
             overWrite=True, # options.overwrite
         )
         if os.path.exists(ttfFile):
             configlogger.info(f"Accepting otf->ttf font conversion: {ttfFile}")
+            ttfsFromOtfs[otfFile] = ttfFile
+        elif os.path.exists(f"{ttfFile}.failed") and not _mayRetryConversion(f"{ttfFile}.failed", timeoutSeconds):
+            configlogger.info(f"Skipping otf font whose conversion failed before: {otfFile}")
         else:
             configlogger.warning(f"One-time font conversion otf->ttf: {ttfFile}")
-            font = TTFont(otfFile, fontNumber=0) # options.face_index
-            otf_to_ttf(
-                font,
-                post_format=POST_FORMAT, # options.post_format
-                max_err=MAX_ERR, # options.max_error
-                reverse_direction=REVERSE_DIRECTION, # options.reverse_direction
-            )
-            font.save(ttfFile)
-
-        resultingTtfFiles.append(ttfFile)
-
-    return resultingTtfFiles
+            conversions.append((otfFile, ttfFile))
+
+    if conversions:
+        if workers is None:
+            workers = os.cpu_count() or 1
+        failed = _runConversions(conversions, timeoutSeconds, max(1, workers))
+        for otfFile, ttfFile in conversions:
+            if (otfFile, ttfFile) in failed:
+                with open(f"{ttfFile}.failed", 'w', encoding='utf-8') as failedFile:
+                    failedFile.write(f"{otfFile}\n")
+                    if failed[(otfFile, ttfFile)] is not None:
+                        failedFile.write(f"timeout {failed[(otfFile, ttfFile)]}\n")
+            else:
+                if os.path.exists(f"{ttfFile}.failed"):
+                    os.remove(f"{ttfFile}.failed")
+                ttfsFromOtfs[otfFile] = ttfFile
+
+    return ttfsFromOtfs
@@ -13,6 +13,7 @@ from borders import processDecorationBorders
 from ceweInfo import AlbumInfo
 from cewePageResolver import getPageElementForPageNumber
 from clipartareas import processAreaClipartTag
+from conversionProfile import profiled
 from conversionState import ConversionState
 from imageareas import processAreaImageTag
 from pageTypes import PageProcessingType
@@ -75,17 +76,19 @@ def processElements(additional_fonts, fotobook, imagedir,
         transCy = context.mcf_to_reportlab * cy
 
         for imageTag in area.findall('imagebackground') + area.findall('image'):
-            processAreaImageTag(
-                imageTag, area, areaHeight, areaRot, areaWidth, imagedir,
-                productstyle, mcfBaseFolder, pagetype, pdf, pageW, transCx,
-                transCy, context, state, processDecorationShadow,
-                processDecorationBorders)
+            with profiled(state, 'processAreaImageTag'):
+                processAreaImageTag(
+                    imageTag, area, areaHeight, areaRot, areaWidth, imagedir,
+                    productstyle, mcfBaseFolder, pagetype, pdf, pageW, transCx,
+                    transCy, context, state, processDecorationShadow,
+                    processDecorationBorders)
 
         for textTag in area.findall('text'):
-            processAreaTextTag(
-                textTag, additional_fonts, area, areaWidth, areaHeight,
-                areaRot, pdf, transCx, transCy, pageNumber, context, state,
-                albumIndex)
+            with profiled(state, 'processAreaTextTag'):
+                processAreaTextTag(
+                    textTag, additional_fonts, area, areaWidth, areaHeight,
+                    areaRot, pdf, transCx, transCy, pageNumber, context, state,
+                    albumIndex)
 
         # A clipartarea has both designElementIDs and clipart elements.  The
         # latter contains the actual renderable clip art.
@@ -94,7 +97,7 @@ def processElements(additional_fonts, fotobook, imagedir,
             for clipartElement in area.findall('clipart'):
                 processAreaClipartTag(
                     clipartElement, areaHeight, areaRot, areaWidth, pdf,
-                    transCx, transCy, decoration, context,
+                    transCx, transCy, decoration, context, state,
                     lambda decoration, height, width, canvas:
                     processDecorationBorders(decoration, height, width,
                                              canvas, context))
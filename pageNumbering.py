@@ -52,6 +52,14 @@ class PageNumberFormat(Enum):
             return PageNumberFormat.ARABIC
 
 
+def createPageNumberingInfo(fotobook, pdf, availableFonts, state: ConversionState):
+    """Return the album's page numbering settings, or None when it has none."""
+    pageNumberElement = fotobook.find('pagenumbering')
+    if pageNumberElement is None or int(pageNumberElement.get('position')) == 0:
+        return None
+    return PageNumberingInfo(pageNumberElement, pdf, availableFonts, state)
+
+
 class PageNumberingInfo:
     def __init__(self, pageNumberElement, pdf, availableFonts, state: ConversionState):
         """
@@ -7,9 +7,10 @@ from typing import Callable
 # pylint: disable=broad-exception-caught
 
 from backgrounds import processBackground
+from conversionProfile import profiled, profiledPage
 from conversionState import ConversionState
 from ceweInfo import AlbumInfo
-from cewePageResolver import ResolvedPage, resolvePages
+from cewePageResolver import ResolvedPage, finishesPdfPage, resolvePages
 from pageNumbering import addPageNumber
 from pageTypes import PageProcessingType
 from renderContext import RenderContext
@@ -38,9 +39,10 @@ def parseInputPage(fotobook, mcfBaseFolder, backgroundLocations, imageDirectory,
     # The designElementIDs preceding the background element match it only for
     # an original, unfiltered stock background.
     backgroundTags = page.findall('background')
-    processBackground(backgroundTags, state,
-                      backgroundLocations, productStyle, pageType, pdf,
-                      pageHeight, pageWidth, context)
+    with profiled(state, 'processBackground'):
+        processBackground(backgroundTags, state,
+                          backgroundLocations, productStyle, pageType, pdf,
+                          pageHeight, pageWidth, context)
 
     if AlbumInfo.isAlbumSingleSide(productStyle) and \
             pageType == PageProcessingType.FrontInsideCoverBackground:
@@ -59,8 +61,22 @@ def processPages(fotobook, mcfBaseFolder, imageDirectory, productStyle, pdf, pag
                  state: ConversionState, context: RenderContext,
                  pageNumberingInfo, processElements: Callable):
     """Render the requested album pages, including covers and inside covers."""
+    renderResolvedPages(resolvePages(fotobook, productStyle, pageCount, pageNumbers),
+                        fotobook, mcfBaseFolder, imageDirectory, productStyle, pdf,
+                        pageCount, availableFonts, backgroundLocations, state, context,
+                        pageNumberingInfo, processElements)
 
-    for resolvedPage in resolvePages(fotobook, productStyle, pageCount, pageNumbers):
+
+def renderResolvedPages(resolvedPages, fotobook, mcfBaseFolder, imageDirectory, productStyle,
+                        pdf, pageCount, availableFonts, backgroundLocations,
+                        state: ConversionState, context: RenderContext,
+                        pageNumberingInfo, processElements: Callable):
+    """Render already resolved pages in order onto one canvas.
+
+    The whole album normally uses a single canvas.  A page worker instead
+    passes just the resolved pages which share one PDF page.
+    """
+    for resolvedPage in resolvedPages:
         try:
             _renderResolvedPage(resolvedPage, fotobook, mcfBaseFolder,
                                 backgroundLocations, imageDirectory, productStyle, pdf,
@@ -77,11 +93,12 @@ def _renderResolvedPage(resolvedPage: ResolvedPage, fotobook, mcfBaseFolder,
                         state: ConversionState, availableFonts, context: RenderContext,
                         pageNumberingInfo, processElements: Callable):
     """Render one page which has already been classified by CEWE rules."""
-    parseInputPage(fotobook, mcfBaseFolder, backgroundLocations,
-                   imageDirectory, pdf, resolvedPage.element, resolvedPage.page_number,
-                   pageCount, resolvedPage.page_type, productStyle,
-                   resolvedPage.odd_page, state, availableFonts,
-                   resolvedPage.last_page, context, processElements)
+    with profiledPage(state, f'{resolvedPage.page_number} ({resolvedPage.page_type})'):
+        parseInputPage(fotobook, mcfBaseFolder, backgroundLocations,
+                       imageDirectory, pdf, resolvedPage.element, resolvedPage.page_number,
+                       pageCount, resolvedPage.page_type, productStyle,
+                       resolvedPage.odd_page, state, availableFonts,
+                       resolvedPage.last_page, context, processElements)
 
     if resolvedPage.page_type == PageProcessingType.FrontInsideCoverBackground:
         # This is a preparatory background draw for the first inside cover.
@@ -101,11 +118,5 @@ def _renderResolvedPage(resolvedPage: ResolvedPage, fotobook, mcfBaseFolder,
         addPageNumber(pageNumberingInfo, pdf, resolvedPage.page_number,
                       productStyle, resolvedPage.odd_page, context)
 
-    if not AlbumInfo.isAlbumProduct(productStyle):
-        pdf.showPage()
-    elif AlbumInfo.isAlbumSingleSide(productStyle):
-        pdf.showPage()
-    elif resolvedPage.odd_page or (
-            resolvedPage.page_type == PageProcessingType.Cover and
-            resolvedPage.source_number != pageCount - 1):
+    if finishesPdfPage(resolvedPage, productStyle, pageCount):
         pdf.showPage()
@@ -0,0 +1,195 @@
+"""Render resolved pages in worker processes and assemble the PDF in order.
+
+ReportLab draws onto one canvas at a time, so the serial renderer uses one
+CPU core however large the album.  With ``--jobs`` greater than one, the
+resolved pages are grouped by the PDF page they are drawn on, each group is
+rendered by a worker process to a one-page PDF fragment, and the fragments
+are then merged in their original order.
+
+Each worker prepares its own :class:`ConversionSetup` and
+:class:`ConversionState`: ReportLab's font registry is process-wide, and lxml
+elements cannot be sent between processes.  Only small, picklable values
+travel in either direction.
+"""
+
+# A worker process owns its prepared album in a module variable, because a
+# process pool initializer has no other way to hand state to later tasks.
+# The parent process never sets it.
+# pylint: disable=global-statement,too-many-arguments,too-many-locals
+
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from functools import partial
+import logging
+import os
+from typing import Any, Callable
+
+from reportlab.pdfgen import canvas
+
+from albumIndex import AlbumIndex
+from cewePageResolver import groupResolvedPagesByPdfPage, resolvePages
+from conversionProfile import ConversionProfile, profiled
+from conversionSetup import prepareConversion
+from conversionState import ConversionState
+from extraLoggers import ConversionMessageCounters, mustsee
+from pageNumbering import createPageNumberingInfo
+from pages import renderResolvedPages
+from renderContext import createRenderContext
+
+
+@dataclass(frozen=True)
+class PageWorkerSetup:
+    """Picklable description of the album each page worker must prepare."""
+
+    album_name: str
+    unpacked_mcf_name: str | None   # data.mcf already unpacked by the parent from an MCFX album.
+    app_data_dir: str | None
+    automatic_windows: bool
+    page_size: tuple[float, float]
+    product_style: Any
+    page_count: int
+    page_numbers: list[int] | None
+    mcf_to_reportlab: float
+    image_quality: int
+    image_resampling_filter: Any
+    process_elements: Callable      # Normally pageElements.processElements.
+    fragment_folder: str
+    profile: bool = False           # Record the spans of each page for the parent's ConversionProfile.
+
+
+@dataclass
+class _PreparedWorker:
+    """The album and resources prepared once in each worker process."""
+
+    worker_setup: PageWorkerSetup
+    setup: Any
+    state: ConversionState
+    render_context: Any
+    resolved_pages: list
+
+
+_preparedWorker: _PreparedWorker | None = None
+
+
+def _initialiseWorker(workerSetup: PageWorkerSetup):
+    """Prepare the album once per worker process."""
+    global _preparedWorker
+    state = ConversionState()
+    if workerSetup.profile:
+        state.profile = ConversionProfile()
+    setup = prepareConversion(
+        workerSetup.album_name, None, workerSetup.app_data_dir, state,
+        workerSetup.automatic_windows, unpackedMcfName=workerSetup.unpacked_mcf_name)
+    renderContext = createRenderContext(
+        setup, workerSetup.mcf_to_reportlab, workerSetup.image_quality,
+        workerSetup.image_resampling_filter)
+    resolvedPages = list(resolvePages(
+        setup.fotobook, workerSetup.product_style, workerSetup.page_count,
+        workerSetup.page_numbers))
+    _preparedWorker = _PreparedWorker(workerSetup, setup, state, renderContext, resolvedPages)
+
+
+def _renderWorkUnit(unitNumber, resolvedPageIndexes):
+    """Render the resolved pages of one PDF page to their own PDF fragment.
+
+    Returns the fragment name, the album index entries found on the page, the
+    message counts, the performance counters and any profile spans, so that
+    the parent can report them as usual.
+    """
+    worker = _preparedWorker
+    workerSetup = worker.worker_setup
+    setup = worker.setup
+    state = worker.state
+
+    messageCounters = ConversionMessageCounters()
+    try:
+        fragmentName = os.path.join(workerSetup.fragment_folder, f'page{unitNumber:05d}.pdf')
+        pdf = canvas.Canvas(fragmentName, pagesize=workerSetup.page_size)
+        albumIndex = AlbumIndex.FromConfiguration(setup.configuration)
+        pageNumberingInfo = createPageNumberingInfo(
+            setup.fotobook, pdf, setup.available_fonts, state)
+        processElementsForAlbum = partial(
+            workerSetup.process_elements, state=state, albumIndex=albumIndex)
+
+        renderResolvedPages(
+            [worker.resolved_pages[index] for index in resolvedPageIndexes],
+            setup.fotobook, setup.mcf_base_folder, setup.fotobook.get('imagedir'),
+            workerSetup.product_style, pdf, workerSetup.page_count,
+            setup.available_fonts, setup.background_locations, state,
+            worker.render_context, pageNumberingInfo, processElementsForAlbum)
+        with profiled(state, 'pdf.save'):
+            pdf.save()
+    finally:
+        # Temporary images are only needed until the fragment is saved.
+        for temporaryFileName in state.temporary_files:
+            if os.path.exists(temporaryFileName):
+                os.remove(temporaryFileName)
+        state.temporary_files.clear()
+        messageCounters.close()
+    performanceCounters = dict(state.performance_counters)
+    state.performance_counters.clear()
+    profileSpans = state.profile.takeSpans() if state.profile is not None else []
+
+    return fragmentName, albumIndex.indexEntries, messageCounters.counts(), performanceCounters, profileSpans
+
+
+def renderPagesInParallel(workerSetup: PageWorkerSetup, fotobook, jobs,
+                          outputFileName, albumTitle, albumIndex: AlbumIndex,
+                          state: ConversionState):
+    """Render an album with *jobs* worker processes and save the merged PDF.
+
+    The output has the same pages, in the same order, as the serial renderer.
+    """
+    resolvedPages = list(resolvePages(
+        fotobook, workerSetup.product_style, workerSetup.page_count,
+        workerSetup.page_numbers))
+    pageIndexes = {id(resolvedPage): index for index, resolvedPage in enumerate(resolvedPages)}
+    workUnits = [[pageIndexes[id(resolvedPage)] for resolvedPage in group]
+                 for group in groupResolvedPagesByPdfPage(
+                     resolvedPages, workerSetup.product_style, workerSetup.page_count)]
+
+    if not workUnits:
+        # Match the serial renderer, which saves its canvas even when no
+        # requested page exists.
+        pdf = canvas.Canvas(outputFileName, pagesize=workerSetup.page_size)
+        pdf.setTitle(albumTitle)
+        pdf.save()
+        return
+
+    workerCount = min(jobs, len(workUnits))
+    mustsee.info(f'Rendering {len(workUnits)} pdf pages with {workerCount} worker processes')
+    fragmentNames = []
+    with ProcessPoolExecutor(max_workers=workerCount, initializer=_initialiseWorker,
+                             initargs=(workerSetup,)) as executor:
+        for fragmentName, indexEntries, counts, performanceCounters, profileSpans in executor.map(
+                _renderWorkUnit, range(len(workUnits)), workUnits):
+            fragmentNames.append(fragmentName)
+            albumIndex.MergeIndexEntries(indexEntries)
+            if state.message_counters is not None:
+                state.message_counters.addCounts(counts)
+            state.performance_counters.update(performanceCounters)
+            if state.profile is not None:
+                state.profile.addSpans(profileSpans)
+
+    mergePdfFragments(fragmentNames, outputFileName, albumTitle)
+
+
+def mergePdfFragments(fragmentNames, outputFileName, albumTitle):
+    """Concatenate page fragments, in order, into the final PDF."""
+    # pymupdf is slow to import, and only needed here, once the pages are rendered
+    import pymupdf # pylint: disable=import-outside-toplevel
+    mergedPdf = pymupdf.open()
+    try:
+        for fragmentName in fragmentNames:
+            with pymupdf.open(fragmentName) as fragmentPdf:
+                mergedPdf.insert_pdf(fragmentPdf)
+        metadata = mergedPdf.metadata or {}
+        metadata['title'] = albumTitle
+        mergedPdf.set_metadata(metadata)
+        # Each fragment embeds its own copy of shared fonts and images.
+        # garbage=3 merges those identical objects again.
+        mergedPdf.save(outputFileName, garbage=3, deflate=True)
+    except Exception as exception:  # pylint: disable=broad-exception-caught
+        logging.error(f'Could not save the output file: {str(exception)}')
+    finally:
+        mergedPdf.close()
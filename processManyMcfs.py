@@ -1,25 +1,115 @@
 # eg python processManyMcfs.py D:\Users\fred\albums\PhotoAlbum*.mcf
+#    python processManyMcfs.py --workers 4 --log-dir D:\logs --summary D:\logs\summary.json D:\albums\*.mcfx
+#
+# With --workers N the albums are shared out to N worker processes. Each worker
+# converts one album after another, so its imports, the fonts ReportLab has
+# loaded and the persistent font, clipart and passepartout catalogues are read
+# once per worker rather than once per album. Every album still has its own
+# AlbumConversionSession, and so its own ConversionState.
 
 # We're not quite at the level of documenting all the classes and functions yet :-)
 #    pylint: disable=missing-function-docstring,missing-class-docstring,missing-module-docstring
 
+import argparse
+import json
+import logging
+import os
 import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
 from glob import glob
-from cewe2pdf import convertMcf
+
+from albumConversionSession import AlbumConversionSession
+from cewe2pdf import image_quality, mcf2rl, pil_antialias
+from pageElements import processElements
 
 
 def printFileName(filename):
     print()
     print("--------------------------->" + filename)
-    convertMcf(filename, False) # throwing away the result
+
+
+def getLogFileName(albumName, logFolder):
+    """Each album is logged beside itself, as in Explorer mode, unless a log folder is given."""
+    if logFolder is None:
+        return albumName + '.log'
+    return os.path.join(logFolder, os.path.basename(albumName) + '.log')
+
+
+def countPdfPages(pdfFileName):
+    import pymupdf # pylint: disable=import-outside-toplevel
+    try:
+        with pymupdf.open(pdfFileName) as document:
+            return document.page_count
+    except Exception: # pylint: disable=broad-exception-caught
+        return 0
+
+
+def convertAlbum(albumName, logFolder=None):
+    """Convert one album and return a summary of the conversion, which can be written as JSON."""
+    printFileName(albumName)
+    logFileName = getLogFileName(albumName, logFolder)
+    summary = {'album': albumName, 'output': None, 'log': logFileName, 'succeeded': False,
+               'error': None, 'duration_seconds': 0.0, 'pages': 0, 'images': 0,
+               'warnings': 0, 'errors': 0}
+    startTime = time.perf_counter()
+    session = AlbumConversionSession(
+        albumName, False, None, None, None, None, mcf2rl, image_quality, pil_antialias,
+        logFileName=logFileName)
+    try:
+        with session:
+            summary['succeeded'] = bool(session.render(processElements))
+    except (Exception, SystemExit) as exception: # pylint: disable=broad-exception-caught
+        # An album which cannot be converted must not stop the rest of the batch
+        logging.error(f"Conversion of {albumName} failed: {exception!r}")
+        summary['error'] = repr(exception)
+    summary['duration_seconds'] = round(time.perf_counter() - startTime, 3)
+
+    summary['output'] = session.output_file_name
+    if summary['succeeded']:
+        summary['pages'] = countPdfPages(session.output_file_name)
+    performanceCounters = session.state.performance_counters
+    summary['images'] = (performanceCounters['jpeg passthrough images']
+                         + performanceCounters['re-encoded images']
+                         + performanceCounters['image cache hits'])
+    if session.state.message_counters is not None:
+        for levelCounts in session.state.message_counters.counts():
+            summary['warnings'] += levelCounts.get('WARNING', 0)
+            summary['errors'] += levelCounts.get('ERROR', 0) + levelCounts.get('CRITICAL', 0)
+    return summary
+
+
+def convertAlbums(albumNames, workers=1, logFolder=None):
+    """Convert the albums, in worker processes when workers is above 1, and return their summaries in order."""
+    if logFolder is not None:
+        os.makedirs(logFolder, exist_ok=True)
+    if workers <= 1 or len(albumNames) <= 1:
+        return [convertAlbum(albumName, logFolder) for albumName in albumNames]
+    with ProcessPoolExecutor(max_workers=min(workers, len(albumNames))) as executor:
+        return list(executor.map(convertAlbum, albumNames, [logFolder] * len(albumNames)))
 
 
 def main():
-    args = sys.argv[1:]
-    for arg in args:
-        for filename in glob(arg):
-            printFileName(filename)
+    parser = argparse.ArgumentParser(description='Convert many .mcf/.mcfx albums to .pdf')
+    parser.add_argument('--workers', type=int, default=1,
+                        help='Number of worker processes, each converting one album at a time')
+    parser.add_argument('--log-dir', dest='logDir', default=None,
+                        help='Folder for the log of each album, rather than <album>.log beside the album')
+    parser.add_argument('--summary', default=None,
+                        help='JSON file for the summary of every conversion, rather than printing it')
+    parser.add_argument('albums', nargs='+', help='Album file names, which may contain wildcards')
+    args = parser.parse_args()
+
+    albumNames = [filename for arg in args.albums for filename in glob(arg)]
+    summaries = convertAlbums(albumNames, args.workers, args.logDir)
+    summaryText = json.dumps(summaries, indent=2)
+    if args.summary is None:
+        print(summaryText)
+    else:
+        with open(args.summary, 'w', encoding='utf-8') as summaryFile:
+            summaryFile.write(summaryText)
+    return 0 if all(summary['succeeded'] for summary in summaries) else 1
 
 
 if __name__ == '__main__':
-    main()
+    sys.exit(main())
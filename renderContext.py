@@ -6,8 +6,12 @@ configuration and resource arguments.
 """
 
 from dataclasses import dataclass
+import importlib.util
 from typing import Any
 
+from configUtils import getConfigurationBool
+from extraLoggers import configlogger
+
 
 @dataclass
 class RenderContext:
@@ -23,3 +27,29 @@ class RenderContext:
     clipart_paths: tuple[str, ...]
     passepartout_folders: tuple[str, ...] = ()
     line_scales: Any = None
+    image_temporary_files: bool = False     # Write encoded images to temporary files rather than keep them in memory.
+    jpeg_passthrough: bool = True           # Embed unchanged JPEG photos without decoding and re-encoding them.
+    jpeg_draft_mode: bool = True            # Decode large JPEG photos at a reduced scale when that suffices.
+    clipart_vectors: bool = False           # Draw clipart as PDF paths where it can be, rather than rasterise it.
+
+
+def createRenderContext(setup, mcfToReportlab, imageQuality, resamplingFilter) -> RenderContext:
+    """Build the render context for a prepared :class:`ConversionSetup`."""
+    return RenderContext(
+        mcfToReportlab, setup.image_resolution, imageQuality,
+        setup.background_resolution, resamplingFilter,
+        setup.default_config_section, setup.clipart_files,
+        setup.clipart_paths, setup.passepartout_folders,
+        setup.line_scales,
+        getConfigurationBool(setup.default_config_section, 'imageTemporaryFiles', 'False'),
+        getConfigurationBool(setup.default_config_section, 'jpegPassthrough', 'True'),
+        getConfigurationBool(setup.default_config_section, 'jpegDraftMode', 'True'),
+        _clipartVectorsAvailable(getConfigurationBool(setup.default_config_section, 'clipartVectors', 'False')))
+
+
+def _clipartVectorsAvailable(requested):
+    """Vector clipart needs pikepdf to read the PDF which cairo draws."""
+    if requested and importlib.util.find_spec('pikepdf') is None:
+        configlogger.warning('clipartVectors needs the pikepdf package, so clipart is rasterised')
+        return False
+    return requested
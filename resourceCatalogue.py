@@ -0,0 +1,138 @@
+"""Persistent index of the CEWE backgrounds, cliparts and passepartouts.
+
+Finding the resources of a full CEWE installation means parsing the clipart
+catalogue or every decoration XML, walking and parsing every passepartout
+XML, and probing dozens of background folders, all before the first page is
+drawn.  The result seldom changes, so :class:`ResourceCatalogue` keeps each
+designElementId-to-file index in an SQLite database in the app data folder.
+
+An index is identified by its kind and the folders it was built from, and is
+rebuilt whenever the modification time of any directory below those folders
+has changed.  Adding, removing or renaming a resource file changes the time
+of the directory containing it, so only the directories need to be examined
+to check that a stored index is still valid.
+"""
+
+import hashlib
+import logging
+import os
+import sqlite3
+from contextlib import closing
+
+from configUtils import getConfigurationBool
+from pathutils import appdata_dir
+
+# Increase this when the way an index is built changes, so that indexes
+# stored by an older version are rebuilt.
+RESOURCE_CATALOGUE_VERSION = 1
+
+RESOURCE_CATALOGUE_FILE_NAME = 'resourcecatalogue.sqlite'
+
+_SCHEMA = '''
+    CREATE TABLE IF NOT EXISTS indexes (
+        kind TEXT NOT NULL,
+        folders TEXT NOT NULL,
+        signature TEXT NOT NULL,
+        PRIMARY KEY (kind, folders));
+    CREATE TABLE IF NOT EXISTS entries (
+        kind TEXT NOT NULL,
+        folders TEXT NOT NULL,
+        element_id TEXT NOT NULL,
+        file_name TEXT NOT NULL,
+        PRIMARY KEY (kind, folders, element_id));
+'''
+
+
+def directorySignature(folders, recursive=True):
+    """Return a hash of the modification times of the folders and, optionally, all directories below them."""
+    digest = hashlib.sha256(repr(RESOURCE_CATALOGUE_VERSION).encode('utf-8'))
+    pending = list(folders)
+    while pending:
+        folder = pending.pop()
+        try:
+            folderStat = os.stat(folder)
+        except OSError:
+            digest.update(f'{folder}\0missing\n'.encode('utf-8', 'surrogateescape'))
+            continue
+        digest.update(f'{folder}\0{folderStat.st_mtime_ns}\n'.encode('utf-8', 'surrogateescape'))
+        if not recursive:
+            continue
+        try:
+            with os.scandir(folder) as entries:
+                subFolders = [entry.path for entry in entries if entry.is_dir()]
+        except OSError:
+            continue
+        # Sorted so that the signature does not depend on directory order
+        pending.extend(sorted(subFolders, reverse=True))
+    return digest.hexdigest()
+
+
+class ResourceCatalogue:
+    """SQLite store of designElementId-to-file indexes, checked against directory times."""
+
+    def __init__(self, databaseFileName):
+        self.database_file_name = str(databaseFileName)
+
+    @staticmethod
+    def fromConfiguration(configSection, appDataDir):
+        """Return the catalogue configured for this conversion, or None if disabled."""
+        if not getConfigurationBool(configSection, 'resourceCatalogue', 'True'):
+            return None
+        baseFolder = appDataDir if appDataDir is not None else appdata_dir()
+        return ResourceCatalogue(os.path.join(baseFolder, RESOURCE_CATALOGUE_FILE_NAME))
+
+    def getIndex(self, kind, folders, buildIndex, recursive=True):
+        """Return the stored index for these folders, calling buildIndex() if it is out of date.
+
+        buildIndex returns a dictionary from designElementId to file name.
+        The element ids are returned as strings if the index came from the
+        database, so callers with integer ids must convert them.
+        """
+        foldersKey = repr(tuple(folders))
+        signature = directorySignature(folders, recursive)
+        try:
+            storedIndex = self._load(kind, foldersKey, signature)
+        except sqlite3.Error as exception:
+            logging.warning(f'Could not read the resource catalogue {self.database_file_name}: {exception}')
+            storedIndex = None
+        if storedIndex is not None:
+            logging.debug(f'Using catalogued {kind} index of {len(storedIndex)} entries')
+            return storedIndex
+
+        index = buildIndex()
+        try:
+            self._store(kind, foldersKey, signature, index)
+        except (OSError, sqlite3.Error) as exception:
+            logging.warning(f'Could not update the resource catalogue {self.database_file_name}: {exception}')
+        return index
+
+    def _connect(self):
+        # Page workers may share the catalogue, so wait for each other's writes.
+        connection = sqlite3.connect(self.database_file_name, timeout=30)
+        connection.executescript(_SCHEMA)
+        return connection
+
+    def _load(self, kind, foldersKey, signature):
+        if not os.path.exists(self.database_file_name):
+            return None
+        with closing(self._connect()) as connection:
+            row = connection.execute(
+                'SELECT signature FROM indexes WHERE kind = ? AND folders = ?',
+                (kind, foldersKey)).fetchone()
+            if row is None or row[0] != signature:
+                return None
+            return dict(connection.execute(
+                'SELECT element_id, file_name FROM entries WHERE kind = ? AND folders = ?',
+                (kind, foldersKey)))
+
+    def _store(self, kind, foldersKey, signature, index):
+        os.makedirs(os.path.dirname(self.database_file_name) or '.', exist_ok=True)
+        with closing(self._connect()) as connection:
+            with connection:
+                connection.execute('DELETE FROM entries WHERE kind = ? AND folders = ?', (kind, foldersKey))
+                connection.executemany(
+                    'INSERT INTO entries (kind, folders, element_id, file_name) VALUES (?, ?, ?, ?)',
+                    ((kind, foldersKey, str(elementId), fileName) for elementId, fileName in index.items()))
+                connection.execute(
+                    'INSERT OR REPLACE INTO indexes (kind, folders, signature) VALUES (?, ?, ?)',
+                    (kind, foldersKey, signature))
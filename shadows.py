@@ -1,17 +1,16 @@
 """Shadow geometry and alpha-silhouette rendering helpers."""
 
-import tempfile
+import io
 import logging
-from math import floor
+from math import ceil, cos, floor, radians, sin
 
-import numpy as np
 from PIL import Image, ImageFilter
 import reportlab.lib.colors
-from reportlab.lib.utils import ImageReader
 from reportlab.platypus import Table
 
 from configUtils import getConfigurationBool
 from conversionState import ConversionState
+from imageUtils import drawEncodedImage
 from renderContext import RenderContext
 
 def findShadowBottomLeft(frameBottomLeft, angle, distance, swidth):
@@ -21,9 +20,9 @@ def findShadowBottomLeft(frameBottomLeft, angle, distance, swidth):
         # The existing rectangular-shadow geometry requires this special case.
         return x - swidth / 2, y - swidth / 2
 
-    angle_rad = np.radians(angle - 90)
-    shadow_dx = distance * np.cos(angle_rad)
-    shadow_dy = -distance * np.sin(angle_rad)
+    angle_rad = radians(angle - 90)
+    shadow_dx = distance * cos(angle_rad)
+    shadow_dy = -distance * sin(angle_rad)
     return x + shadow_dx - swidth / 2, y + shadow_dy - swidth / 2
 
 
@@ -38,12 +37,13 @@ def intensityToGrey(value):
 def drawBlurredImageShadow(pdf, im, imgCropWidth_mcfunit,
                            imgCropHeight_mcfunit, shadowDistance_mcfunit,
                            shadowAngle, intensity, shadowBlur_mcfunit,
-                           shadowWidth_mcfunit, mcf2rl, temporary_files):
+                           shadowWidth_mcfunit, mcf2rl, state: ConversionState,
+                           useTemporaryFile=False):
     """
     Draw a blurred, transparent shadow using the image's existing alpha mask.
 
-    ``temporary_files`` belongs to the caller's PDF-generation lifecycle. The
-    generated PNG is therefore retained until the PDF has been completed.
+    The shadow PNG is normally drawn from memory; ``useTemporaryFile`` writes
+    it to one of the conversion's temporary files instead.
     """
     if im.mode != 'RGBA':
         im = im.convert('RGBA')
@@ -66,7 +66,7 @@ def drawBlurredImageShadow(pdf, im, imgCropWidth_mcfunit,
     # Keep the fractional radius: rounding it would make several of CEWE's
     # small blur settings render identically at the configured image DPI.
     blurRadius_px = shadowBlur_mcfunit * pixelsPerMcfunit * 0.5
-    padding_px = spreadRadius_px + int(np.ceil(3 * blurRadius_px))
+    padding_px = spreadRadius_px + int(ceil(3 * blurRadius_px))
 
     alpha = im.getchannel('A')
     shadowAlpha = Image.new(
@@ -92,31 +92,29 @@ def drawBlurredImageShadow(pdf, im, imgCropWidth_mcfunit,
     shadowImage.putalpha(shadowAlpha)
 
     # ReportLab handles the PNG alpha channel when mask='auto' is used below.
-    shadowFile = tempfile.NamedTemporaryFile() # pylint:disable=consider-using-with
-    shadowFile.close()
-    shadowImage.save(shadowFile.name, 'PNG')
-    temporary_files.append(shadowFile.name)
+    shadowPng = io.BytesIO()
+    shadowImage.save(shadowPng, 'PNG')
 
     # CEWE stores the direction in the same convention used by the older
     # vector shadow code: the angle identifies where the shadow is cast, not
     # the light source. The Y calculation is in PDF coordinates (Y upwards).
-    angleRadians = np.radians(shadowAngle - 90)
+    angleRadians = radians(shadowAngle - 90)
     # The editor casts a shadow about three quarters of the stored distance.
     # This is independently visible in the angle and distance test pages.
     shadowDistanceScale = 0.75
-    shadowOffsetX_mcfunit = shadowDistanceScale * shadowDistance_mcfunit * np.cos(angleRadians)
-    shadowOffsetY_mcfunit = -shadowDistanceScale * shadowDistance_mcfunit * np.sin(angleRadians)
+    shadowOffsetX_mcfunit = shadowDistanceScale * shadowDistance_mcfunit * cos(angleRadians)
+    shadowOffsetY_mcfunit = -shadowDistanceScale * shadowDistance_mcfunit * sin(angleRadians)
     padding_mcfunit = padding_px / pixelsPerMcfunit
 
-    pdf.drawImage(
-        ImageReader(shadowFile.name),
+    drawEncodedImage(
+        pdf, shadowPng.getvalue(),
         mcf2rl * (-0.5 * imgCropWidth_mcfunit - padding_mcfunit
                   + shadowOffsetX_mcfunit),
         mcf2rl * (-0.5 * imgCropHeight_mcfunit - padding_mcfunit
                   + shadowOffsetY_mcfunit),
-        width=mcf2rl * (imgCropWidth_mcfunit + 2 * padding_mcfunit),
-        height=mcf2rl * (imgCropHeight_mcfunit + 2 * padding_mcfunit),
-        mask='auto'
+        mcf2rl * (imgCropWidth_mcfunit + 2 * padding_mcfunit),
+        mcf2rl * (imgCropHeight_mcfunit + 2 * padding_mcfunit),
+        state, useTemporaryFile, mask='auto'
     )
 
 
@@ -174,7 +172,7 @@ def processDecorationShadow(decoration, areaHeight, areaWidth, pdf,
                 pdf, im, imgCropWidth_mcfunit, imgCropHeight_mcfunit,
                 shadowDistance_mcfunit, shadowAngle, intensity,
                 shadowBlur_mcfunit, shadowWidth_mcfunit, mcf2rl,
-                state.temporary_files
+                state, context.image_temporary_files
             )
         else:
             shadowBottomLeftX, shadowBottomLeftY = findShadowBottomLeft(
@@ -15,10 +15,12 @@ class ShowDiffsStyle(Enum):
     DiffImage = 3
 
 class ComparePDF:
-    def __init__(self, pdf_paths, showdiffs):
+    def __init__(self, pdf_paths, showdiffs, tolerance=0):
         self.pdf_paths = pdf_paths
         self.pdf_documents = [pymupdf.open(path) for path in pdf_paths]
         self.showdiffs = showdiffs
+        # pixels are only counted as different when a colour channel differs by more than this
+        self.tolerance = tolerance
         self.logger = logging.getLogger('cewe2pdf.test')
 
     def __del__(self):
@@ -85,21 +87,26 @@ class ComparePDF:
         cv2.destroyAllWindows()
 
 
+    def _images_equal(self, image1, image2) -> bool:
+        if self.tolerance == 0 or image1.shape != image2.shape:
+            return np.array_equal(image1, image2)
+        return not np.any(cv2.absdiff(image1, image2) > self.tolerance)
+
     def _compare_images(self, images, page_num) -> bool:
-        equal = all(np.array_equal(images[0], img) for img in images)
+        equal = all(self._images_equal(images[0], img) for img in images)
         if equal:
             self.logger.info(f"All images on Page {page_num} are equal")
         else:
             # self.logger.info(f"Some images on Page {page_num} are not equal (Page {page_num} compared across files):")
             for i in range(len(images)):
                 for j in range(i + 1, len(images)):
-                    if not np.array_equal(images[i], images[j]):
+                    if not self._images_equal(images[i], images[j]):
                         diffImage = cv2.absdiff(images[i], images[j])
                         diffArray = np.asarray(diffImage)
                         if diffArray.ndim == 2:
-                            differentPixelMask = diffArray != 0
+                            differentPixelMask = diffArray > self.tolerance
                         else:
-                            differentPixelMask = np.any(diffArray != 0, axis=2)
+                            differentPixelMask = np.any(diffArray > self.tolerance, axis=2)
                         differentPixels = np.count_nonzero(differentPixelMask)
                         totalPixels = differentPixelMask.size
                         differentPercent = 100 * differentPixels / totalPixels
@@ -123,6 +130,8 @@ def main():
     parser.add_argument('--pdf', action='append', required=True, help='Path to the PDF file')
     parser.add_argument('--showdiffs', choices=['nothing', 'diffimage', 'sidebyside'], action='store', required=False,
                         help='Show different pages in windows as they are found, eiher diffimage or sidebyside')
+    parser.add_argument('--tolerance', type=int, default=0, required=False,
+                        help='Ignore pixel differences up to this value in every colour channel (0-255)')
     args = parser.parse_args()
     if not args.showdiffs:
         showdiffs = ShowDiffsStyle.Nothing
@@ -134,7 +143,7 @@ def main():
         else:
             showdiffs = ShowDiffsStyle.Nothing
 
-    compare = ComparePDF(args.pdf,showdiffs)
+    compare = ComparePDF(args.pdf,showdiffs,args.tolerance)
     result = compare.compare()
     return result
 
@@ -0,0 +1,8 @@
+"""Settings shared by the whole pytest run."""
+
+import os
+
+# The conversions in the tests must not fill the image cache in the developer's
+# own app data folder. A test of the cache passes a temporary appDataDir instead.
+# Setting the environment, rather than patching, also reaches page worker processes.
+os.environ['IGNOREIMAGECACHE'] = '1'
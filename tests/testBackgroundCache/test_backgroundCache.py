@@ -0,0 +1,74 @@
+"""Test the per-conversion background cache without rendering an album."""
+
+import os
+import sys
+import tempfile
+from io import BytesIO
+from pathlib import Path
+
+import pytest
+from PIL import Image
+
+# Bootstrap the project root so this test can also run directly.
+PROJECT_ROOT = Path(__file__).resolve().parents[2]
+sys.path.insert(0, str(PROJECT_ROOT))
+from testutils import configureTestImportPaths
+configureTestImportPaths(__file__)
+
+from backgroundCache import BackgroundCache
+from conversionState import ConversionState
+
+
+def makeBackground(folder, designElementId, size):
+    fileName = os.path.join(folder, f'{designElementId}.jpg')
+    Image.new('RGB', size, (10, 20, 30)).save(fileName)
+    return fileName
+
+
+def test_backgroundIsDownsampledButNotEnlarged():
+    with tempfile.TemporaryDirectory() as folder:
+        makeBackground(folder, '101', (400, 300))
+        backgroundCache = BackgroundCache([folder], 4)
+        state = ConversionState()
+
+        reduced = backgroundCache.getEncodedBackground('101', (200, 150), Image.LANCZOS, state)
+        assert Image.open(BytesIO(reduced)).size == (200, 150)
+        unchanged = backgroundCache.getEncodedBackground('101', (800, 600), Image.LANCZOS, state)
+        assert Image.open(BytesIO(unchanged)).size == (400, 300)
+
+
+def test_repeatedBackgroundIsCached():
+    with tempfile.TemporaryDirectory() as folder:
+        fileName = makeBackground(folder, '101', (40, 30))
+        backgroundCache = BackgroundCache([folder], 4)
+        state = ConversionState()
+
+        first = backgroundCache.getEncodedBackground('101', (40, 30), Image.LANCZOS, state)
+        # A cached background needs neither the folder search nor the file
+        os.remove(fileName)
+        assert backgroundCache.getEncodedBackground('101', (40, 30), Image.LANCZOS, state) is first
+        assert state.performance_counters['background cache hits'] == 1
+        assert state.performance_counters['background cache misses'] == 1
+
+
+def test_leastRecentlyUsedBackgroundIsEvicted():
+    with tempfile.TemporaryDirectory() as folder:
+        for designElementId in ('1', '2', '3'):
+            makeBackground(folder, designElementId, (20, 20))
+        backgroundCache = BackgroundCache([folder], 2)
+        state = ConversionState()
+
+        for designElementId in ('1', '2', '1', '3'):
+            backgroundCache.getEncodedBackground(designElementId, (20, 20), Image.LANCZOS, state)
+        assert list(backgroundCache.encoded_images) == [('1', (20, 20)), ('3', (20, 20))]
+
+
+def test_missingBackgroundIsSearchedOnce():
+    with tempfile.TemporaryDirectory() as folder:
+        backgroundCache = BackgroundCache([folder], 2)
+        with pytest.raises(ValueError):
+            backgroundCache.findBackground('404')
+        # The failed search is remembered even if the file appears later
+        makeBackground(folder, '404', (20, 20))
+        with pytest.raises(ValueError):
+            backgroundCache.findBackground('404')
@@ -14,7 +14,7 @@ from testutils import configureTestImportPaths
 configureTestImportPaths(__file__)
 
 from ceweInfo import ProductStyle
-from cewePageResolver import resolvePages
+from cewePageResolver import groupResolvedPagesByPdfPage, resolvePages
 from pageTypes import PageProcessingType
 
 
@@ -57,6 +57,35 @@ def test_resolveSelectedAlbumPages():
     ]
 
 
+def test_groupSingleSidePagesByPdfPage():
+    pages = list(resolvePages(_testFotobook(), ProductStyle.AlbumSingleSide, 28))
+    groups = groupResolvedPagesByPdfPage(pages, ProductStyle.AlbumSingleSide, 28)
+
+    assert sum(len(group) for group in groups) == len(pages)
+    assert [page.page_type for page in groups[1]] == [
+        PageProcessingType.FrontInsideCoverBackground,
+        PageProcessingType.FrontInsideCover,
+    ]
+    assert [page.page_type for page in groups[-2]] == [
+        PageProcessingType.RegularPage,
+        PageProcessingType.BackInsideCover,
+    ]
+    assert len(groups) == len(pages) - 2
+
+
+def test_groupDoubleSidePagesByPdfPage():
+    pages = list(resolvePages(_testFotobook(), ProductStyle.AlbumDoubleSide, 28))
+    groups = groupResolvedPagesByPdfPage(pages, ProductStyle.AlbumDoubleSide, 28)
+
+    assert sum(len(group) for group in groups) == len(pages)
+    # Every ordinary spread shows an even page on the left and an odd page on the right.
+    for group in groups:
+        regularPages = [page for page in group if page.page_type == PageProcessingType.RegularPage]
+        if len(regularPages) == 2:
+            assert not regularPages[0].odd_page
+            assert regularPages[1].odd_page
+
+
 def test_resolveMemoryCards():
     pages = list(resolvePages(_memoryCardsFotobook(), ProductStyle.MemoryCard, 25))
 
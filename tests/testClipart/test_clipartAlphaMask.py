@@ -0,0 +1,40 @@
+"""Test the alpha mask made for an RGB clipart."""
+
+import random
+import sys
+from pathlib import Path
+
+# Bootstrap the project root so this test can also run directly.
+PROJECT_ROOT = Path(__file__).resolve().parents[2]
+sys.path.insert(0, str(PROJECT_ROOT))
+from testutils import configureTestImportPaths
+configureTestImportPaths(__file__)
+
+from PIL import Image
+
+from clpFile import ClpFile # type: ignore
+
+
+def createMaskWithPixelLoop(rgbImage, alpha):
+    """The mask as convertToPngInBuffer built it one pixel at a time."""
+    alphamask = rgbImage.copy().convert('L').resize(rgbImage.size)
+    pixels = alphamask.load()
+    for i in range(alphamask.size[0]):
+        for j in range(alphamask.size[1]):
+            if pixels[i, j] != 0:
+                pixels[i, j] = alpha
+    return alphamask
+
+
+def test_alphaMaskMatchesPixelLoop():
+    generator = random.Random(5)
+    image = Image.new('RGB', (67, 41))
+    # Mostly black, with colours which include some that are almost black
+    image.putdata([(0, 0, 0) if generator.random() < 0.5 else
+                   tuple(generator.choice((0, 1, 2, 128, 255)) for _ in range(3))
+                   for _ in range(67 * 41)])
+
+    for alpha in (0, 1, 128, 255):
+        mask = ClpFile.createAlphaMask(image, alpha)
+        assert mask.mode == 'L' and mask.size == image.size
+        assert mask.tobytes() == createMaskWithPixelLoop(image, alpha).tobytes()
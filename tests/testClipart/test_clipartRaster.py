@@ -0,0 +1,44 @@
+"""Test rasterising clipart with one SVG conversion."""
+
+import sys
+from io import BytesIO
+from pathlib import Path
+
+# Bootstrap the project root so this test can also run directly.
+PROJECT_ROOT = Path(__file__).resolve().parents[2]
+sys.path.insert(0, str(PROJECT_ROOT))
+from testutils import configureTestImportPaths
+configureTestImportPaths(__file__)
+
+import cairosvg
+from PIL import Image
+
+from clpFile import ClpFile, parseSvg # type: ignore
+
+DECORATIONS = PROJECT_ROOT / 'tests' / 'Resources' / 'photofun' / 'decorations'
+
+
+def rasterWithTwoConversions(clipart, width, height):
+    """The former rasterSvgData, which converted the SVG unscaled to find its size."""
+    unscaled = Image.open(BytesIO(cairosvg.svg2png(bytestring=clipart.svgData, unsafe=True)))
+    scale = max(width / unscaled.width, height / unscaled.height)
+    scaled = Image.open(BytesIO(cairosvg.svg2png(bytestring=clipart.svgData, scale=scale, unsafe=True)))
+    return scaled.resize((width, height))
+
+
+def test_rasterMatchesTwoConversions():
+    for fileName in ('customClipart1.clp', '7065-CLIP-SF.clp', '127517/12678-DECO-CC/12678-DECO-CC-mask.clp'):
+        clipart = ClpFile(str(DECORATIONS / fileName))
+        for width, height in ((120, 80), (517, 911)):
+            image = clipart.rasterSvgData(width, height)
+            assert image.size == (width, height)
+            assert image.tobytes() == rasterWithTwoConversions(clipart, width, height).tobytes()
+
+
+def test_clipartDrawnAgainIsNotParsedAgain():
+    clipart = ClpFile(str(DECORATIONS / 'circle.clp'))
+    parseSvg.cache_clear()
+    first = clipart.rasterSvgData(50, 60)
+    second = clipart.rasterSvgData(50, 60)
+    assert parseSvg.cache_info().misses == 1 and parseSvg.cache_info().hits == 1
+    assert first.tobytes() == second.tobytes()
@@ -0,0 +1,51 @@
+"""Test decoding .clp files from their bytes, and keeping the decoded SVG."""
+
+import os
+import sys
+import tempfile
+from pathlib import Path
+
+import pytest
+
+# Bootstrap the project root so this test can also run directly.
+PROJECT_ROOT = Path(__file__).resolve().parents[2]
+sys.path.insert(0, str(PROJECT_ROOT))
+from testutils import configureTestImportPaths
+configureTestImportPaths(__file__)
+
+from clpFile import ClpFile, decodeClp # type: ignore
+
+
+def decodeAsText(fileName):
+    """The former readClp, which read the file as text."""
+    with open(fileName, "rt") as fileClp:
+        contents = fileClp.read()
+    return bytes.fromhex(contents[1:].translate({ord(i): None for i in 'ghijklmnopqrstuvwxyz'}))
+
+
+def test_decodingMatchesTextDecoding():
+    for fileName in sorted((PROJECT_ROOT / 'tests').rglob('*.clp')):
+        assert ClpFile(str(fileName)).svgData == decodeAsText(fileName), fileName.name
+
+
+def test_unchangedFileIsDecodedOnce():
+    with tempfile.TemporaryDirectory() as folder:
+        fileName = os.path.join(folder, 'frame.clp')
+        Path(fileName).write_bytes(b'a' + b'<svg/>'.hex().encode('ascii'))
+        decodeClp.cache_clear()
+        assert ClpFile(fileName).svgData == b'<svg/>'
+        assert ClpFile(fileName).svgData == b'<svg/>'
+        assert decodeClp.cache_info().hits == 1
+
+        # A changed file is decoded again
+        Path(fileName).write_bytes(b'a' + b'<svg></svg>'.hex().encode('ascii'))
+        os.utime(fileName, ns=(0, 0))
+        assert ClpFile(fileName).svgData == b'<svg></svg>'
+
+
+def test_fileWithoutHeaderIsRejected():
+    with tempfile.TemporaryDirectory() as folder:
+        fileName = os.path.join(folder, 'broken.clp')
+        Path(fileName).write_bytes(b'<svg/>'.hex().encode('ascii'))
+        with pytest.raises(ValueError):
+            ClpFile(fileName)
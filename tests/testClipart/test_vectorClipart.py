@@ -0,0 +1,80 @@
+"""Test clipart drawn as PDF paths against the same clipart rasterised."""
+
+import sys
+from io import BytesIO
+from pathlib import Path
+
+# Bootstrap the project root so this test can also run directly.
+PROJECT_ROOT = Path(__file__).resolve().parents[2]
+sys.path.insert(0, str(PROJECT_ROOT))
+from testutils import configureTestImportPaths
+configureTestImportPaths(__file__)
+
+import pikepdf
+import pymupdf
+from PIL import Image, ImageChops
+from reportlab.pdfgen import canvas
+
+from clpFile import ClpFile # type: ignore
+from conversionState import ConversionState # type: ignore
+from imageUtils import drawEncodedImage # type: ignore
+from vectorClipart import createVectorClipart, drawVectorClipart # type: ignore
+
+DECORATIONS = PROJECT_ROOT / 'tests' / 'Resources' / 'photofun' / 'decorations'
+PAGE_SIZE = (200, 150)
+
+
+def renderPage(draw):
+    """Draw on a white page of PAGE_SIZE points and return it as an RGB image of one pixel per point."""
+    output = BytesIO()
+    pdf = canvas.Canvas(output, pagesize=PAGE_SIZE)
+    pdf.setFillColorRGB(1, 1, 1)
+    pdf.rect(0, 0, *PAGE_SIZE, stroke=0, fill=1)
+    state = ConversionState()
+    draw(pdf, state)
+    pdf.save()
+    pixmap = pymupdf.open(stream=output.getvalue(), filetype='pdf')[0].get_pixmap(dpi=72)
+    return Image.frombytes('RGB', (pixmap.width, pixmap.height), pixmap.samples), output.getvalue(), state
+
+
+def differentPixelFraction(first, second):
+    difference = ImageChops.difference(first, second).convert('L').point(lambda value: 255 if value > 64 else 0)
+    return difference.histogram()[255] / (first.width * first.height)
+
+
+def test_vectorClipartLooksLikeRasterClipart():
+    for fileName, alpha, flipX, flipY in (('7065-CLIP-SF.clp', 255, False, False),
+                                          ('customClipart1.clp', 255, True, False),
+                                          ('rect_terracotta.clp', 128, False, True)):
+        clipart = ClpFile(str(DECORATIONS / fileName))
+        vectorClipart = createVectorClipart(clipart)
+        clipart.convertToPngInBuffer(*PAGE_SIZE, alpha, flipX, flipY)
+        rasterImage, _, _ = renderPage(lambda pdf, state: drawEncodedImage(
+            pdf, clipart.pngMemFile.getvalue(), 0, 0, *PAGE_SIZE, state, mask='auto'))
+        vectorImage, _, _ = renderPage(lambda pdf, state: drawVectorClipart(
+            pdf, vectorClipart, 0, 0, *PAGE_SIZE, alpha, flipX, flipY, state))
+        # Only the antialiased edges differ
+        assert differentPixelFraction(rasterImage, vectorImage) < 0.02, fileName
+
+
+def test_clipartsWhichCannotBeDrawnAsVectors():
+    # A gradient, and a clipart covering its area, whose black is transparent
+    for fileName in ('5351-Clip-GD.clp', 'circle.clp'):
+        assert createVectorClipart(ClpFile(str(DECORATIONS / fileName))) is None
+    assert createVectorClipart(ClpFile(str(DECORATIONS / 'rect_white.clp'))).opaque
+    assert not createVectorClipart(ClpFile(str(DECORATIONS / '7065-CLIP-SF.clp'))).opaque
+
+
+def test_repeatedClipartSharesOneForm():
+    vectorClipart = createVectorClipart(ClpFile(str(DECORATIONS / '7065-CLIP-SF.clp')))
+
+    def drawThree(pdf, state):
+        for left in (0, 50, 100):
+            drawVectorClipart(pdf, vectorClipart, left, 0, 50, 50, 255, False, False, state)
+
+    _, pdfData, state = renderPage(drawThree)
+    assert state.performance_counters['shared vector clipart draws'] == 2
+    with pikepdf.open(BytesIO(pdfData)) as pdf:
+        forms = [xobject for xobject in pdf.pages[0].Resources.XObject.values() if xobject.Subtype == '/Form']
+        assert len(forms) == 1
+        assert '/ExtGState' in forms[0].Resources
@@ -0,0 +1,114 @@
+"""Test the clipart cache without rendering an album."""
+
+import os
+import shutil
+import sys
+import tempfile
+from io import BytesIO
+from pathlib import Path
+
+from PIL import Image
+
+# Bootstrap the project root so this test can also run directly.
+PROJECT_ROOT = Path(__file__).resolve().parents[2]
+sys.path.insert(0, str(PROJECT_ROOT))
+from testutils import configureTestImportPaths
+configureTestImportPaths(__file__)
+
+from clipartCache import ClipartCache
+from conversionState import ConversionState
+from imageCache import ImageCache
+
+DECORATIONS = PROJECT_ROOT / 'tests' / 'Resources' / 'photofun' / 'decorations'
+
+
+def copyClipart(folder, fileName='circle.clp'):
+    copiedName = os.path.join(folder, fileName)
+    shutil.copyfile(DECORATIONS / fileName, copiedName)
+    return copiedName
+
+
+def test_repeatedClipartIsCached():
+    with tempfile.TemporaryDirectory() as folder:
+        fileName = copyClipart(folder)
+        clipartCache = ClipartCache(4)
+        state = ConversionState()
+
+        first = clipartCache.getEncodedClipart(fileName, (), [], (60, 40), 255, False, False, state)
+        assert Image.open(BytesIO(first)).size == (60, 40)
+        # A cached clipart needs neither the file nor rasterising
+        os.remove(fileName)
+        assert clipartCache.getEncodedClipart(fileName, (), [], (60, 40), 255, False, False, state) is first
+        assert state.performance_counters['clipart cache hits'] == 1
+        assert state.performance_counters['clipart cache misses'] == 1
+
+
+def test_keyHoldsColorsSizeAlphaAndMirroring():
+    with tempfile.TemporaryDirectory() as folder:
+        fileName = copyClipart(folder)
+        clipartCache = ClipartCache(8)
+        state = ConversionState()
+
+        variants = [([], (60, 40), 255, False, False), ([('#000000', '#FF0000')], (60, 40), 255, False, False),
+                    ([], (61, 40), 255, False, False), ([], (60, 40), 128, False, False),
+                    ([], (60, 40), 255, True, False), ([], (60, 40), 255, False, True)]
+        for colorReplacements, pixelSize, alpha, flipX, flipY in variants:
+            clipartCache.getEncodedClipart(fileName, (), colorReplacements, pixelSize, alpha, flipX, flipY, state)
+        assert len(clipartCache.encoded_images) == len(variants)
+        assert state.performance_counters['clipart cache hits'] == 0
+
+
+def test_leastRecentlyUsedClipartIsEvicted():
+    with tempfile.TemporaryDirectory() as folder:
+        fileName = copyClipart(folder)
+        clipartCache = ClipartCache(2)
+        state = ConversionState()
+
+        for width in (10, 20, 10, 30):
+            clipartCache.getEncodedClipart(fileName, (), [], (width, 10), 255, False, False, state)
+        assert [key[2] for key in clipartCache.encoded_images] == [(10, 10), (30, 10)]
+
+
+def test_imageCacheKeepsClipartBetweenConversions():
+    with tempfile.TemporaryDirectory() as folder:
+        fileName = copyClipart(folder)
+        imageCache = ImageCache(os.path.join(folder, 'cache'), 1024 * 1024)
+
+        firstState = ConversionState()
+        first = ClipartCache(4, imageCache).getEncodedClipart(
+            fileName, (), [], (60, 40), 255, False, False, firstState)
+        assert firstState.performance_counters['clipart image cache misses'] == 1
+
+        secondState = ConversionState()
+        second = ClipartCache(4, imageCache).getEncodedClipart(
+            fileName, (), [], (60, 40), 255, False, False, secondState)
+        assert second == first
+        assert secondState.performance_counters['clipart image cache hits'] == 1
+
+
+def test_vectorClipartIsCachedEvenIfItMustBeRasterised():
+    with tempfile.TemporaryDirectory() as folder:
+        # circle.clp covers its area, with black in it which is transparent
+        fileNames = (copyClipart(folder, '7065-CLIP-SF.clp'), copyClipart(folder))
+        clipartCache = ClipartCache(4)
+        state = ConversionState()
+
+        vectorClipart = clipartCache.getVectorClipart(fileNames[0], (), [], state)
+        assert vectorClipart is not None
+        assert clipartCache.getVectorClipart(fileNames[0], (), [], state) is vectorClipart
+        assert clipartCache.getVectorClipart(fileNames[1], (), [], state) is None
+        assert clipartCache.getVectorClipart(fileNames[1], (), [], state) is None
+        assert state.performance_counters['vector clipart cache hits'] == 2
+        assert state.performance_counters['cliparts rasterised instead of drawn as vectors'] == 1
+
+
+def test_missingClipartIsNone():
+    with tempfile.TemporaryDirectory() as folder:
+        clipartCache = ClipartCache(4)
+        assert clipartCache.getEncodedClipart(os.path.join(folder, 'missing.clp'), (), [], (60, 40), 255,
+                                              False, False, ConversionState()) is None
+
+
+def test_configuration():
+    assert ClipartCache.fromConfiguration({}).max_entries == 32
+    assert ClipartCache.fromConfiguration({'clipartCacheEntries': '0'}).max_entries == 0
@@ -0,0 +1,62 @@
+"""Test the stage timing reported by --profile."""
+
+import json
+import os
+import pstats
+import sys
+import tempfile
+from pathlib import Path
+
+# Bootstrap the project root so this test can also run directly.
+PROJECT_ROOT = Path(__file__).resolve().parents[2]
+sys.path.insert(0, str(PROJECT_ROOT))
+from testutils import configureTestImportPaths
+configureTestImportPaths(__file__)
+
+from cewe2pdf import convertMcf # type: ignore
+from conversionProfile import ConversionProfile, ProfileSpan # type: ignore
+
+ALBUM_NAME = str(PROJECT_ROOT / 'tests' / 'testShadows' / 'test_shadows.mcf')
+
+
+def span(name, page, duration):
+    return ProfileSpan(name, page, 0.0, duration, 1, 1)
+
+
+def test_summaryGivesCountTotalAndPercentiles():
+    profile = ConversionProfile()
+    profile.addSpans([span('processAreaImageTag', '2', duration / 100) for duration in range(1, 101)])
+    profile.addSpans([span('pdf.save', None, 3.0)])
+
+    rows = {row['name']: row for row in profile.summary()}
+
+    assert rows['processAreaImageTag']['count'] == 100
+    assert abs(rows['processAreaImageTag']['total'] - 50.5) < 1e-9
+    assert rows['processAreaImageTag']['p50'] == 0.5
+    assert rows['processAreaImageTag']['p95'] == 0.95
+    assert rows['pdf.save']['p50'] == rows['pdf.save']['p95'] == 3.0
+    # The slowest first
+    assert [row['name'] for row in profile.summary()] == ['processAreaImageTag', 'pdf.save']
+
+
+def test_profiledConversionReportsStagesPagesAndFiles(capsys):
+    with tempfile.TemporaryDirectory() as folder:
+        statsFileName = os.path.join(folder, 'conversion.pstats')
+        traceFileName = os.path.join(folder, 'conversion.json')
+        profile = ConversionProfile(statsFileName, traceFileName)
+
+        assert convertMcf(ALBUM_NAME, False, [0, 2, 3], outputFileName=os.path.join(folder, 'out.pdf'),
+                          profile=profile)
+
+        names = {row['name'] for row in profile.summary()}
+        assert {'prepareConversion', 'findAndRegisterFonts', 'readClipArtConfigXML', 'processBackground',
+                'processAreaImageTag', 'processAreaTextTag', 'pdf.save', 'page'} <= names
+        pageRows = {row['page']: row for row in profile.pageSummary()}
+        assert pageRows['2 (RegularPage)']['processAreaImageTag'][0] > 0
+        assert pageRows['2 (RegularPage)']['total'] >= pageRows['2 (RegularPage)']['processAreaImageTag'][1]
+        assert 'processAreaImageTag' in capsys.readouterr().out
+
+        events = json.loads(Path(traceFileName).read_text(encoding='utf-8'))['traceEvents']
+        assert len(events) == len(profile.spans)
+        assert all(event['ph'] == 'X' and event['dur'] >= 0 for event in events)
+        assert pstats.Stats(statsFileName).total_calls > 0
@@ -0,0 +1,83 @@
+"""Test converting albums posted to the conversion server."""
+
+import json
+import os
+import shutil
+import sys
+import tempfile
+import threading
+import urllib.error
+import urllib.request
+from pathlib import Path
+
+import pytest
+
+# Bootstrap the project root so this test can also run directly.
+PROJECT_ROOT = Path(__file__).resolve().parents[2]
+sys.path.insert(0, str(PROJECT_ROOT))
+from testutils import configureTestImportPaths
+configureTestImportPaths(__file__)
+
+from cewe2pdf import image_quality, mcf2rl, pil_antialias # type: ignore
+from conversionServer import ConversionServer, JobError, ServerSettings, parseJob # type: ignore
+from pageElements import processElements # type: ignore
+
+ALBUM_FOLDER = PROJECT_ROOT / 'tests' / 'testShadows'
+
+
+@pytest.fixture(name='serverUrl')
+def fixture_serverUrl():
+    server = ConversionServer(ServerSettings(mcf2rl, image_quality, pil_antialias, processElements), port=0)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    try:
+        yield f'http://127.0.0.1:{server.server_address[1]}'
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+def postJob(serverUrl, job):
+    request = urllib.request.Request(f'{serverUrl}/convert', data=json.dumps(job).encode('utf-8'),
+                                     headers={'Content-Type': 'application/json'})
+    with urllib.request.urlopen(request, timeout=300) as response:
+        return [json.loads(line) for line in response]
+
+
+def test_serverConvertsEachPostedAlbum(serverUrl):
+    with tempfile.TemporaryDirectory() as folder:
+        shutil.copytree(ALBUM_FOLDER / 'test_shadows_mcf-Dateien', Path(folder, 'test_shadows_mcf-Dateien'))
+        shutil.copy(ALBUM_FOLDER / 'cewe2pdf.ini', folder)
+        albumName = os.path.join(folder, 'album.mcf')
+        shutil.copy(ALBUM_FOLDER / 'test_shadows.mcf', albumName)
+
+        for index in range(2):
+            outFile = os.path.join(folder, f'album{index}.pdf')
+            events = postJob(serverUrl, {'album': albumName, 'pages': [2, 3], 'outFile': outFile})
+
+            assert events[0] == {'event': 'started', 'album': albumName}
+            assert any(event['event'] == 'log' and 'parsing pagenr' in event['message'] for event in events)
+            finished = events[-1]
+            assert finished['event'] == 'finished'
+            assert finished['succeeded'], finished
+            assert finished['output'] == outFile
+            assert os.path.isfile(outFile)
+
+        with urllib.request.urlopen(f'{serverUrl}/status', timeout=10) as response:
+            assert json.load(response) == {'status': 'ready', 'completed_jobs': 2}
+
+
+def test_serverRejectsAnInvalidJob(serverUrl):
+    with pytest.raises(urllib.error.HTTPError) as raised:
+        postJob(serverUrl, {'album': os.path.join(tempfile.gettempdir(), 'missing.mcf')})
+    assert raised.value.code == 400
+    assert 'is not an existing file' in json.load(raised.value)['error']
+
+
+def test_jobRejectsBooleansAsNumbers():
+    with tempfile.NamedTemporaryFile(suffix='.mcf') as album:
+        assert parseJob(json.dumps({'album': album.name, 'jobs': 2, 'pages': [1, 2]}))['jobs'] == 2
+        with pytest.raises(JobError, match='jobs'):
+            parseJob(json.dumps({'album': album.name, 'jobs': True}))
+        with pytest.raises(JobError, match='pages'):
+            parseJob(json.dumps({'album': album.name, 'pages': [True]}))
@@ -17,9 +17,11 @@ from PIL import Image
 from pikepdf import Pdf, PdfImage
 
 from compare_pdf import ComparePDF, ShowDiffsStyle # type: ignore
+import albumConversionSession # type: ignore
 from cewe2pdf import convertMcf # type: ignore
 from corners import (CornerInfo, CornerShape, CornersInfo, applyCornerMask,
                      getCornerInfo, hasImplementedCorners) # type: ignore
+from renderContext import createRenderContext # type: ignore
 
 from testutils import getLatestResultFile
 
@@ -108,6 +110,28 @@ def test_testCorners(main=False):
     latestResultFile = getLatestResultFile(albumFolderBasename, f"*{styleid}.pdf")
     tryToBuildBook(inFile, outFile, latestResultFile, False)
 
+def test_jpegDraftModeMatchesFullDecode(monkeypatch):
+    # Decoding the photos at a reduced scale must look the same, to within
+    # resampling noise, as decoding them at full size before resizing
+    albumFolderBasename, albumBasename, inFile, yyyymmdd = defineCommonVariables()
+    outFiles = []
+    for draftMode in (True, False):
+        def createContextWithDraftMode(*args, draftMode=draftMode):
+            renderContext = createRenderContext(*args)
+            renderContext.jpeg_draft_mode = draftMode
+            return renderContext
+        monkeypatch.setattr(albumConversionSession, 'createRenderContext', createContextWithDraftMode)
+        outFile = str(Path(Path.cwd(), 'tests', f"{albumFolderBasename}",
+            f'{albumBasename}_draft{draftMode}.mcf.{yyyymmdd}S.pdf'))
+        tryToBuildBook(inFile, outFile, None, False)
+        outFiles.append(outFile)
+
+    # The largest channel difference measured between the two is 4
+    compare = ComparePDF(outFiles, ShowDiffsStyle.Nothing, tolerance=4)
+    assert compare.compare(), "Draft mode decode differs from the full decode"
+    for outFile in outFiles:
+        os.remove(outFile)
+
 if __name__ == '__main__':
     #only executed when this file is run directly.
     test_recognises_unsupported_corner_shapes()
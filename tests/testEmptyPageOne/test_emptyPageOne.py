@@ -20,11 +20,11 @@ from cewe2pdf import convertMcf # type: ignore
 from testutils import getOutFileBasename, getLatestResultFile
 
 
-def tryToBuildBook(inFile, outFile, latestResultFile, keepDoublePages, expectedPages):
+def tryToBuildBook(inFile, outFile, latestResultFile, keepDoublePages, expectedPages, jobs=1):
     if os.path.exists(outFile) == True:
         os.remove(outFile)
     assert os.path.exists(outFile) == False
-    convertMcf(inFile, keepDoublePages, outputFileName=outFile)
+    convertMcf(inFile, keepDoublePages, outputFileName=outFile, jobs=jobs)
     assert Path(outFile).exists() == True
 
     #check the pdf contents
@@ -66,7 +66,26 @@ def test_testEmptyPageOne(main=False):
     outFileBasename = getOutFileBasename(main, albumBasename, yyyymmdd, styleid)
     outFile = str(Path(Path.cwd(), 'tests', f"{albumFolderBasename}", outFileBasename))
     latestResultFile = getLatestResultFile(albumFolderBasename, f"*{styleid}.pdf")
-    tryToBuildBook(inFile, outFile, latestResultFile, True, 15)
+    tryToBuildBook(inFile, outFile, latestResultFile, True, 15)
+
+
+def test_testEmptyPageOneParallel(main=False):
+    # the pages rendered by two worker processes must match the same golden results
+    albumFolderBasename, albumBasename, inFile, yyyymmdd = defineCommonVariables()
+    styleid = "S"
+    outFileBasename = getOutFileBasename(main, albumBasename, yyyymmdd, f"{styleid}Parallel")
+    outFile = str(Path(Path.cwd(), 'tests', f"{albumFolderBasename}", outFileBasename))
+    latestResultFile = getLatestResultFile(albumFolderBasename, f"*{styleid}.pdf")
+    tryToBuildBook(inFile, outFile, latestResultFile, False, 28, jobs=2)
+
+    styleid = "D"
+    outFileBasename = getOutFileBasename(main, albumBasename, yyyymmdd, f"{styleid}Parallel")
+    outFile = str(Path(Path.cwd(), 'tests', f"{albumFolderBasename}", outFileBasename))
+    latestResultFile = getLatestResultFile(albumFolderBasename, f"*{styleid}.pdf")
+    tryToBuildBook(inFile, outFile, latestResultFile, True, 15, jobs=2)
+
+
 if __name__ == '__main__':
     #only executed when this file is run directly.
     test_testEmptyPageOne(main=True)
+    test_testEmptyPageOneParallel(main=True)
@@ -0,0 +1,73 @@
+"""Test the persistent font metadata cache without rendering an album."""
+
+import os
+import shutil
+import sys
+import tempfile
+from pathlib import Path
+
+# Bootstrap the project root so this test can also run directly.
+PROJECT_ROOT = Path(__file__).resolve().parents[2]
+sys.path.insert(0, str(PROJECT_ROOT))
+from testutils import configureTestImportPaths
+configureTestImportPaths(__file__)
+
+import fontHandling  # type: ignore
+from fontHandling import readFontNames  # type: ignore
+from fontMetadataCache import FONT_METADATA_CACHE_FILE_NAME, FontMetadataCache  # type: ignore
+
+FONT_FILE = PROJECT_ROOT / 'tests' / 'Resources' / 'photofun' / 'fonts' / 'Poppins-Light.ttf'
+
+
+def test_fontNamesAreReadFromTheCache(monkeypatch):
+    with tempfile.TemporaryDirectory() as folder:
+        fontFile = shutil.copy(FONT_FILE, folder)
+        cacheFileName = os.path.join(folder, FONT_METADATA_CACHE_FILE_NAME)
+        fontMetadataCache = FontMetadataCache(cacheFileName)
+        names = readFontNames(fontFile, fontMetadataCache)
+        assert names == ('Poppins Light', 'Regular', 'Poppins Light')
+        fontMetadataCache.save()
+
+        # A fresh cache, as in the next conversion, no longer parses the font
+        monkeypatch.setattr(fontHandling.ttLib, 'TTFont', None)
+        assert readFontNames(fontFile, FontMetadataCache(cacheFileName)) == names
+
+        # but it does if the font file changes
+        os.utime(fontFile, ns=(1, 1))
+        monkeypatch.undo()
+        assert readFontNames(fontFile, FontMetadataCache(cacheFileName)) == names
+
+
+def test_badFontIsReportedOnce(caplog):
+    with tempfile.TemporaryDirectory() as folder:
+        fontFile = os.path.join(folder, 'broken.ttf')
+        Path(fontFile).write_bytes(b'not a font')
+        cacheFileName = os.path.join(folder, FONT_METADATA_CACHE_FILE_NAME)
+
+        fontMetadataCache = FontMetadataCache(cacheFileName)
+        assert readFontNames(fontFile, fontMetadataCache) is None
+        fontMetadataCache.save()
+        assert 'Could not read font file' in caplog.text
+
+        caplog.clear()
+        assert readFontNames(fontFile, FontMetadataCache(cacheFileName)) is None
+        assert 'Could not read font file' not in caplog.text
+
+
+def test_registrationFailureIsRemembered():
+    with tempfile.TemporaryDirectory() as folder:
+        fontFile = shutil.copy(FONT_FILE, folder)
+        cacheFileName = os.path.join(folder, FONT_METADATA_CACHE_FILE_NAME)
+        fontMetadataCache = FontMetadataCache(cacheFileName)
+        readFontNames(fontFile, fontMetadataCache)
+        assert not fontMetadataCache.isKnownUnregistrable(fontFile)
+        fontMetadataCache.setRegistrationFailed(fontFile)
+        fontMetadataCache.save()
+        assert FontMetadataCache(cacheFileName).isKnownUnregistrable(fontFile)
+
+
+def test_configuration():
+    with tempfile.TemporaryDirectory() as folder:
+        fontMetadataCache = FontMetadataCache.fromConfiguration({}, folder)
+        assert fontMetadataCache.file_name == os.path.join(folder, FONT_METADATA_CACHE_FILE_NAME)
+        assert FontMetadataCache.fromConfiguration({'fontMetadataCache': 'False'}, folder) is None
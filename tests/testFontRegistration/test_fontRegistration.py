@@ -0,0 +1,49 @@
+"""Test that only the fonts an album uses are registered before rendering."""
+
+import sys
+from pathlib import Path
+
+from lxml import etree
+from reportlab.lib.fonts import tt2ps
+
+# Bootstrap the project root so this test can also run directly.
+PROJECT_ROOT = Path(__file__).resolve().parents[2]
+sys.path.insert(0, str(PROJECT_ROOT))
+from testutils import configureTestImportPaths
+configureTestImportPaths(__file__)
+
+from fontHandling import (AvailableFonts, buildFontsToRegisterFromTtfFiles,  # type: ignore
+                          collectUsedFontFamilies, registerFontFamilies)
+
+FONT_FOLDER = PROJECT_ROOT / 'tests' / 'Resources' / 'photofun' / 'fonts'
+
+
+def test_usedFontFamiliesAreCollected():
+    fotobook = etree.XML(
+        '<fotobook>'
+        '<pagenumbering fontfamily="Crafty Girls"/>'
+        '<page><area><text><![CDATA[<html><body style=" font-family:\'Arial\'; font-size:12pt;">'
+        '<p><span style=" font-family:\'EB Garamond\'; font-weight:700;">Title</span></p>'
+        '</body></html>]]></text></area></page>'
+        '</fotobook>')
+    assert collectUsedFontFamilies(fotobook) == {'Arial', 'EB Garamond', 'Crafty Girls'}
+
+
+def test_familyIsRegisteredOnFirstUseWithItsBoldAndItalicFaces():
+    fontsToRegister = {}
+    familiesToRegister = {}
+    ttfFiles = sorted(str(fontFile) for fontFile in FONT_FOLDER.glob('*.ttf')
+                      if fontFile.name.startswith(('EBGaramond-', 'DancingScript-')))
+    buildFontsToRegisterFromTtfFiles(ttfFiles, fontsToRegister, familiesToRegister)
+    availableFonts = AvailableFonts(fontsToRegister, familiesToRegister)
+
+    # The families are mapped before any face is registered, as when the
+    # album's text asks for a font which the pre-scan did not find.
+    registerFontFamilies(familiesToRegister, [], availableFonts)
+    availableFonts.ensureRegistered('EB Garamond')
+
+    assert 'EB Garamond Bold Italic' in availableFonts.attempted_faces
+    assert not any(faceName.startswith('Dancing Script') for faceName in availableFonts.attempted_faces)
+    # Registering the face named like its family must not lose the family's other faces
+    assert tt2ps('EB Garamond', 1, 0) == 'EB Garamond Bold'
+    assert tt2ps('EB Garamond', 0, 1) == 'EB Garamond Italic'
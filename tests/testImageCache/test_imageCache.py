@@ -0,0 +1,68 @@
+"""Test the persistent image-area cache without rendering an album."""
+
+import os
+import sys
+import tempfile
+from pathlib import Path
+
+# Bootstrap the project root so this test can also run directly.
+PROJECT_ROOT = Path(__file__).resolve().parents[2]
+sys.path.insert(0, str(PROJECT_ROOT))
+from testutils import configureTestImportPaths
+configureTestImportPaths(__file__)
+
+from imageCache import IMAGE_CACHE_FOLDER_NAME, ImageCache
+
+
+def test_keyDependsOnSourceAndParameters():
+    with tempfile.TemporaryDirectory() as folder:
+        sourceName = os.path.join(folder, 'photo.jpg')
+        Path(sourceName).write_bytes(b'first photo')
+        imageCache = ImageCache(os.path.join(folder, 'cache'), 1000)
+
+        firstKey = ImageCache.makeKey(imageCache.sourceHash(sourceName), (0, 0, 10, 10))
+        assert firstKey == ImageCache.makeKey(imageCache.sourceHash(sourceName), (0, 0, 10, 10))
+        assert firstKey != ImageCache.makeKey(imageCache.sourceHash(sourceName), (0, 0, 10, 11))
+
+        Path(sourceName).write_bytes(b'second photo')
+        os.utime(sourceName, ns=(0, 0))
+        assert firstKey != ImageCache.makeKey(imageCache.sourceHash(sourceName), (0, 0, 10, 10))
+
+
+def test_storeAndLoad():
+    with tempfile.TemporaryDirectory() as folder:
+        imageCache = ImageCache(folder, 1000)
+        key = ImageCache.makeKey('source', 1)
+        assert imageCache.load(key) is None
+
+        entryName = imageCache.store(key, 'PNG', b'png bytes')
+        assert entryName.endswith('.png')
+        assert imageCache.load(key) == b'png bytes'
+
+
+def test_pruneRemovesLeastRecentlyUsed():
+    with tempfile.TemporaryDirectory() as folder:
+        imageCache = ImageCache(folder, 250)
+        keys = [ImageCache.makeKey('source', number) for number in range(3)]
+        for age, key in enumerate(keys):
+            entryName = imageCache.store(key, 'JPEG', b'x' * 100)
+            os.utime(entryName, (1000 + age, 1000 + age))
+
+        # Using the oldest entry makes the second one the least recently used.
+        imageCache.load(keys[0])
+        assert imageCache.prune() == 1
+        assert imageCache.load(keys[0]) is not None
+        assert imageCache.load(keys[1]) is None
+        assert imageCache.load(keys[2]) is not None
+
+
+def test_configuration():
+    with tempfile.TemporaryDirectory() as folder:
+        imageCache = ImageCache.fromConfiguration({'imageCacheSizeMB': '2'}, folder)
+        assert imageCache.folder == os.path.join(folder, IMAGE_CACHE_FOLDER_NAME)
+        assert imageCache.size_limit_bytes == 2 * 1024 * 1024
+        assert ImageCache.fromConfiguration({'imageCache': 'False'}, folder) is None
+        assert ImageCache.fromConfiguration({'imageCacheSizeMB': '0'}, folder) is None
+        # The tests never use the cache in the user's own app data folder
+        assert os.getenv('IGNOREIMAGECACHE') is not None
+        assert ImageCache.fromConfiguration({}, None) is None
@@ -2,10 +2,17 @@
 
 import os
 import sys
+import tempfile
 from datetime import datetime
+from io import BytesIO
 from pathlib import Path
 
+import numpy as np
+import pymupdf
+from PIL import Image
 from pikepdf import Pdf
+from reportlab.lib.utils import ImageReader
+from reportlab.pdfgen import canvas
 
 # Bootstrap the project root so this test can also run directly.
 PROJECT_ROOT = Path(__file__).resolve().parents[2]
@@ -17,6 +24,9 @@ configureTestImportPaths(__file__)
 
 from compare_pdf import ComparePDF, ShowDiffsStyle  # type: ignore
 from cewe2pdf import convertMcf  # type: ignore
+from conversionState import ConversionState  # type: ignore
+from imageUtils import autorot, drawEncodedImage, encodedImageReader  # type: ignore
+from imageareas import _drawOrientedImage  # type: ignore
 
 
 TEST_DIRECTORY = Path(__file__).parent
@@ -24,12 +34,12 @@ ALBUM_FILE = TEST_DIRECTORY / 'test_imageOperations.mcf'
 EXPECTED_PAGE_COUNT = 28
 
 
-def buildAndCompareImageOperations(main=False):
+def buildAndCompareImageOperations(main=False, albumVariant='', appDataDir=None):
     """Create the operation test PDF and compare it with its approved result."""
     styleId = 'S'
     yyyymmdd = datetime.today().strftime('%Y%m%d')
-    outputName = ('test_imageOperations.mcf.pdf' if main else
-                  f'test_imageOperations.mcf.{yyyymmdd}{styleId}.pdf')
+    outputName = (f'test_imageOperations{albumVariant}.mcf.pdf' if main else
+                  f'test_imageOperations{albumVariant}.mcf.{yyyymmdd}{styleId}.pdf')
     outputFile = TEST_DIRECTORY / outputName
     latestResultFile = getLatestResultFile(TEST_DIRECTORY.name,
                                            f'*{styleId}.pdf')
@@ -37,7 +47,7 @@ def buildAndCompareImageOperations(main=False):
     if outputFile.exists():
         os.remove(outputFile)
 
-    convertMcf(str(ALBUM_FILE), False, outputFileName=str(outputFile))
+    convertMcf(str(ALBUM_FILE), False, appDataDir=appDataDir, outputFileName=str(outputFile))
     assert outputFile.is_file()
 
     with Pdf.open(outputFile) as readPdf:
@@ -62,5 +72,98 @@ def test_imageOperations():
     buildAndCompareImageOperations()
 
 
+def test_imageOperationsFromImageCache(capsys):
+    """A second conversion draws every image from the image cache, unchanged."""
+    with tempfile.TemporaryDirectory() as appDataDir:
+        buildAndCompareImageOperations(albumVariant='_cached', appDataDir=appDataDir)
+        firstRunOutput = capsys.readouterr().out
+        assert 'image cache misses' in firstRunOutput
+        cachedFiles = sorted(Path(appDataDir, 'imagecache').rglob('*.*'))
+        assert cachedFiles
+
+        buildAndCompareImageOperations(albumVariant='_cached', appDataDir=appDataDir)
+        secondRunOutput = capsys.readouterr().out
+        assert 'image cache hits' in secondRunOutput
+        assert 'image cache misses' not in secondRunOutput
+        # and a cached image is not counted as re-encoded
+        assert 're-encoded images' in firstRunOutput
+        assert 're-encoded images' not in secondRunOutput
+        assert sorted(Path(appDataDir, 'imagecache').rglob('*.*')) == cachedFiles
+
+
+def test_encodedImageReader():
+    """Encoded images are drawn from memory unless temporary files are requested."""
+    buffer = BytesIO()
+    Image.new('RGBA', (4, 3), (255, 0, 0, 128)).save(buffer, 'PNG')
+    encodedImage = buffer.getvalue()
+
+    state = ConversionState()
+    assert encodedImageReader(encodedImage, state).getSize() == (4, 3)
+    assert state.performance_counters['temporary image bytes not written'] == len(encodedImage)
+    assert not state.temporary_files
+
+    assert encodedImageReader(encodedImage, state, useTemporaryFile=True).getSize() == (4, 3)
+    assert len(state.temporary_files) == 1
+    os.remove(state.temporary_files[0])
+
+
+def test_drawEncodedImageSharesRepeatedImages():
+    """Identical encoded images drawn again reuse the first PDF image XObject."""
+    buffer = BytesIO()
+    Image.new('RGB', (4, 3), (255, 0, 0)).save(buffer, 'JPEG')
+    encodedImage = buffer.getvalue()
+
+    state = ConversionState()
+    pdfBuffer = BytesIO()
+    pdf = canvas.Canvas(pdfBuffer, pagesize=(100, 100))
+    drawEncodedImage(pdf, encodedImage, 0, 0, 40, 30, state)
+    pdf.showPage()
+    drawEncodedImage(pdf, encodedImage, 10, 10, 80, 60, state)
+    drawEncodedImage(pdf, encodedImage, 10, 10, 80, 60, state, mask='auto')
+    pdf.showPage()
+    pdf.save()
+
+    assert state.performance_counters['shared image draws'] == 1
+    assert state.performance_counters['shared image bytes not decoded again'] == len(encodedImage)
+    readPdf = Pdf.open(BytesIO(pdfBuffer.getvalue()))
+    firstPageImages = set(readPdf.pages[0].images.keys())
+    secondPageImages = set(readPdf.pages[1].images.keys())
+    assert len(firstPageImages) == 1
+    # a different mask needs its own image, the repeated draw shares the first one
+    assert len(secondPageImages) == 2 and firstPageImages < secondPageImages
+
+
+def test_jpegPassthroughOrientations():
+    """Each EXIF orientation drawn as a PDF transform matches Pillow's rotated pixels."""
+    source = Image.new('RGB', (40, 20), (255, 0, 0))
+    source.paste((0, 0, 255), (20, 0, 40, 10))
+    source.paste((0, 160, 0), (0, 10, 10, 20))
+
+    for orientation in range(1, 9):
+        exif = Image.Exif()
+        exif[274] = orientation
+        jpegBuffer = BytesIO()
+        source.save(jpegBuffer, 'JPEG', quality=95, exif=exif)
+        jpegBytes = jpegBuffer.getvalue()
+
+        rotated = autorot(Image.open(BytesIO(jpegBytes)))
+        width, height = rotated.size
+        pdfBuffer = BytesIO()
+        pdf = canvas.Canvas(pdfBuffer, pagesize=(width, height))
+        pdf.translate(width / 2, height / 2)
+        pdf.drawImage(ImageReader(rotated), -width / 2, -height / 2, width=width, height=height)
+        pdf.showPage()
+        pdf.translate(width / 2, height / 2)
+        _drawOrientedImage(pdf, jpegBytes, orientation, width, height, ConversionState())
+        pdf.showPage()
+        pdf.save()
+
+        with pymupdf.open(stream=pdfBuffer.getvalue(), filetype='pdf') as document:
+            expected, actual = (
+                np.frombuffer(page.get_pixmap(dpi=72).samples, np.uint8).astype(int)
+                for page in document)
+        assert np.abs(expected - actual).mean() < 4, f'orientation {orientation}'
+
+
 if __name__ == '__main__':
     buildAndCompareImageOperations(main=True)
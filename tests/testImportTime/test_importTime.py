@@ -0,0 +1,60 @@
+"""Test that starting a conversion does not import libraries it does not need.
+
+cv2, numpy and pymupdf are needed only for an album index, BeautifulSoup only
+for TextArt, cairosvg only for clipart, pikepdf only for clipart drawn as vectors
+and pillow_heif only for HEIC photos.
+Each adds a noticeable time to the start of every conversion, which matters
+most for the frozen Windows executable and for one process per album.
+"""
+
+import os
+import subprocess
+import sys
+import tempfile
+from pathlib import Path
+
+# Bootstrap the project root so this test can also run directly.
+PROJECT_ROOT = Path(__file__).resolve().parents[2]
+sys.path.insert(0, str(PROJECT_ROOT))
+from testutils import configureTestImportPaths
+configureTestImportPaths(__file__)
+
+OPTIONAL_FEATURE_MODULES = ('cv2', 'numpy', 'pymupdf', 'bs4', 'cairosvg', 'pikepdf', 'pillow_heif')
+
+# Importing cewe2pdf takes about 0.45 s on a slow single-CPU test machine, and
+# took 0.95 s before the modules above were imported only when needed. The
+# budget leaves room for a slower machine, but not for their return.
+IMPORT_TIME_BUDGET_SECONDS = 1.5
+
+
+def runPython(code):
+    """Run code in a new Python with -X importtime and return its stdout and the modules it imported."""
+    result = subprocess.run([sys.executable, '-X', 'importtime', '-c', code], cwd=PROJECT_ROOT,
+                            capture_output=True, text=True, check=True)
+    cumulativeTimes = {}
+    for line in result.stderr.splitlines():
+        if line.startswith('import time:') and '|' in line:
+            _, cumulative, moduleName = line.split('|')
+            if cumulative.strip().isdigit():
+                cumulativeTimes[moduleName.strip()] = int(cumulative) / 1e6
+    return result.stdout, cumulativeTimes
+
+
+def test_importingCewe2pdfLoadsNoOptionalFeatureLibrary():
+    _, cumulativeTimes = runPython('import cewe2pdf')
+
+    importedFeatureModules = [moduleName for moduleName in OPTIONAL_FEATURE_MODULES if moduleName in cumulativeTimes]
+    assert not importedFeatureModules
+    assert cumulativeTimes['cewe2pdf'] < IMPORT_TIME_BUDGET_SECONDS
+
+
+def test_convertingWithoutIndexOrHeicLoadsNoOptionalFeatureLibrary():
+    albumName = PROJECT_ROOT / 'tests' / 'testShadows' / 'test_shadows.mcf'
+    with tempfile.TemporaryDirectory() as folder:
+        outputFileName = os.path.join(folder, 'test_shadows.pdf')
+        stdout, _ = runPython(
+            'import sys, cewe2pdf\n'
+            f'cewe2pdf.convertMcf({str(albumName)!r}, False, outputFileName={outputFileName!r})\n'
+            f'print("loaded", [m for m in {OPTIONAL_FEATURE_MODULES!r} if m in sys.modules])\n')
+        assert os.path.isfile(outputFileName)
+    assert 'loaded []' in stdout
@@ -0,0 +1,102 @@
+"""Test converting an .mcfx album without unpacking it.
+
+The album and images of testShadows are packed into a synthetic .mcfx file,
+which is then converted both directly from the database and by unpacking
+it to a folder first. The two results must be identical.
+"""
+
+import os
+import shutil
+import sqlite3
+import sys
+import tempfile
+from pathlib import Path
+
+# Bootstrap the project root so this test can also run directly.
+PROJECT_ROOT = Path(__file__).resolve().parents[2]
+sys.path.insert(0, str(PROJECT_ROOT))
+from testutils import configureTestImportPaths
+configureTestImportPaths(__file__)
+
+from compare_pdf import ComparePDF, ShowDiffsStyle # type: ignore
+from cewe2pdf import convertMcf # type: ignore
+from mcfx import McfxContainer # type: ignore
+
+ALBUM_FOLDER = PROJECT_ROOT / 'tests' / 'testShadows'
+
+
+def createMcfx(mcfxPath):
+    """Pack testShadows into an .mcfx, with extra content after the fotobook as CEWE writes it."""
+    connection = sqlite3.connect(mcfxPath)
+    try:
+        connection.execute('CREATE TABLE Files (Filename TEXT, Data BLOB, LastModified INTEGER)')
+        # The images of an .mcfx album are not in a separate folder
+        mcfData = (ALBUM_FOLDER / 'test_shadows.mcf').read_bytes().replace(
+            b'imagedir="test_shadows_mcf-Dateien"', b'imagedir=""') + b'\0\0trailing'
+        connection.execute('INSERT INTO Files VALUES (?, ?, ?)', ('data.mcf', mcfData, 0))
+        for imageFile in (ALBUM_FOLDER / 'test_shadows_mcf-Dateien').iterdir():
+            connection.execute('INSERT INTO Files VALUES (?, ?, ?)', (imageFile.name, imageFile.read_bytes(), 0))
+        connection.commit()
+    finally:
+        connection.close()
+
+
+def test_containerReadsFilesWithoutUnpacking():
+    with tempfile.TemporaryDirectory() as folder:
+        mcfxPath = Path(folder, 'album.mcfx')
+        createMcfx(mcfxPath)
+        container = McfxContainer(mcfxPath)
+        try:
+            assert container.readMcf().endswith(b'</fotobook>')
+            imageName = os.path.join(container.folder, 'z31qhpgx_1_greysquareblueborder.jpg')
+            assert container.containerName(imageName) == 'z31qhpgx_1_greysquareblueborder.jpg'
+            assert container.containerName(os.path.join(folder, 'elsewhere.jpg')) is None
+            with container.open(container.containerName(imageName)) as blob:
+                assert blob.read() == (ALBUM_FOLDER / 'test_shadows_mcf-Dateien' /
+                                       'z31qhpgx_1_greysquareblueborder.jpg').read_bytes()
+        finally:
+            container.close()
+
+
+def test_directAndUnpackedConversionsMatch():
+    with tempfile.TemporaryDirectory() as folder:
+        mcfxPath = Path(folder, 'album.mcfx')
+        createMcfx(mcfxPath)
+        shutil.copy(ALBUM_FOLDER / 'cewe2pdf.ini', folder)
+        # Both conversions must decode the photos, rather than the second using the first's cached pixels
+        with open(os.path.join(folder, 'cewe2pdf.ini'), 'a', encoding='utf-8') as configFile:
+            configFile.write('\nimageCache = False\n')
+
+        directPdf = os.path.join(folder, 'direct.pdf')
+        convertMcf(str(mcfxPath), False, outputFileName=directPdf)
+        # Reading directly from the database writes nothing but the pdf
+        assert sorted(os.listdir(folder)) == ['album.mcfx', 'cewe2pdf.ini', 'direct.pdf']
+
+        unpackedPdf = os.path.join(folder, 'unpacked.pdf')
+        convertMcf(str(mcfxPath), False, mcfxTmpDir=os.path.join(folder, 'unpacked'),
+                   outputFileName=unpackedPdf)
+
+        compare = ComparePDF([directPdf, unpackedPdf], ShowDiffsStyle.Nothing)
+        result = compare.compare()
+        compare.cleanup()
+        assert result, "Pixel comparison failed"
+
+
+def test_pagesUnpackOnlyTheirPhotos():
+    with tempfile.TemporaryDirectory() as folder:
+        mcfxPath = Path(folder, 'album.mcfx')
+        createMcfx(mcfxPath)
+        shutil.copy(ALBUM_FOLDER / 'cewe2pdf.ini', folder)
+
+        # Pages 10 and 11 have no photos, so only the album itself is unpacked
+        emptyPageFolder = os.path.join(folder, 'emptyPage')
+        convertMcf(str(mcfxPath), False, pageNumbers=[11], mcfxTmpDir=emptyPageFolder,
+                   outputFileName=os.path.join(folder, 'emptyPage.pdf'))
+        assert sorted(os.listdir(emptyPageFolder)) == ['data.mcf']
+
+        # Page 3 shows the photos placed on the even page element 2
+        photoPageFolder = os.path.join(folder, 'photoPage')
+        convertMcf(str(mcfxPath), False, pageNumbers=[3], mcfxTmpDir=photoPageFolder,
+                   outputFileName=os.path.join(folder, 'photoPage.pdf'))
+        assert sorted(os.listdir(photoPageFolder)) == ['data.mcf', 'z31qhpgx_1_greysquareblueborder.jpg']
+        assert os.path.exists(os.path.join(folder, 'photoPage.pdf'))
@@ -17,9 +17,11 @@ import filecmp
 import logging
 import sqlite3
 import tempfile
+from concurrent.futures import ThreadPoolExecutor
 
 import xml.etree.ElementTree as ET
 
+import mcfx
 from mcfx import unpackMcfx
 
 class XmlTree():
@@ -195,10 +197,66 @@ def test_mcfxExtraction_withNonNumericLastModified():
         assert extractedMcfPath.read_bytes() == mcfData
 
 
+def test_mcfxExtraction_copiesFilesInChunks(monkeypatch):
+    """Photos are streamed from the database, so one larger than a chunk must arrive intact."""
+    with tempfile.TemporaryDirectory() as temporaryDirectory:
+        temporaryPath = Path(temporaryDirectory)
+        mcfxPath = temporaryPath / 'chunked.mcfx'
+        outputPath = temporaryPath / 'unpacked'
+        photoData = os.urandom(10000)
+
+        connection = sqlite3.connect(mcfxPath)
+        try:
+            connection.execute('CREATE TABLE Files (Filename TEXT, Data BLOB, LastModified INTEGER)')
+            connection.execute('INSERT INTO Files VALUES (?, ?, ?)',
+                ('data.mcf', b'<?xml version="1.0"?><fotobook></fotobook>trailing', 0))
+            connection.execute('INSERT INTO Files VALUES (?, ?, ?)', ('photo.jpg', photoData, 0))
+            connection.commit()
+        finally:
+            connection.close()
+
+        monkeypatch.setattr(mcfx, 'BLOB_CHUNK_SIZE', 4096)
+        _, extractedMcfPath = unpackMcfx(mcfxPath, outputPath)
+
+        assert extractedMcfPath.read_bytes() == b'<?xml version="1.0"?><fotobook></fotobook>'
+        assert (outputPath / 'photo.jpg').read_bytes() == photoData
+
+
+def test_mcfxExtraction_concurrentAlbums():
+    """Albums unpacked at the same time from several threads must not mix their files."""
+    with tempfile.TemporaryDirectory() as temporaryDirectory:
+        temporaryPath = Path(temporaryDirectory)
+        albums = []
+        for albumNumber in range(4):
+            mcfxPath = temporaryPath / f'album{albumNumber}.mcfx'
+            photos = {f'photo{photoNumber}.jpg': os.urandom(50000) for photoNumber in range(8)}
+            connection = sqlite3.connect(mcfxPath)
+            try:
+                connection.execute('CREATE TABLE Files (Filename TEXT, Data BLOB, LastModified INTEGER)')
+                connection.execute('INSERT INTO Files VALUES (?, ?, ?)',
+                    ('data.mcf', f'<fotobook title="{albumNumber}"></fotobook>'.encode(), 0))
+                connection.executemany('INSERT INTO Files VALUES (?, ?, 0)', photos.items())
+                connection.commit()
+            finally:
+                connection.close()
+            albums.append((mcfxPath, temporaryPath / f'unpacked{albumNumber}', photos))
+
+        currentDirectory = os.getcwd()
+        with ThreadPoolExecutor(max_workers=len(albums)) as executor:
+            results = list(executor.map(lambda album: unpackMcfx(album[0], album[1]), albums))
+        assert os.getcwd() == currentDirectory
+
+        for (_, outputPath, photos), (_, extractedMcfPath) in zip(albums, results):
+            assert extractedMcfPath == outputPath / 'data.mcf'
+            for photoName, photoData in photos.items():
+                assert (outputPath / photoName).read_bytes() == photoData
+
+
 def runall():
     """Run every test in this file when it is executed directly."""
     test_mcfxExtraction()
     test_mcfxExtraction_withNonNumericLastModified()
+    test_mcfxExtraction_concurrentAlbums()
 
 
 if __name__ == '__main__':
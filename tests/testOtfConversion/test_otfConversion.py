@@ -0,0 +1,110 @@
+"""Test the cached, parallel conversion of otf fonts to ttf."""
+
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from fontTools.fontBuilder import FontBuilder
+from fontTools.pens.t2CharStringPen import T2CharStringPen
+from fontTools.ttLib import TTFont
+
+# Bootstrap the project root so this test can also run directly.
+PROJECT_ROOT = Path(__file__).resolve().parents[2]
+sys.path.insert(0, str(PROJECT_ROOT))
+from testutils import configureTestImportPaths
+configureTestImportPaths(__file__)
+
+import otf  # type: ignore
+from otf import getTtfsFromOtfs  # type: ignore
+
+
+def writeOtfFont(otfFile, familyName):
+    """Write a small CFF-based font with a single square glyph."""
+    pen = T2CharStringPen(600, None)
+    pen.moveTo((100, 0))
+    pen.lineTo((500, 0))
+    pen.curveTo((500, 200), (500, 500), (500, 700))
+    pen.lineTo((100, 700))
+    pen.closePath()
+    fontBuilder = FontBuilder(1000, isTTF=False)
+    fontBuilder.setupGlyphOrder(['.notdef', 'A'])
+    fontBuilder.setupCharacterMap({ord('A'): 'A'})
+    fontBuilder.setupCFF(familyName, {'FullName': familyName}, {'.notdef': pen.getCharString(), 'A': pen.getCharString()}, {})
+    fontBuilder.setupHorizontalMetrics({'.notdef': (600, 100), 'A': (600, 100)})
+    fontBuilder.setupHorizontalHeader(ascent=800, descent=-200)
+    fontBuilder.setupNameTable({'familyName': familyName, 'styleName': 'Regular'})
+    fontBuilder.setupOS2()
+    fontBuilder.setupPost()
+    fontBuilder.save(otfFile)
+
+
+def test_conversionIsCachedByContent():
+    with tempfile.TemporaryDirectory() as folder:
+        otfFile = os.path.join(folder, 'Square.otf')
+        ttfFolder = os.path.join(folder, 'appdata')
+        writeOtfFont(otfFile, 'Square')
+
+        ttfFiles = getTtfsFromOtfs([otfFile], ttfFolder)
+        assert len(ttfFiles) == 1
+        assert 'glyf' in TTFont(ttfFiles[0])
+
+        # The same font is not converted again
+        os.utime(ttfFiles[0], ns=(1, 1))
+        assert getTtfsFromOtfs([otfFile], ttfFolder) == ttfFiles
+        assert os.stat(ttfFiles[0]).st_mtime_ns == 1
+
+        # but a changed font with the same name is
+        writeOtfFont(otfFile, 'Changed Square')
+        changedTtfFiles = getTtfsFromOtfs([otfFile], ttfFolder)
+        assert changedTtfFiles != ttfFiles
+        assert TTFont(changedTtfFiles[0])['name'].getDebugName(1) == 'Changed Square'
+
+
+def hangingConversion(otfFile, ttfFile): # pylint: disable=unused-argument
+    """Stand in for a conversion which never finishes, as with LiebeGerda-BoldItalic."""
+    time.sleep(600)
+
+
+def test_hangingConversionIsStoppedAndRemembered(monkeypatch):
+    with tempfile.TemporaryDirectory() as folder:
+        otfFiles = [os.path.join(folder, f'Square{index}.otf') for index in range(2)]
+        ttfFolder = os.path.join(folder, 'appdata')
+        for index, otfFile in enumerate(otfFiles):
+            writeOtfFont(otfFile, f'Square{index}')
+
+        monkeypatch.setattr(otf, 'convertOtfToTtf', hangingConversion)
+        startTime = time.monotonic()
+        assert not getTtfsFromOtfs(otfFiles, ttfFolder, timeoutSeconds=1, workers=2)
+        assert time.monotonic() - startTime < 30
+        assert len(list(Path(ttfFolder).glob('*.failed'))) == 2
+
+        # and the fonts are not tried again with the same timeout, even when they would now convert
+        monkeypatch.undo()
+        assert not getTtfsFromOtfs(otfFiles, ttfFolder, timeoutSeconds=1)
+        assert not list(Path(ttfFolder).glob('*.ttf'))
+
+        # but they are with a larger one
+        assert len(getTtfsFromOtfs(otfFiles, ttfFolder)) == 2
+        assert not list(Path(ttfFolder).glob('*.failed'))
+
+
+def failingConversion(otfFile, ttfFile): # pylint: disable=unused-argument
+    raise ValueError(f"Cannot convert {otfFile}")
+
+
+def test_failedConversionIsNotRetried(monkeypatch):
+    with tempfile.TemporaryDirectory() as folder:
+        otfFile = os.path.join(folder, 'Square.otf')
+        ttfFolder = os.path.join(folder, 'appdata')
+        writeOtfFont(otfFile, 'Square')
+
+        monkeypatch.setattr(otf, 'convertOtfToTtf', failingConversion)
+        assert not getTtfsFromOtfs([otfFile], ttfFolder, timeoutSeconds=1)
+        assert len(list(Path(ttfFolder).glob('*.failed'))) == 1
+
+        # A larger timeout does not help a conversion which failed by itself
+        monkeypatch.undo()
+        assert not getTtfsFromOtfs([otfFile], ttfFolder, timeoutSeconds=600)
+        assert not list(Path(ttfFolder).glob('*.ttf'))
@@ -0,0 +1,69 @@
+"""Test converting a batch of albums with processManyMcfs."""
+
+import json
+import os
+import shutil
+import sys
+import tempfile
+from pathlib import Path
+
+# Bootstrap the project root so this test can also run directly.
+PROJECT_ROOT = Path(__file__).resolve().parents[2]
+sys.path.insert(0, str(PROJECT_ROOT))
+from testutils import configureTestImportPaths
+configureTestImportPaths(__file__)
+
+import processManyMcfs # type: ignore
+
+ALBUM_FOLDER = PROJECT_ROOT / 'tests' / 'testShadows'
+
+
+def copyAlbums(folder, count):
+    """Copy the testShadows album count times, all sharing one image folder."""
+    shutil.copytree(ALBUM_FOLDER / 'test_shadows_mcf-Dateien', Path(folder, 'test_shadows_mcf-Dateien'))
+    shutil.copy(ALBUM_FOLDER / 'cewe2pdf.ini', folder)
+    albumNames = []
+    for index in range(count):
+        albumName = os.path.join(folder, f'album{index}.mcf')
+        shutil.copy(ALBUM_FOLDER / 'test_shadows.mcf', albumName)
+        albumNames.append(albumName)
+    return albumNames
+
+
+def test_workersConvertEachAlbumWithItsOwnLogAndSummary():
+    with tempfile.TemporaryDirectory() as folder:
+        albumNames = copyAlbums(folder, 3)
+        logFolder = os.path.join(folder, 'logs')
+
+        summaries = processManyMcfs.convertAlbums(albumNames, workers=2, logFolder=logFolder)
+
+        assert [summary['album'] for summary in summaries] == albumNames
+        for summary in summaries:
+            assert summary['succeeded'], summary
+            assert os.path.isfile(summary['output'])
+            assert summary['pages'] == 28
+            assert summary['images'] == 48
+            assert summary['duration_seconds'] > 0
+            logText = Path(summary['log']).read_text(encoding='utf-8')
+            # Each log holds its own album's conversion only
+            assert os.path.basename(summary['album']) in logText
+            assert all(os.path.basename(other) not in logText
+                       for other in albumNames if other != summary['album'])
+        json.dumps(summaries)
+
+
+def test_failedAlbumDoesNotStopTheBatch(monkeypatch):
+    with tempfile.TemporaryDirectory() as folder:
+        albumNames = copyAlbums(folder, 1)
+        brokenAlbum = os.path.join(folder, 'broken.mcf')
+        Path(brokenAlbum).write_text('not an album', encoding='utf-8')
+        summaryFile = os.path.join(folder, 'summary.json')
+        monkeypatch.setattr(sys, 'argv', ['processManyMcfs.py', '--workers', '2', '--summary', summaryFile,
+                                          brokenAlbum, albumNames[0]])
+
+        assert processManyMcfs.main() == 1
+
+        summaries = json.loads(Path(summaryFile).read_text(encoding='utf-8'))
+        assert [summary['succeeded'] for summary in summaries] == [False, True]
+        assert summaries[0]['error'] is not None
+        assert summaries[0]['errors'] > 0
@@ -0,0 +1,65 @@
+"""Test the persistent resource catalogue without rendering an album."""
+
+import os
+import sys
+import tempfile
+from pathlib import Path
+
+# Bootstrap the project root so this test can also run directly.
+PROJECT_ROOT = Path(__file__).resolve().parents[2]
+sys.path.insert(0, str(PROJECT_ROOT))
+from testutils import configureTestImportPaths
+configureTestImportPaths(__file__)
+
+from backgroundCache import buildBackgroundIndex
+from resourceCatalogue import RESOURCE_CATALOGUE_FILE_NAME, ResourceCatalogue
+
+
+def test_indexIsStoredAndRebuiltWhenAFolderChanges():
+    with tempfile.TemporaryDirectory() as folder:
+        resources = Path(folder, 'resources')
+        subFolder = resources / 'decorations' / 'frames'
+        subFolder.mkdir(parents=True)
+        catalogue = ResourceCatalogue(os.path.join(folder, 'catalogue.sqlite'))
+        buildCount = []
+
+        def buildIndex():
+            buildCount.append(1)
+            return {xmlFile.stem: str(xmlFile) for xmlFile in resources.rglob('*.xml')}
+
+        (subFolder / '101.xml').write_text('<decorations/>')
+        assert catalogue.getIndex('test', [str(resources)], buildIndex) == {'101': str(subFolder / '101.xml')}
+        assert catalogue.getIndex('test', [str(resources)], buildIndex) == {'101': str(subFolder / '101.xml')}
+        assert len(buildCount) == 1
+
+        # A new file deep below the folder changes its directory's time
+        (subFolder / '102.xml').write_text('<decorations/>')
+        os.utime(subFolder, ns=(1, 1))
+        assert set(catalogue.getIndex('test', [str(resources)], buildIndex)) == {'101', '102'}
+        assert len(buildCount) == 2
+
+
+def test_backgroundIndexMatchesFolderSearchOrder():
+    with tempfile.TemporaryDirectory() as folder:
+        first = Path(folder, 'first')
+        second = Path(folder, 'second')
+        first.mkdir()
+        second.mkdir()
+        for fileName in ('1.jpg', '2.webp', '3.jpg'):
+            (first / fileName).write_bytes(b'')
+        for fileName in ('1.jpg', '2.bmp', '4.JPG'):
+            (second / fileName).write_bytes(b'')
+
+        backgroundIndex = buildBackgroundIndex((str(first), str(second)))
+        assert backgroundIndex == {
+            '1': str(first / '1.jpg'),
+            '2': str(second / '2.bmp'),   # .bmp is preferred wherever it is
+            '3': str(first / '3.jpg'),
+            '4': str(second / '4.JPG')}
+
+
+def test_configuration():
+    with tempfile.TemporaryDirectory() as folder:
+        catalogue = ResourceCatalogue.fromConfiguration({}, folder)
+        assert catalogue.database_file_name == os.path.join(folder, RESOURCE_CATALOGUE_FILE_NAME)
+        assert ResourceCatalogue.fromConfiguration({'resourceCatalogue': 'False'}, folder) is None
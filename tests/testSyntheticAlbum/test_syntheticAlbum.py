@@ -0,0 +1,45 @@
+"""Test the synthetic albums of the benchmarks, and the stage times of a conversion."""
+
+import sys
+import tempfile
+from pathlib import Path
+
+# Bootstrap the project root so this test can also run directly.
+PROJECT_ROOT = Path(__file__).resolve().parents[2]
+sys.path.insert(0, str(PROJECT_ROOT))
+from testutils import configureTestImportPaths
+configureTestImportPaths(__file__)
+sys.path.insert(0, str(PROJECT_ROOT / 'benchmarks'))
+
+from albumConversionSession import AlbumConversionSession # type: ignore
+from cewe2pdf import image_quality, mcf2rl, pil_antialias # type: ignore
+from pageElements import processElements # type: ignore
+from syntheticAlbum import createSyntheticAlbum # type: ignore
+import pymupdf
+
+
+def convertSyntheticAlbum(mcfx):
+    with tempfile.TemporaryDirectory() as folder:
+        albumName = createSyntheticAlbum(folder, pages=3, photosPerPage=2, megapixels=0.1, mcfx=mcfx)
+        session = AlbumConversionSession(albumName, False, None, None, None, None,
+                                         mcf2rl, image_quality, pil_antialias)
+        with session:
+            assert session.render(processElements)
+        with pymupdf.open(session.output_file_name) as document:
+            pageCount = document.page_count
+            imageCount = sum(len(page.get_images()) for page in document)
+    return pageCount, imageCount, session.state
+
+
+def test_syntheticMcfAlbumIsConvertedWithStageTimes():
+    pageCount, imageCount, state = convertSyntheticAlbum(mcfx=False)
+
+    # The front and back covers, and the 4 normal pages with page 1 on the front inside cover
+    assert pageCount == 6
+    assert imageCount > 0
+    assert {'prepare', 'render', 'save', 'index'} <= set(state.stage_seconds)
+    assert state.stage_seconds['render'] > 0
+
+
+def test_syntheticMcfxAlbumMatchesMcfAlbum():
+    assert convertSyntheticAlbum(mcfx=True)[:2] == convertSyntheticAlbum(mcfx=False)[:2]
@@ -40,7 +40,10 @@ def tryToBuildBook(inFile, outFile, latestResultFile, keepDoublePages, expectedP
         if p == 0:
             # the test album has just one actual photo image, on the front cover
             assert imagecount == 2, f"Expected 2 images on front cover (background + picture), found {imagecount}"
-            coverBackgroundImageKey = imagekeys[1] # should be the same on both cover pages
+            # the background is the 10x10 image, whatever order the image names sort in.
+            # It should be the same on both cover pages
+            coverBackgroundImageKey = next(key for key in imagekeys
+                if PdfImage(page.get_images()[key]).width == 10)
         elif p == 1 and keepDoublePages:
             assert imagecount == 1, f"Expected 1 image on page 2 (both backgrounds are black), found {imagecount}"
         elif p == numPages - 1 and keepDoublePages:
@@ -1,6 +1,5 @@
 import logging
 import math
-from bs4 import BeautifulSoup  # Import BeautifulSoup for HTML parsing
 from lxml import etree
 from reportlab.lib import colors
 from reportlab.pdfbase import pdfmetrics
@@ -16,6 +15,8 @@ CEWE8_DEFAULT_TEXTART_RADIUS_RATIO = 171 / 490
 
 def parse_html_text(html):
     """Parses an HTML string, applying default styles from <body> while handling <p>, <span>, <i>, and <b>."""
+    # BeautifulSoup is slow to import, and few albums use TextArt
+    from bs4 import BeautifulSoup  # pylint: disable=import-outside-toplevel
     soup = BeautifulSoup(html, "html.parser")
     parsed_data = []
 
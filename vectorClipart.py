@@ -0,0 +1,149 @@
+"""Clipart drawn as PDF paths rather than as a rasterised image.
+
+With ``clipartVectors = True`` the SVG of a clipart is drawn by cairo to a
+one-page PDF, whose page description is then copied into the album's PDF as a
+form XObject, scaled and mirrored to each area like the raster image.  The
+result does not depend on the image resolution, and a large decorative frame
+is both quicker to produce and much smaller than its raster image.
+
+Only the operators which cairo uses for plain paths and colours are copied,
+and the transparency of its graphics states.  Cairo draws gradients, embedded
+images, text and masked groups with other resources; a clipart which needs
+them returns None from :func:`createVectorClipart`, and is rasterised as before.
+
+The transparency of the area is applied as :meth:`ClpFile.convertToPngInBuffer`
+applies it: only to a clipart which covers its whole rectangle, whose black
+is then transparent.  Such a clipart with black in it is rasterised too.
+"""
+
+from dataclasses import dataclass
+import hashlib
+from io import BytesIO
+
+from reportlab.pdfbase.pdfdoc import PDFDictionary, PDFResourceDictionary
+
+from clpFile import ClpFile
+
+# The operators copied unchanged: graphics state, path construction, painting,
+# clipping, line style, transformation and device colours
+COPIED_OPERATORS = frozenset((
+    'q', 'Q', 'm', 'l', 'c', 'v', 'y', 'h', 're',
+    'S', 's', 'f', 'F', 'f*', 'B', 'B*', 'b', 'b*', 'n', 'W', 'W*',
+    'w', 'J', 'j', 'M', 'd', 'ri', 'i', 'cm',
+    'g', 'G', 'rg', 'RG', 'k', 'K'))
+
+# The graphics state entries of cairo's transparency which ReportLab can set,
+# with the values of the entries which are allowed but change nothing
+_GRAPHICS_STATE_ENTRIES = ('/CA', '/ca')
+_IGNORED_GRAPHICS_STATE_ENTRIES = {'/Type': '/ExtGState', '/AIS': 'False', '/BM': '/Normal'}
+
+# The size of the raster image which shows whether a clipart covers its rectangle, and has black in it
+SAMPLE_SIZE = 100
+
+
+@dataclass(frozen=True)
+class VectorClipart:
+    """The page description of a clipart drawn by cairo, ready to be copied into a ReportLab canvas.
+
+    Each operation is ('literal', text) for PDF operators copied unchanged,
+    or ('alpha', fill, stroke) for a graphics state setting the transparency.
+    """
+
+    bounding_box: tuple[float, float, float, float]
+    operations: tuple[tuple, ...]
+    identity: str       # Distinguishes the form XObjects of different cliparts
+    opaque: bool        # Covers its whole rectangle, so the alpha of the area applies
+
+    def formName(self, alpha):
+        return f'Clipart{self.identity}A{alpha}'
+
+
+def createVectorClipart(clipart: ClpFile) -> VectorClipart | None:
+    """Return the vector clipart of a loaded clipart, or None if it must be rasterised."""
+    import pikepdf # pylint: disable=import-outside-toplevel
+
+    sample = clipart.rasterSvgData(SAMPLE_SIZE, SAMPLE_SIZE)
+    # Cairo writes an RGB image, with no alpha channel, when it covers every pixel
+    opaque = sample.mode == 'RGB'
+    if opaque and ClpFile.createAlphaMask(sample, 255).getextrema()[0] == 0:
+        return None
+
+    with pikepdf.open(BytesIO(clipart.convertToPdf())) as pdf:
+        page = pdf.pages[0]
+        graphicsStates = page.Resources.get('/ExtGState', {})
+        operations = []
+        literals = []
+        for instruction in pikepdf.parse_content_stream(page):
+            operator = str(instruction.operator)
+            if operator in COPIED_OPERATORS:
+                literals.append(instruction)
+                continue
+            if literals:
+                operations.append(('literal', pikepdf.unparse_content_stream(literals).decode('latin-1')))
+                literals = []
+            if operator != 'gs':
+                return None
+            alphas = _graphicsStateAlphas(graphicsStates.get(str(instruction.operands[0])))
+            if alphas is None:
+                return None
+            operations.append(('alpha',) + alphas)
+        if literals:
+            operations.append(('literal', pikepdf.unparse_content_stream(literals).decode('latin-1')))
+        boundingBox = tuple(float(value) for value in page.MediaBox)
+
+    identity = hashlib.sha256(repr((boundingBox, operations)).encode('utf-8')).hexdigest()[:16]
+    return VectorClipart(boundingBox, tuple(operations), identity, opaque)
+
+
+def _graphicsStateAlphas(graphicsState):
+    """Return the fill and stroke alpha of a graphics state, or None if it sets anything else."""
+    if graphicsState is None:
+        return None
+    for key, value in graphicsState.items():
+        if key not in _GRAPHICS_STATE_ENTRIES and _IGNORED_GRAPHICS_STATE_ENTRIES.get(key) != str(value):
+            return None
+    return (float(graphicsState.get('/ca', 1)), float(graphicsState.get('/CA', 1)))
+
+
+def drawVectorClipart(pdf, vectorClipart: VectorClipart, x, y, width, height, alpha, flipX, flipY, state):
+    """Draw the clipart into the rectangle, as one form XObject for each clipart and alpha."""
+    if not vectorClipart.opaque:
+        alpha = 255
+    formName = vectorClipart.formName(alpha)
+    if pdf.hasForm(formName):
+        state.performance_counters['shared vector clipart draws'] += 1
+    else:
+        _defineForm(pdf, vectorClipart, formName, alpha / 255)
+
+    left, bottom, right, top = vectorClipart.bounding_box
+    pdf.saveState()
+    pdf.translate(x + width if flipX else x, y + height if flipY else y)
+    pdf.scale((-1 if flipX else 1) * width / (right - left), (-1 if flipY else 1) * height / (top - bottom))
+    pdf.translate(-left, -bottom)
+    pdf.doForm(formName)
+    pdf.restoreState()
+
+
+def _defineForm(pdf, vectorClipart, formName, opacity):
+    # ReportLab leaves the transparency set by its canvas out of the resources
+    # of a form, so the form has graphics states of its own
+    graphicsStateNames = {}
+
+    def setAlpha(fillAlpha, strokeAlpha):
+        alphas = (round(fillAlpha * opacity, 4), round(strokeAlpha * opacity, 4))
+        if alphas not in graphicsStateNames:
+            graphicsStateNames[alphas] = f'GS{len(graphicsStateNames)}'
+        pdf.addLiteral(f'/{graphicsStateNames[alphas]} gs')
+
+    pdf.beginForm(formName, *vectorClipart.bounding_box)
+    setAlpha(1, 1)
+    for operation in vectorClipart.operations:
+        if operation[0] == 'literal':
+            pdf.addLiteral(operation[1])
+        else:
+            setAlpha(operation[1], operation[2])
+    resources = PDFResourceDictionary()
+    resources.basicProcs()
+    resources.ExtGState = PDFDictionary({name: PDFDictionary({'ca': fillAlpha, 'CA': strokeAlpha})
+                                         for (fillAlpha, strokeAlpha), name in graphicsStateNames.items()})
+    pdf.endForm(Resources=resources)